@@ -1,16 +1,20 @@
 """Module to instantiate Mailjet templates using mustache syntax.
 
 The full reference is here: https://dev.mailjet.com/email/template-language/reference/
+
+Templates are parsed once in a tree of nodes, with all their expressions pre-parsed: use `compile`
+to get such a tree (they are cached by template) and render it for many users.
 """
 
 import abc
+import functools
 import itertools
 import logging
 import html
 import json
 import operator
 import re
-from typing import Any, Iterable, Iterator, Literal, Mapping, Optional, Tuple
+from typing import Any, Callable, Iterable, Iterator, Literal, Mapping, Optional, Tuple
 
 
 # Regexp to match MJML tags e.g. {{var:foo}}, {%endif%} etc.
@@ -41,6 +45,9 @@ _OPERATORS = {
     '<>': operator.ne,
 }
 
+# Maximum number of compiled templates to keep in memory.
+_MAX_COMPILED_TEMPLATES = 256
+
 
 class SyntaxTemplateError(ValueError):
     """A syntax template error."""
@@ -96,48 +103,130 @@ def _tokenize_mustache(
         yield token, 'content'
 
 
-def _resolve(expression: str, context: Mapping[str, Any]) -> Any:
-    func_match = _FUNC_PATTERN.match(expression)
-    if func_match:
-        func_name = func_match.group('func_name')
-        arg = _resolve(func_match.group('arg'), context)
-        if func_name == 'Escape':
+class _Expression:
+
+    @abc.abstractmethod
+    def evaluate(self, context: Mapping[str, Any]) -> Any:
+        """Evaluate the expression in the context."""
+
+
+class _FuncExpression(_Expression):
+
+    def __init__(self, func_name: str, arg: _Expression) -> None:
+        self._func_name = func_name
+        self._arg = arg
+
+    def evaluate(self, context: Mapping[str, Any]) -> Any:
+        arg = self._arg.evaluate(context)
+        if self._func_name == 'Escape':
             return html.escape(arg)
-        raise NotImplementedError(f'Function "{func_name}" not implemented')
+        raise NotImplementedError(f'Function "{self._func_name}" not implemented')
 
-    var_match = _VAR_PATTERN.match(expression)
-    if var_match:
-        var_name = var_match.group('var_name')
-        if var_match.group('default_value'):
-            try:
-                default_value = json.loads(var_match.group('default_value'))
-            except Exception as err:
-                raise ValueError(expression) from err
-            return context.get(var_name, default_value)
+
+class _VarExpression(_Expression):
+
+    def __init__(self, expression: str, var_name: str) -> None:
+        self._expression = expression
+        self._pieces = var_name.split('.')
+
+    def evaluate(self, context: Mapping[str, Any]) -> Any:
         value = context
         try:
-            for piece in var_name.split('.'):
+            for piece in self._pieces:
                 value = value[piece]
         except KeyError as error:
-            raise ValueError(f'Error while resolving "{expression}"') from error
+            raise ValueError(f'Error while resolving "{self._expression}"') from error
         return value
 
-    operator_match = _OPERATOR_PATTERN.match(expression)
-    if operator_match:
+
+class _VarWithDefaultExpression(_Expression):
+
+    def __init__(self, expression: str, var_name: str, default_json: str) -> None:
+        self._expression = expression
+        self._var_name = var_name
+        self._default_value: Any = None
+        # The parsing error is only raised when evaluating the expression.
+        self._default_error: Optional[ValueError] = None
+        try:
+            self._default_value = json.loads(default_json)
+        except ValueError as error:
+            self._default_error = error
+
+    def evaluate(self, context: Mapping[str, Any]) -> Any:
+        if self._default_error:
+            raise ValueError(self._expression) from self._default_error
+        return context.get(self._var_name, self._default_value)
+
+
+class _OperatorExpression(_Expression):
+
+    def __init__(
+            self, expression: str, operator_func: Callable[[Any, Any], Any],
+            operand_1: _Expression, operand_2: _Expression) -> None:
+        self._expression = expression
+        self._operator_func = operator_func
+        self._operand_1 = operand_1
+        self._operand_2 = operand_2
+
+    def evaluate(self, context: Mapping[str, Any]) -> Any:
         try:
-            operator_func = _OPERATORS[operator_match.group('operator')]
-            operand_1 = _resolve(operator_match.group('operand_1').strip(), context)
-            operand_2 = _resolve(operator_match.group('operand_2').strip(), context)
-            return operator_func(operand_1, operand_2)
+            return self._operator_func(
+                self._operand_1.evaluate(context), self._operand_2.evaluate(context))
         except Exception as error:
-            raise ValueError(f'Error while resolving"{expression}"') from error
+            raise ValueError(f'Error while resolving"{self._expression}"') from error
+
+
+class _LiteralExpression(_Expression):
+
+    def __init__(self, value: Any) -> None:
+        self._value = value
+
+    def evaluate(self, context: Mapping[str, Any]) -> Any:
+        return self._value
+
+
+class _UnknownExpression(_Expression):
+
+    def __init__(self, expression: str) -> None:
+        self._expression = expression
+
+    def evaluate(self, context: Mapping[str, Any]) -> Any:
+        raise NotImplementedError(f'Does not handle the expression "{self._expression}" yet')
+
+
+def _parse_expression(expression: str) -> _Expression:
+    """Parse an expression once, so that it can be evaluated quickly in many contexts.
+
+    Errors in expressions are only raised when they are evaluated.
+    """
+
+    func_match = _FUNC_PATTERN.match(expression)
+    if func_match:
+        return _FuncExpression(
+            func_match.group('func_name'), _parse_expression(func_match.group('arg')))
+
+    var_match = _VAR_PATTERN.match(expression)
+    if var_match:
+        var_name = var_match.group('var_name')
+        default_json = var_match.group('default_value')
+        if default_json:
+            return _VarWithDefaultExpression(expression, var_name, default_json)
+        return _VarExpression(expression, var_name)
+
+    operator_match = _OPERATOR_PATTERN.match(expression)
+    if operator_match:
+        return _OperatorExpression(
+            expression,
+            _OPERATORS[operator_match.group('operator')],
+            _parse_expression(operator_match.group('operand_1').strip()),
+            _parse_expression(operator_match.group('operand_2').strip()))
 
     try:
-        return json.loads(expression)
+        return _LiteralExpression(json.loads(expression))
     except json.decoder.JSONDecodeError:
         ...
 
-    raise NotImplementedError(f'Does not handle the expression "{expression}" yet')
+    return _UnknownExpression(expression)
 
 
 class _Node:
@@ -159,10 +248,10 @@ class _ContentLeaf(_Node):
 class _ExpressionLeaf(_Node):
 
     def __init__(self, expression: str) -> None:
-        self._expression = expression
+        self._expression = _parse_expression(expression)
 
     def resolve(self, context: Mapping[str, Any]) -> str:
-        return str(_resolve(self._expression, context))
+        return str(self._expression.evaluate(context))
 
 
 class _IfNode(_Node):
@@ -170,12 +259,12 @@ class _IfNode(_Node):
     def __init__(
             self, condition: str, then_branch: Iterable[_Node], else_branch: Iterable[_Node]) \
             -> None:
-        self._condition = condition
+        self._condition = _parse_expression(condition)
         self._then_branch = then_branch
         self._else_branch = else_branch
 
     def resolve(self, context: Mapping[str, Any]) -> str:
-        if _resolve(self._condition, context):
+        if self._condition.evaluate(context):
             branch = self._then_branch
         else:
             branch = self._else_branch
@@ -186,11 +275,11 @@ class _ForNode(_Node):
 
     def __init__(self, var_name: str, expression: str, branch: Iterable[_Node]) -> None:
         self._var_name = var_name
-        self._expression = expression
+        self._expression = _parse_expression(expression)
         self._branch = list(branch)
 
     def resolve(self, context: Mapping[str, Any]) -> str:
-        values = _resolve(self._expression, context)
+        values = self._expression.evaluate(context)
         return ''.join(
             ''.join(
                 node.resolve(context | {self._var_name: value})
@@ -259,22 +348,45 @@ def _parse_tree(tokens: Iterator[Tuple[str, _TokenType]], block_start: str) -> I
         raise SyntaxTemplateError(f'Missing "end{block_start}"')
 
 
+class CompiledTemplate:
+    """A parsed Mailjet template, ready to be instantiated many times."""
+
+    def __init__(self, nodes: Iterable[_Node]) -> None:
+        self._nodes = tuple(nodes)
+
+    def instantiate(self, template_vars: Optional[Mapping[str, Any]] = None) -> str:
+        """Instantiate the template with the given vars."""
+
+        context = {
+            f'var:{key}': value
+            for key, value in (template_vars or {}).items()}
+        return ''.join(node.resolve(context) for node in self._nodes)
+
+
+@functools.lru_cache(maxsize=_MAX_COMPILED_TEMPLATES)
+def compile(  # pylint: disable=redefined-builtin
+        template: str, *, use_strict_syntax: bool = False) -> CompiledTemplate:
+    """Parse a Mailjet template once to instantiate it many times.
+
+    Compiled templates are cached by template text.
+
+    Raises:
+        SyntaxTemplateError: if the template syntax is incorrect.
+    """
+
+    tokens = _tokenize_mustache(template, use_strict_syntax=use_strict_syntax)
+    return CompiledTemplate(_parse_tree(tokens, ''))
+
+
 def instantiate(
         template: str, template_vars: Optional[Mapping[str, Any]] = None, *,
         use_strict_syntax: bool = False) -> str:
     """Instantiate a Mailjet template with the given vars."""
 
-    context = {
-        f'var:{key}': value
-        for key, value in (template_vars or {}).items()}
-
-    tokens = _tokenize_mustache(template, use_strict_syntax=use_strict_syntax)
-    tree = _parse_tree(tokens, '')
-    return ''.join(node.resolve(context) for node in tree)
+    return compile(template, use_strict_syntax=use_strict_syntax).instantiate(template_vars)
 
 
 def check_syntax(template: str, *, use_strict_syntax: bool = False) -> None:
     """Parse a Mailjet template to check it has a correct syntax."""
 
-    tokens = _tokenize_mustache(template, use_strict_syntax=use_strict_syntax)
-    list(_parse_tree(tokens, ''))
+    compile(template, use_strict_syntax=use_strict_syntax)
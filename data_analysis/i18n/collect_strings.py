@@ -26,6 +26,7 @@ from bob_emploi.frontend.api import job_pb2
 from bob_emploi.frontend.api import options_pb2
 from bob_emploi.data_analysis.importer import airtable_to_protos
 from bob_emploi.data_analysis.importer import import_status
+from bob_emploi.data_analysis.lib import airtable_snapshot
 
 
 _I18N_BASE_ID = 'appkEc8N0Bw4Uok43'
@@ -88,21 +89,21 @@ _PROTO_COLLECTIBLES: tuple[_EnumMessageType, ...] = (
 
 
 def _airtable_fallback_iterate(
-        base: airtable.Airtable,
+        base_id: str, api_key: str,
         table: str, view: Optional[str], alt_table: Optional[str]) \
         -> Iterable[airtable.Record[Mapping[str, Any]]]:
     try:
-        yield from base.iterate(table, view=view)
+        yield from airtable_snapshot.get_records(base_id, table, view=view, api_key=api_key)
         return
     except AttributeError as error:
         if not alt_table:
             raise
         if not isinstance(error.__context__, requests.exceptions.HTTPError):
             raise
-    except requests.exceptions.HTTPError:
+    except (requests.exceptions.HTTPError, airtable_snapshot.MissingSnapshotError):
         if not alt_table:
             raise
-    yield from base.iterate(alt_table, view=view)
+    yield from airtable_snapshot.get_records(base_id, alt_table, view=view, api_key=api_key)
 
 
 class StringCollector:
@@ -121,7 +122,6 @@ class StringCollector:
                 continue
             self._existing_translations[key] = record
         self._api_key = api_key
-        self.bases: dict[str, airtable.Airtable] = {}
         self._collected: dict[str, dict[str, str]] = \
             collections.defaultdict(lambda: collections.defaultdict(str))
         self._used_translations: Set[str] = set()
@@ -134,11 +134,6 @@ class StringCollector:
 
         return self._duplicate_strings
 
-    def _get_base(self, base_id: str) -> airtable.Airtable:
-        if base_id not in self.bases:
-            self.bases[base_id] = airtable.Airtable(base_id, self._api_key)
-        return self.bases[base_id]
-
     def collect_string(
             self, text: str, origin: str, origin_id: str,
             translations: Optional[dict[str, str]] = None) -> None:
@@ -195,8 +190,8 @@ class StringCollector:
             id_field: name of the field to use as ID (otherwise just use the recxxxx).
         """
 
-        base = self._get_base(base_id)
-        for record in _airtable_fallback_iterate(base, table, view=view, alt_table=alt_table):
+        for record in _airtable_fallback_iterate(
+                base_id, self._api_key, table, view=view, alt_table=alt_table):
             record_fields = record['fields']
             record_id = record['id']
             for field in fields:
@@ -233,9 +228,9 @@ class StringCollector:
             return 0
 
         num_errors = 0
-        base = self._get_base(base_id)
         unique_id_field = converter.unique_id_field
-        for record in _airtable_fallback_iterate(base, table, view=view, alt_table=alt_table):
+        for record in _airtable_fallback_iterate(
+                base_id, self._api_key, table, view=view, alt_table=alt_table):
             try:
                 message, _id = converter.convert_record_to_proto(record)
             except (KeyError, ValueError) as error:
@@ -370,6 +365,34 @@ _PROTO_COLLECTIONS = tuple(
 _ALL_COLLECTION_NAMES = _ALL_COLLECTIONS + _CLIENT_COLLECTIONS + _PROTO_COLLECTIONS
 
 
+def _list_airtable_tables(collection_names: Iterable[str]) \
+        -> Iterator[airtable_snapshot.TableRef]:
+    """List the Airtable tables read to collect strings for the given collections."""
+
+    importers = import_status.get_importers()
+    for collection in collection_names:
+        if collection.startswith('client'):
+            client_table = collection[len(_CLIENT_PREFIX):]
+            for collectible in CLIENT_COLLECTIBLES:
+                if not client_table or collectible.table == client_table:
+                    yield airtable_snapshot.TableRef(
+                        collectible.base_id, collectible.table, collectible.view)
+            continue
+        importer = importers.get(collection)
+        if not importer or not importer.args:
+            continue
+        if collection == 'job_group_info':
+            airtable_skills = importer.args.get('skills_for_future_airtable')
+            if airtable_skills:
+                skills_base_id, skills_table, skills_view = airtable_skills.split(':')
+                yield airtable_snapshot.TableRef(skills_base_id, skills_table, skills_view)
+            continue
+        base_id = importer.args.get('base_id')
+        table = importer.args.get('table')
+        if importer.script == 'airtable_to_protos' and base_id and table:
+            yield airtable_snapshot.TableRef(base_id, table, importer.args.get('view'))
+
+
 def _print_report(text: str) -> None:
     if _SLACK_IMPORT_URL and text:
         requests.post(_SLACK_IMPORT_URL, json={'attachments': [{
@@ -404,6 +427,10 @@ def main(string_args: Optional[list[str]] = None) -> None:
     logging.info('Loading existing translations…')
     collector = StringCollector(args.api_key)
 
+    # Prefetch in parallel the tables that are missing from the local snapshot, if any.
+    airtable_snapshot.refresh(
+        _list_airtable_tables(args.collection or _ALL_COLLECTIONS), api_key=args.api_key)
+
     if not args.collection:
         logging.info('Collecting all possible strings:')
 
@@ -33,7 +33,9 @@ import requests
 
 from bob_emploi.common.python import checker
 from bob_emploi.common.python.i18n import translation
+from bob_emploi.data_analysis.lib import airtable_snapshot
 from bob_emploi.data_analysis.lib import mongo
+from bob_emploi.data_analysis.lib import prefix_index
 from bob_emploi.frontend.api import action_pb2
 from bob_emploi.frontend.api import application_pb2
 from bob_emploi.frontend.api import association_pb2
@@ -108,7 +110,8 @@ class _FilterSetSorter:
     """A class to compare filter lists to make sure a more restrictive filter list is not
     pre-empted by a looser one.
 
-    It gets completly useless if sorting in airtable2dicts is implemented otherwise.
+    It is not a total order, so airtable2dicts has to compare each record with all the previous
+    ones: make sure to use it in a sorter with `is_total_order=False`.
     """
 
     def __init__(self, record: Mapping[str, Any]) -> None:
@@ -186,10 +189,10 @@ def load_items_from_prefix(
     else:
         base_id, table, view = parts
     items: dict[str, list[dict[str, Any]]] = {key: [] for key in keys}
+    items_by_key = prefix_index.PrefixIndex(
+        (key, (key, items_for_key)) for key, items_for_key in items.items())
     converter = PROTO_CLASSES[proto_name]
-    api_key = os.getenv('AIRTABLE_API_KEY', '')
-    client = airtable.Airtable(base_id, api_key)
-    for record in client.iterate(table, view=view):
+    for record in airtable_snapshot.get_records(base_id, table, view=view):
         item = converter.convert_record(record)
         del item['_id']
         key_prefixes = record['fields'].get(key_prefixes_field, '')
@@ -198,12 +201,11 @@ def load_items_from_prefix(
             key_prefix = key_prefix.strip()
             if not key_prefix:
                 continue
-            for key, items_for_group in items.items():
-                if key.startswith(key_prefix):
-                    if key in added_to_keys:
-                        continue
-                    added_to_keys.add(key)
-                    items_for_group.append(item)
+            for key, items_for_group in items_by_key.iterate_with_prefix(key_prefix):
+                if key in added_to_keys:
+                    continue
+                added_to_keys.add(key)
+                items_for_group.append(item)
     return items
 
 
@@ -241,6 +243,9 @@ class ProtoAirtableConverter:
         # Sort key shouldn't be used anywhere else than airtable2dicts, since some implementations
         # depend on how it's used there.
         self.sort_key = self._sort_key
+        # Whether sort keys are totally ordered, so that checking each record against the previous
+        # one is enough to check the whole sorting.
+        self.is_sort_key_total_order = True
         self._unarray_fields: Iterable[str] = ()
         self._unique_field_tuples = list(unique_field_tuples)
 
@@ -350,11 +355,18 @@ class ProtoAirtableConverter:
             raise ValueError(f'Missing an unique key value:\n{proto_record}') from error
 
     def set_fields_sorter(
-            self: ConverterType, sort_lambda: Callable[[Mapping[str, Any]], Any]) \
-            -> ConverterType:
-        """Set the sorter for this converter."""
+            self: ConverterType, sort_lambda: Callable[[Mapping[str, Any]], Any],
+            *, is_total_order: bool = True) -> ConverterType:
+        """Set the sorter for this converter.
+
+        Args:
+            sort_lambda: a function to compute the sort key from the record's fields.
+            is_total_order: whether the sort keys are totally ordered. If not, each record is
+                checked against all the previous ones instead of only the previous one.
+        """
 
         self.sort_key = lambda airtable_record: sort_lambda(airtable_record['fields'])
+        self.is_sort_key_total_order = is_total_order
         return self
 
     def _record2dict(self, airtable_record: airtable.Record[Mapping[str, Any]]) -> dict[str, Any]:
@@ -621,7 +633,7 @@ PROTO_CLASSES: dict[str, ProtoAirtableConverter] = {
         required_fields=['category_id', 'order', 'description'],
         unique_field_tuples=(('categoryId',),),
     ).set_fields_sorter(
-        lambda record: (_FilterSetSorter(record), record.get('order'))),
+        lambda record: (_FilterSetSorter(record), record.get('order')), is_total_order=False),
     'DiagnosticResponse': _ProtoAirtableFiltersConverter(
         diagnostic_pb2.DiagnosticResponse, None,
         required_fields=[
@@ -632,7 +644,8 @@ PROTO_CLASSES: dict[str, ProtoAirtableConverter] = {
         required_fields=['sentence_template', 'score', 'order', 'text_template', 'category_id'],
         unique_field_tuples=(('id',),),
     ).set_fields_sorter(
-        lambda record: (record.get('category_id', []), _FilterSetSorter(record), record['order'])
+        lambda record: (record.get('category_id', []), _FilterSetSorter(record), record['order']),
+        is_total_order=False,
     ).set_first_only_fields('categoryId'),
     'Campaign': _CampaignConverter(email_pb2.Campaign, required_fields=('campaign_id',)),
     'OneEuroProgramPartnerBank': ProtoAirtableConverter(
@@ -691,40 +704,26 @@ def airtable2dicts(
 
     api_key = os.getenv('AIRTABLE_API_KEY')
     converter = PROTO_CLASSES[proto]
-    if not api_key:
+    if not api_key and not airtable_snapshot.is_offline():
         raise ValueError(
             'No API key found. Create an airtable API key at '
             'https://airtable.com/account and set it in the AIRTABLE_API_KEY '
             'env var.')
-    client = airtable.Airtable(base_id, api_key)
     try:
-        records = list(client.iterate(table, view=view))
+        records = airtable_snapshot.get_records(base_id, table, view=view, api_key=api_key)
     # TODO(pascal): Clean that weird block once Airtable raises the proper error.
     except AttributeError as error:
         if not isinstance(error.__context__, requests.exceptions.HTTPError):
             raise error
         if not alt_table:
             raise error.__context__ from None
-        records = list(client.iterate(alt_table, view=view))
-    except requests.exceptions.HTTPError:
+        records = airtable_snapshot.get_records(base_id, alt_table, view=view, api_key=api_key)
+    except (requests.exceptions.HTTPError, airtable_snapshot.MissingSnapshotError):
         if not alt_table:
             raise
-        records = list(client.iterate(alt_table, view=view))
+        records = airtable_snapshot.get_records(base_id, alt_table, view=view, api_key=api_key)
 
-    has_error = False
-    # If sorting implementation changes, please also change implementation for _FilterSetSorter.
-    previous_keys: dict[str, Any] = {}
-    for record in records:
-        sort_key = converter.sort_key(record)
-        record_id = record['id']
-        for previous_id, previous_key in previous_keys.items():
-            if sort_key < previous_key:
-                logging.error(
-                    'Records are not sorted properly: record "%s" with key "%r" should be before '
-                    'record "%s" with key "%r".\nGo to Airtable and apply the sorting '
-                    'for the view.', record_id, sort_key, previous_id, previous_key)
-                has_error = True
-        previous_keys[record_id] = sort_key
+    has_error = _has_sort_errors(converter, records)
 
     all_unique_keys: Optional[Sequence[Set[Any]]] = None
 
@@ -765,6 +764,34 @@ def airtable2dicts(
     return proto_records
 
 
+def _has_sort_errors(
+        converter: ProtoAirtableConverter,
+        records: Sequence[airtable.Record[Mapping[str, Any]]]) -> bool:
+    """Check that records are sorted as in the view, and log the errors."""
+
+    has_error = False
+    previous_keys: list[Tuple[str, Any]] = []
+    for record in records:
+        sort_key = converter.sort_key(record)
+        record_id = record['id']
+        # With totally ordered keys, records are sorted iff each one is not before the previous
+        # one. Otherwise (see _FilterSetSorter) all the previous records need to be checked.
+        keys_to_check = previous_keys if not converter.is_sort_key_total_order \
+            else previous_keys[-1:]
+        for previous_id, previous_key in keys_to_check:
+            if sort_key < previous_key:
+                logging.error(
+                    'Records are not sorted properly: record "%s" with key "%r" should be before '
+                    'record "%s" with key "%r".\nGo to Airtable and apply the sorting '
+                    'for the view.', record_id, sort_key, previous_id, previous_key)
+                has_error = True
+        if converter.is_sort_key_total_order:
+            previous_keys = [(record_id, sort_key)]
+        else:
+            previous_keys.append((record_id, sort_key))
+    return has_error
+
+
 def _log_error(
         error: Exception, checker_name: str, record_id: str, path: Optional[str] = None) -> None:
     if record_id is None:
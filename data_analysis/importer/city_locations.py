@@ -1,22 +1,66 @@
-"""Module to upload the French city locations to MongoDB."""
+"""Module to upload the French cities to MongoDB.
+
+The collection contains the locations of all cities, and the full FrenchCity data (names,
+département, région and their prefixes, postcodes, population, urban and transport scores) of
+current cities. It is loaded in memory by the server to resolve city IDs.
+"""
 
 import typing
-from typing import Any
+from typing import Any, Optional
 
 import pandas
 
 from bob_emploi.frontend.api import geo_pb2
+from bob_emploi.data_analysis.importer import french_city_suggest
 from bob_emploi.data_analysis.lib import cleaned_data
 from bob_emploi.data_analysis.lib import mongo
 
 
-def csv2dicts(stats_filename: str, urban_context_filename: str) -> list[dict[str, Any]]:
+# Fields of the prepared Algolia cities, renamed as in the FrenchCity proto.
+_CITY_FIELDS = {
+    'name': 'name',
+    'departementId': 'departementId',
+    'departementName': 'departementName',
+    'departementPrefix': 'departementPrefix',
+    'regionId': 'regionId',
+    'regionName': 'regionName',
+    'zipCode': 'postcodes',
+    'population': 'population',
+    'urban': 'urbanScore',
+    'transport': 'publicTransportationScore',
+}
+
+
+def _get_city_fields(algolia_city: dict[str, Any]) -> dict[str, Any]:
+    city = {
+        proto_field: algolia_city[algolia_field]
+        for algolia_field, proto_field in _CITY_FIELDS.items()
+        if algolia_field in algolia_city and not pandas.isna(algolia_city[algolia_field])
+    }
+    if 'population' in city:
+        city['population'] = int(city['population'])
+    # Keep in sync with frontend/src/components/suggestions.jsx
+    if 'urbanScore' in city:
+        city['urbanScore'] = int(city['urbanScore']) or -1
+    return city
+
+
+def csv2dicts(
+        stats_filename: str, urban_context_filename: str, data_folder: Optional[str] = None,
+        urban_entities_filename: Optional[str] = None,
+        transport_scores_filename: Optional[str] = None) -> list[dict[str, Any]]:
     """Prepare cities for upload to MongoDB.
 
     Args:
         stats_filename: path to a file containing stats about cities.
         urban_context_filename: path to a file containing urban context
         info for each cities.
+        data_folder: the root of the data folder, if not set only the
+            locations and urban contexts of the cities are prepared.
+        urban_entities_filename: path to an excel file containing the
+            description about French urban entities.
+        transport_scores_filename: path to an html file containing the scores for public
+            transportation in some French cities.
 
     Returns:
         A list of dict JSON-like object compatible with the geo_pb2.FrenchCity
@@ -32,7 +76,22 @@ def csv2dicts(stats_filename: str, urban_context_filename: str) -> list[dict[str
     urban_contexts = cleaned_data.french_urban_areas(filename=urban_context_filename)
     city_stats['urbanContext'] = city_stats['_id'].map(urban_contexts.periurban)\
         .fillna(geo_pb2.UNKNOWN_URBAN_CONTEXT).astype(int)
-    return typing.cast(list[dict[str, Any]], city_stats.to_dict(orient='records'))
+    cities = typing.cast(list[dict[str, Any]], city_stats.to_dict(orient='records'))
+    if not data_folder:
+        return cities
+
+    current_cities = {
+        algolia_city['cityId']: _get_city_fields(algolia_city)
+        for algolia_city in french_city_suggest.prepare_cities(
+            data_folder, stats_filename, urban_entities_filename, transport_scores_filename)
+    }
+    region_prefixes = cleaned_data.french_regions(data_folder).prefix
+    for city_fields in current_cities.values():
+        if city_fields.get('regionId') in region_prefixes:
+            city_fields['regionPrefix'] = region_prefixes[city_fields['regionId']]
+    for city in cities:
+        city.update(current_cities.get(city['_id'], {}))
+    return cities
 
 
 if __name__ == '__main__':
@@ -121,6 +121,10 @@ def upload(string_args: Optional[list[str]] = None) -> None:
     parser.add_argument(
         '--batch-size', help='Number of suggestions to upload to Algolia per batch.',
         default=5000, type=int)
+    parser.add_argument(
+        '--algolia-manifest',
+        help='Path to a file to keep track of the uploaded cities, to only upload the ones that '
+        'changed on the next run.')
 
     args = parser.parse_args(string_args)
 
@@ -128,7 +132,8 @@ def upload(string_args: Optional[list[str]] = None) -> None:
         args.ward_ons_list, args.geonames, args.geonames_admin, min_population=args.min_population)
     algolia.upload(
         suggestions, app_id=args.algolia_app_id, api_key=args.algolia_api_key,
-        batch_size=args.batch_size, index=args.algolia_index)
+        batch_size=args.batch_size, index=args.algolia_index,
+        manifest_path=args.algolia_manifest)
 
 
 if __name__ == '__main__':
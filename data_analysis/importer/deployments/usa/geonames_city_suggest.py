@@ -20,17 +20,14 @@ docker-compose run --rm -e ALGOLIA_API_KEY=<the key> \
 
 import argparse
 import csv
-import json
 import os
-import sys
-import time
 import typing
-from typing import Any, Mapping, Optional, TextIO
+from typing import Any, Mapping, Optional
 
-from algoliasearch import exceptions
-from algoliasearch import search_client
 import pandas as pd
 
+from bob_emploi.data_analysis.lib import algolia
+
 
 # Names of the fields in geonames postal code datasets format.
 # See https://download.geonames.org/export/zip/readme.txt
@@ -170,7 +167,7 @@ def prepare_zip_cities(
     return typing.cast(list[dict[str, Any]], clean_cities.to_dict('records'))
 
 
-def upload(string_args: Optional[list[str]] = None, out: TextIO = sys.stdout) -> None:
+def upload(string_args: Optional[list[str]] = None) -> None:
     """Upload city suggestions to Algolia index."""
 
     parser = argparse.ArgumentParser(
@@ -200,34 +197,22 @@ def upload(string_args: Optional[list[str]] = None, out: TextIO = sys.stdout) ->
     parser.add_argument(
         '--batch-size', help='Number of suggestions to upload to Algolia per batch.',
         default=5000, type=int)
+    parser.add_argument(
+        '--algolia-manifest',
+        help='Path to a file to keep track of the uploaded cities, to only upload the ones that '
+        'changed on the next run.')
 
     args = parser.parse_args(string_args)
 
-    batch_size = args.batch_size
-
     city_population = _get_city_population(args.population_by_zip)
     cities_with_population = get_cities_with_population(city_population, args.cities_with_zip)
     states_by_code = prepare_state_codes(args.states_fips_codes)
 
     suggestions = prepare_zip_cities(cities_with_population, states_by_code)
-
-    client = search_client.SearchClient.create(args.algolia_app_id, args.algolia_api_key)
-    index_name = args.algolia_index
-    cities_index = client.init_index(index_name)
-    tmp_index_name = f'{index_name}_{round(time.time())}'
-    tmp_cities_index = client.init_index(tmp_index_name)
-
-    try:
-        tmp_cities_index.set_settings(cities_index.get_settings())
-        for start in range(0, len(suggestions), batch_size):
-            tmp_cities_index.save_objects(suggestions[start:start + batch_size])
-
-        # OK we're ready finally replace the index.
-        client.move_index(tmp_index_name, index_name)
-    except exceptions.AlgoliaException:
-        tmp_cities_index.delete()
-        out.write(json.dumps(suggestions[:10], indent=2))
-        raise
+    algolia.upload(
+        suggestions, app_id=args.algolia_app_id, api_key=args.algolia_api_key,
+        batch_size=args.batch_size, index=args.algolia_index,
+        manifest_path=args.algolia_manifest)
 
 
 if __name__ == '__main__':
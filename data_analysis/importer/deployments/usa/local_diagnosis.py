@@ -36,7 +36,7 @@ def csv2dicts(
         hires_csv=hires_csv, job_seekers_csv=job_seekers_csv, job_groups=job_groups)
     carreer_jumps = usa_cleaned_data.usa_soc2010_career_changes(filename=carreer_changers_tsv)
     yield from market_score_derivatives.local_diagnosis(
-        local_stats, carreer_jumps, prefix_length=2, job_group_names=job_group_names)
+        local_stats, carreer_jumps, job_group_names=job_group_names)
 
 
 if __name__ == '__main__':
@@ -1,6 +1,6 @@
 """Tests for the bob_emploi.importer.geonames_city_suggest module."""
 
-import io
+import logging
 from os import path
 import unittest
 from unittest import mock
@@ -10,7 +10,7 @@ from algoliasearch import exceptions
 from bob_emploi.data_analysis.importer.deployments.usa import geonames_city_suggest
 
 
-@mock.patch(geonames_city_suggest.__name__ + '.search_client')
+@mock.patch(geonames_city_suggest.algolia.__name__ + '.search_client')
 class UploadTestCase(unittest.TestCase):
     """Integration tests for the upload function."""
 
@@ -79,22 +79,21 @@ class UploadTestCase(unittest.TestCase):
         mock_client = mock_algoliasearch.SearchClient.create()
         mock_client.init_index().save_objects.side_effect = exceptions.AlgoliaException
 
-        output = io.StringIO()
-
         with self.assertRaises(exceptions.AlgoliaException):
-            geonames_city_suggest.upload([
-                '--cities-with-zip', path.join(self.testdata_folder, 'cities_zip.txt'),
-                '--population-by-zip', path.join(
-                    self.testdata_folder, 'population_by_zip_codes.txt'),
-                '--states-fips-codes', path.join(self.testdata_folder, 'usa/states.txt'),
-                '--algolia-api-key', 'my-api-key',
-            ], out=output)
+            with self.assertLogs(level=logging.ERROR) as logged:
+                geonames_city_suggest.upload([
+                    '--cities-with-zip', path.join(self.testdata_folder, 'cities_zip.txt'),
+                    '--population-by-zip', path.join(
+                        self.testdata_folder, 'population_by_zip_codes.txt'),
+                    '--states-fips-codes', path.join(self.testdata_folder, 'usa/states.txt'),
+                    '--algolia-api-key', 'my-api-key',
+                ])
 
         mock_client.move_index.assert_not_called()
         mock_client.init_index().delete.assert_called_once_with()
-        output_value = output.getvalue()
-        self.assertTrue(
-            output_value.startswith('[\n  {\n    "admin2Code": "2013",'), msg=output_value)
+        output_value = logged.records[0].getMessage()
+        self.assertIn('An error occurred while saving to Algolia', output_value)
+        self.assertIn('\n[\n  {\n    "admin2Code": "2013",', output_value)
 
     def test_without_states(self, mock_algoliasearch: mock.MagicMock) -> None:
         """Test not setting the states-fips-codes file parameter."""
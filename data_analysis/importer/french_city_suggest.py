@@ -6,6 +6,9 @@ Check out https://www.algolia.com/api-keys to find such a key.
 docker-compose run --rm -e ALGOLIA_API_KEY=<the key> \
     data-analysis-prepare python \
     bob_emploi/data_analysis/importer/french_city_suggest.py
+
+To only upload the cities that changed since the last upload, set ALGOLIA_CITIES_MANIFEST to
+the path of a file where to keep track of the uploaded cities.
 """
 
 import os
@@ -122,7 +125,8 @@ def upload(batch_size: int = 5000, data_folder: str = 'data') -> None:
         app_id=os.environ.get('ALGOLIA_APP_ID', 'K6ACI9BKKT'),
         api_key=api_key,
         index=os.environ.get('ALGOLIA_CITIES_INDEX', 'cities'),
-        batch_size=batch_size)
+        batch_size=batch_size,
+        manifest_path=os.environ.get('ALGOLIA_CITIES_MANIFEST'))
 
 
 if __name__ == '__main__':
@@ -19,12 +19,18 @@ MONGO_URL environment variable, e.g.
 
 import argparse
 import collections
+from concurrent import futures
+import functools
+import hashlib
+import json
 import logging
 import os
 import re
 import subprocess
+import threading
+import time
 import typing
-from typing import Any, Optional, Set
+from typing import Any, Iterator, Optional, Set
 
 import pymongo
 import sentry_sdk
@@ -34,11 +40,14 @@ import termcolor
 from bob_emploi.data_analysis.importer import deployments
 # Importers should be accessed from the get_importers function, not from importers.
 from bob_emploi.data_analysis.importer import importers
+from bob_emploi.data_analysis.importer import references_index
+from bob_emploi.data_analysis.lib import mongo
 
 _DEFAULT_DEPLOYMENT = os.getenv('BOB_DEPLOYMENT', 'fr')
 
 
-_ARCHIVE_NAME_MATCH = re.compile(r'\.\d{4}-\d\d-\d\d_[0-9a-f]{4,16}$')
+_ARCHIVE_NAME_MATCH = re.compile(
+    r'\.\d{4}-\d\d-\d\d_[0-9a-f]{4,16}(' + re.escape(mongo.CHANGE_LOG_SUFFIX) + ')?$')
 
 # Get mongo URL from the environment.
 _MONGO_URL = os.getenv('MONGO_URL') or ''
@@ -78,6 +87,11 @@ def _is_archive(collection_name: str) -> bool:
     return bool(_ARCHIVE_NAME_MATCH.search(collection_name))
 
 
+def _is_full_archive(collection_name: str) -> bool:
+    return _is_archive(collection_name) and \
+        not collection_name.endswith(mongo.CHANGE_LOG_SUFFIX)
+
+
 def compute_collections_diff(
         all_importers: _ImportersType, db_client: pymongo.database.Database) -> _CollectionsDiff:
     """Determine which collections have been imported and which are missing."""
@@ -194,7 +208,7 @@ def _make_data_targets(importer: importers.Importer) -> bool:
 def _revert_collection(collection_name: str, database: pymongo.database.Database) -> None:
     archived_collections = sorted((
         name for name in database.list_collection_names()
-        if _is_archive(name) and name.startswith(collection_name)), reverse=True)
+        if _is_full_archive(name) and name.startswith(collection_name)), reverse=True)
     if not archived_collections:
         logging.error(
             'No archived version of collection "%s" found, cannot revert.', collection_name)
@@ -207,7 +221,7 @@ def _revert_collection(collection_name: str, database: pymongo.database.Database
 
 
 def _run_importer(
-        importer: importers.Importer, collection_name: str, extra_args: list[str]) -> None:
+        importer: importers.Importer, collection_name: str, extra_args: list[str]) -> bool:
 
     args = collections.OrderedDict(importer.args or {})
     args['mongo_collection'] = collection_name
@@ -226,6 +240,144 @@ def _run_importer(
             collection_name,
             _show_command(err.cmd),
             err.stderr.decode('utf-8'))
+        return False
+    return True
+
+
+def _iterate_files(path: str) -> Iterator[str]:
+    if not os.path.isdir(path):
+        yield path
+        return
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            yield os.path.join(dirpath, filename)
+
+
+def _hash_importer_inputs(importer: importers.Importer) -> Optional[str]:
+    """Compute a hash of the content of all the data files used by an importer.
+
+    Returns:
+        the hash, or None if the importer does not only depend on local data files.
+    """
+
+    data_targets = sorted(_get_importer_targets(importer))
+    if not data_targets:
+        return None
+    hasher = hashlib.sha1()
+    hasher.update(json.dumps([importer.script, importer.args], sort_keys=True).encode('utf-8'))
+    for target in data_targets:
+        if not os.path.exists(target):
+            return None
+        for filename in _iterate_files(target):
+            hasher.update(filename.encode('utf-8'))
+            with open(filename, 'rb') as data_file:
+                for block in iter(functools.partial(data_file.read, 1 << 20), b''):
+                    hasher.update(block)
+    return hasher.hexdigest()
+
+
+class _ImportTiming(typing.NamedTuple):
+    collection_name: str
+    # One of "imported", "skipped" or "failed".
+    status: str
+    make_seconds: float = 0
+    import_seconds: float = 0
+
+
+_TIMING_STATUS_COLORS = {
+    'imported': 'green',
+    'skipped': 'green',
+    'failed': 'red',
+}
+
+
+class _ParallelImporter:
+    """Run several importers in parallel."""
+
+    def __init__(
+            self, all_importers: _ImportersType, extra_args: list[str],
+            db_client: Optional[pymongo.database.Database], *,
+            make_data: bool = False, force: bool = False) -> None:
+        self._all_importers = all_importers
+        self._extra_args = extra_args
+        self._db_client = db_client
+        self._make_data = make_data
+        self._force = force
+        self._meta_info = get_meta_info(db_client) if db_client is not None else {}
+        # Make rules of different targets can share intermediate files (e.g. the pattern rules of
+        # the ROME CSV files), so make is never run in parallel: only the importers are.
+        self._make_lock = threading.Lock()
+
+    def _import_one(self, collection_name: str) -> _ImportTiming:
+        importer = self._all_importers[collection_name]
+        start = time.monotonic()
+        if self._make_data:
+            with self._make_lock:
+                is_made = _make_data_targets(importer)
+            if not is_made:
+                return _ImportTiming(collection_name, 'failed', time.monotonic() - start)
+        make_seconds = time.monotonic() - start
+
+        input_hash = _hash_importer_inputs(importer)
+        if not self._force and input_hash and \
+                self._meta_info.get(collection_name, {}).get('input_hash') == input_hash:
+            logging.info('Inputs of "%s" have not changed, skipping it.', collection_name)
+            return _ImportTiming(collection_name, 'skipped', make_seconds)
+
+        previous_update = self._get_updated_at(collection_name)
+        start = time.monotonic()
+        is_imported = _run_importer(importer, collection_name, self._extra_args)
+        import_seconds = time.monotonic() - start
+        if not is_imported:
+            return _ImportTiming(collection_name, 'failed', make_seconds, import_seconds)
+        if self._db_client is not None and self._get_updated_at(collection_name) != previous_update:
+            # Only record the inputs once they are really imported, and not when the diff was
+            # declined or when the data was already up to date.
+            if input_hash:
+                self._db_client.meta.update_one(
+                    {'_id': collection_name}, {'$set': {'input_hash': input_hash}}, upsert=True)
+            references_index.update_index(self._db_client, collection_name, importer)
+        return _ImportTiming(collection_name, 'imported', make_seconds, import_seconds)
+
+    def _get_updated_at(self, collection_name: str) -> Any:
+        if self._db_client is None:
+            return None
+        meta = self._db_client.meta.find_one({'_id': collection_name}, {'updated_at': 1})
+        return (meta or {}).get('updated_at')
+
+    def run(  # pylint: disable=invalid-name
+            self, collection_names: list[str], max_workers: int) -> list[_ImportTiming]:
+        """Run the importers for the given collections.
+
+        A failure of an importer, even an unexpected error, is reported in its timing, and does
+        not stop the other importers.
+        """
+
+        timings: list[_ImportTiming] = []
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {
+                executor.submit(self._import_one, name): name for name in collection_names}
+            for future in futures.as_completed(running):
+                name = running[future]
+                try:
+                    timings.append(future.result())
+                except Exception:  # pylint: disable=broad-except
+                    logging.exception('Unexpected error while importing "%s".', name)
+                    timings.append(_ImportTiming(name, 'failed'))
+        return timings
+
+
+def _print_timing_report(timings: list[_ImportTiming]) -> None:
+    logging.info('Timing report:')
+    for timing in sorted(
+            timings, key=lambda t: (-t.make_seconds - t.import_seconds, t.collection_name)):
+        logging.info(
+            '\t%s - %s - make: %.1fs - import: %.1fs',
+            _bold(timing.collection_name),
+            termcolor.colored(timing.status, _TIMING_STATUS_COLORS[timing.status]),
+            timing.make_seconds,
+            timing.import_seconds)
 
 
 def _warn_unknown_collection(collection_name: str, all_importers: _ImportersType) -> None:
@@ -332,11 +484,21 @@ def main(string_args: Optional[list[str]] = None) -> None:
     main_action.add_argument(
         '--revert', action='append', help='Return the specified collection to its previous state.',
         choices=collection_names)
+    main_action.add_argument(
+        '--run_all', action='store_true',
+        help='Run the commands to import all the collections, in parallel when possible. '
+        'As several importers run at the same time, you should probably forward the '
+        '--always_accept_diff or --fail_on_diff flag to them.')
 
     parser.add_argument(
         '--make_data', action='store_true', help='Run the make rule to retrieve the needed data.')
+    parser.add_argument(
+        '--jobs', type=int, default=4, help='Maximum number of importers to run in parallel.')
+    parser.add_argument(
+        '--force', action='store_true',
+        help='Run all importers even if their input data has not changed since the last import.')
     args, unknown_args = parser.parse_known_args(main_args)
-    if unknown_args and not args.run:
+    if unknown_args and not args.run and not args.run_all:
         raise argparse.ArgumentError(None, f'Unknown args: {unknown_args}')
 
     db_client = pymongo.MongoClient(_MONGO_URL).get_database() if _MONGO_URL else None
@@ -358,6 +520,18 @@ def main(string_args: Optional[list[str]] = None) -> None:
         except KeyError:
             _warn_unknown_collection(collection_name, all_importers)
 
+    if args.run_all:
+        timings = _ParallelImporter(
+            all_importers, unknown_args, db_client, make_data=args.make_data, force=args.force,
+        ).run(
+            [
+                name for name, importer in sorted(all_importers.items())
+                if importer.is_imported and importer.script and not importer.has_pii
+            ],
+            max_workers=args.jobs)
+        _print_timing_report(timings)
+        return
+
     for collection_name in (args.revert or []):
         if not db_client:
             logging.info('Database is missing')
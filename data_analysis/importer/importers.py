@@ -183,6 +183,9 @@ IMPORTERS = {
         args={
             'stats_filename': 'data/geo/french_cities.csv',
             'urban_context_filename': 'data/geo/french_urban_areas.xls',
+            'data_folder': 'data',
+            'urban_entities_filename': 'data/geo/french_urban_entities.xls',
+            'transport_scores_filename': 'data/geo/ville-ideale-transports.html',
         },
         is_imported=True,
         run_every=None,
@@ -32,7 +32,10 @@ _REQUIRED_FIELDS = frozenset([
 ])
 
 
-class _EvolutionCounter:
+class EvolutionCounter:
+    """Count job offers per year for each bucket (département x job group)."""
+
+    required_fields = _REQUIRED_FIELDS
 
     def __init__(self, last_year: int):
         self._last_year = last_year
@@ -49,6 +52,11 @@ class _EvolutionCounter:
         bucket_id = f'{job_offer.departement_code}:{job_offer.rome_profession_card_code}'
         self.offers_per_year[bucket_id][year] += 1
 
+    def get_dicts(self) -> list[dict[str, Any]]:
+        """Gets the changes per bucket as LocalJobStats JSON-proto compatible dicts."""
+
+        return list(self.get_proto_dicts())
+
     def get_proto_dicts(self) -> Iterator[dict[str, Any]]:
         """Gets the changes per bucket (département x job group).
 
@@ -85,11 +93,9 @@ def csv2dicts(job_offers_csv: str, colnames_txt: str, last_year: str = '2015') \
         Evolution data as a LocalJobStats JSON-proto compatible dict.
     """
 
-    counter = _EvolutionCounter(int(last_year))
-    for job_offer in job_offers.iterate(
-            job_offers_csv, colnames_txt, _REQUIRED_FIELDS):
-        counter.collect(job_offer)
-    return list(counter.get_proto_dicts())
+    counter = EvolutionCounter(int(last_year))
+    job_offers.scan(job_offers_csv, colnames_txt, [counter])
+    return counter.get_dicts()
 
 
 if __name__ == '__main__':
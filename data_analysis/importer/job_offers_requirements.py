@@ -23,14 +23,12 @@ import logging
 import typing
 from typing import Any, Iterator, Optional, Tuple
 
-import tqdm
-
 from bob_emploi.frontend.api import job_pb2
 from bob_emploi.data_analysis.lib import job_offers
 from bob_emploi.data_analysis.lib import mongo
 
 # Total number of job offers that we have in our "standard" input.
-_TOTAL_RECORDS = 11170764
+_TOTAL_RECORDS = job_offers.TOTAL_RECORDS_ESTIMATE
 
 # Minimum ratio of job offers for a driving license to be considered as a
 # suggestion for the whole job group.
@@ -423,6 +421,29 @@ class _RequirementsCollector:
             }
 
 
+class RequirementsAggregator:
+    """Aggregate requirements from job offers per job group."""
+
+    required_fields = _REQUIRED_FIELDS
+
+    def __init__(self) -> None:
+        self._job_groups: dict[str, _RequirementsCollector] = \
+            collections.defaultdict(_RequirementsCollector)
+
+    def collect(self, job_offer: 'job_offers._JobOffer') -> None:
+        """Collect requirements from a job offer."""
+
+        if job_offer.rome_profession_card_code:
+            self._job_groups[job_offer.rome_profession_card_code].collect(job_offer)
+
+    def get_dicts(self) -> list[dict[str, Any]]:
+        """Gets the requirements per job group as JobRequirements JSON-proto compatible dicts."""
+
+        return [
+            dict(self._job_groups[job_group_id].get_proto_dict(), _id=job_group_id)
+            for job_group_id in sorted(self._job_groups)]
+
+
 def csv2dicts(job_offers_csv: str, colnames_txt: str) -> list[dict[str, Any]]:
     """Import the requirement from job offers grouped by Job Group in MongoDB.
 
@@ -433,14 +454,9 @@ def csv2dicts(job_offers_csv: str, colnames_txt: str) -> list[dict[str, Any]]:
         Requirements as a JobRequirements JSON-proto compatible dict.
     """
 
-    job_groups: dict[str, _RequirementsCollector] = collections.defaultdict(_RequirementsCollector)
-    all_job_offers = job_offers.iterate(job_offers_csv, colnames_txt, _REQUIRED_FIELDS)
-    for job_offer in tqdm.tqdm(all_job_offers, total=_TOTAL_RECORDS):
-        if job_offer.rome_profession_card_code:
-            job_groups[job_offer.rome_profession_card_code].collect(job_offer)
-    return [
-        dict(job_groups[job_group_id].get_proto_dict(), _id=job_group_id)
-        for job_group_id in sorted(job_groups)]
+    aggregator = RequirementsAggregator()
+    job_offers.scan(job_offers_csv, colnames_txt, [aggregator], total=_TOTAL_RECORDS)
+    return aggregator.get_dicts()
 
 
 if __name__ == '__main__':
@@ -33,6 +33,7 @@ import pandas
 
 from bob_emploi.data_analysis.lib import cleaned_data
 from bob_emploi.frontend.api import job_pb2
+from bob_emploi.data_analysis.lib import market_score_derivatives
 from bob_emploi.data_analysis.lib import mongo
 from bob_emploi.data_analysis.lib import read_data
 
@@ -407,44 +408,47 @@ def _get_less_stressful_job_groups(data_folder: str, mobility_csv: str, market_s
 
     mobility = cleaned_data.rome_job_groups_mobility(data_folder, filename=mobility_csv)
     market_stats = cleaned_data.market_scores(filename=market_score_csv)
-    market_stats_dept = market_stats[market_stats.AREA_TYPE_CODE == 'D']
-
-    # Extend ROME mobility with IMT market scores.
-    scored_mobility = mobility.merge(
-        market_stats_dept.market_score.reset_index(),
-        left_on='source_rome_id',
-        right_on='rome_id')
-    scored_mobility = scored_mobility.join(
-        market_stats_dept,
-        on=['target_rome_id', 'departement_id'],
-        how='inner',
-        lsuffix='_source')
+    market_stats_dept = market_stats[market_stats.AREA_TYPE_CODE == 'D'].reset_index()
 
     # Keep only the 5 best reorientations per market.
     # TODO(cyrille): Keep worse reorientation market, to give a whole panel in stats page
     # but verify first that this won't affect the methods and filters using this.
-    best_reorientations = scored_mobility[
-        scored_mobility.market_score >= 1.5 * scored_mobility.market_score_source]\
-        .sort_values('market_score', ascending=False)\
-        .groupby(['rome_id', 'departement_id'])\
-        .apply(lambda x: x[:5].to_dict(orient='records'))\
-        .to_frame('orientations').reset_index()
-
-    return pandas.DataFrame([
-        {
-            'local_id': f'{r.departement_id}:{r.rome_id}',
-            'lessStressfulJobGroups': [{
-                'jobGroup': {'romeId': o['target_rome_id'], 'name': o['target_rome_name']},
-                'mobilityType': o['mobility_type'],
-                'localStats': {
-                    'imt': {
-                        'yearlyAvgOffersPer10Candidates': o['yearly_avg_offers_per_10_candidates'],
-                        'yearlyAvgOffersDenominator': o['yearly_avg_offers_denominator']
-                    },
+    switches = market_score_derivatives.get_better_markets(
+        market_stats_dept.rename(columns={'rome_id': 'job_group', 'departement_id': 'district_id'}),
+        mobility.rename(columns={
+            'source_rome_id': 'job_group',
+            'target_rome_id': 'target_job_group',
+        }),
+        lambda score, target_score: target_score >= 1.5 * score)
+    markets = switches.market.to_numpy()
+    jumps = switches.jump.to_numpy()
+    target_markets = switches.target_market.to_numpy()
+
+    orientations: dict[str, list[dict[str, Any]]] = {}
+    for local_id, rome_id, rome_name, mobility_type, offers_per_10_candidates, denominator in zip(
+            (market_stats_dept.departement_id + ':' + market_stats_dept.rome_id)
+            .to_numpy()[markets].tolist(),
+            mobility.target_rome_id.to_numpy()[jumps].tolist(),
+            mobility.target_rome_name.to_numpy()[jumps].tolist(),
+            mobility.mobility_type.to_numpy()[jumps].tolist(),
+            market_stats_dept.yearly_avg_offers_per_10_candidates.to_numpy()[target_markets]
+            .tolist(),
+            market_stats_dept.yearly_avg_offers_denominator.to_numpy()[target_markets].tolist()):
+        orientations.setdefault(local_id, []).append({
+            'jobGroup': {'romeId': rome_id, 'name': rome_name},
+            'mobilityType': mobility_type,
+            'localStats': {
+                'imt': {
+                    'yearlyAvgOffersPer10Candidates': offers_per_10_candidates,
+                    'yearlyAvgOffersDenominator': denominator,
                 },
-            } for o in r.orientations],
-        }
-        for unused_index, r in best_reorientations.iterrows()])
+            },
+        })
+
+    return pandas.DataFrame({
+        'local_id': list(orientations),
+        'lessStressfulJobGroups': list(orientations.values()),
+    })
 
 
 def _get_less_stressful_departements_count(market_score_csv: str) -> pandas.DataFrame:
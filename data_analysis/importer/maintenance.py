@@ -11,20 +11,27 @@ Run it regularly with the command:
 
 # TODO(pascal): Send the results to slack.
 import argparse
+import collections
+from concurrent import futures
+import datetime
 import json
 import logging
 import re
 import os
+import time
 import typing
 from typing import ItemsView, Iterable, Iterator, Optional, Set, Tuple, TypedDict
+from urllib import parse
 
 from airtable import airtable
 import pymongo
 import requests
+from requests import adapters
 import tqdm
 
 from bob_emploi.data_analysis.importer import importers
 from bob_emploi.data_analysis.importer import import_status
+from bob_emploi.data_analysis.importer import references_index
 from bob_emploi.common.python import checker
 from bob_emploi.frontend.api import options_pb2
 from bob_emploi.frontend.server import scoring
@@ -54,6 +61,14 @@ _HTTP_HEADERS = {
         'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 '
         '(KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36')
 }
+# Number of URLs checked in parallel.
+_NUM_URL_WORKERS = 16
+# Max number of requests sent in parallel to the same website.
+_MAX_REQUESTS_PER_HOST = 2
+# Timeouts to connect to and read from websites, in seconds.
+_URL_TIMEOUT = (10, 30)
+# Duration during which a link that was checked successfully is not checked again.
+_URL_CACHE_TTL = datetime.timedelta(days=7)
 
 
 class MongoReference(typing.NamedTuple):
@@ -96,17 +111,40 @@ def _iterate_all_records(
                 collection, field_type, field_name)
 
 
+def _iterate_indexed_records(
+        mongo_db: pymongo.database.Database,
+        field_format: 'options_pb2.StringFormat.V', field_type: str) -> Iterator[MongoReference]:
+    """Same as _iterate_all_records, but only rescan the collections imported since last time."""
+
+    db_collections = set(mongo_db.list_collection_names())
+    for collection, importer in import_status.get_importers().items():
+        if not any(references_index.list_formatted_fields(importer, field_format)):
+            continue
+        if collection not in db_collections:
+            logging.error('The collection "%s" does not exist.', collection)
+            continue
+        for field_name, has_field, values in references_index.get_field_references(
+                mongo_db, collection, importer, field_format):
+            if not has_field:
+                logging.error('The collection "%s" has no field "%s".', collection, field_name)
+                continue
+            if not values:
+                logging.error(
+                    'The collection "%s" has no %ss in its field "%s"',
+                    collection, field_type, field_name)
+                continue
+            for field_value, record_id in values:
+                yield MongoReference(collection, field_name, field_value, record_id)
+
+
 def _iterate_translations_templates(mongo_db: pymongo.database.Database) \
         -> Iterator[MongoReference]:
     if 'translations' not in set(mongo_db.list_collection_names()):
         logging.error('The database doe not contains any "translations" collection.')
         return
-    for record in mongo_db.translations.find({}):
-        record.pop('_id')
-        string = record.pop('string')
-        for lang, translation in record.items():
-            if isinstance(translation, str) and '%' in translation:
-                yield MongoReference('translations', lang, translation, string)
+    for template in references_index.get_translation_templates(mongo_db):
+        yield MongoReference(
+            'translations', template['lang'], template['template'], template['string'])
 
 
 def _is_application_internal_url(url: str) -> bool:
@@ -116,11 +154,9 @@ def _is_application_internal_url(url: str) -> bool:
 def check_scoring_models(mongo_db: pymongo.database.Database) -> None:
     """Check that all scoring models are valid and warn on unused ones."""
 
-    scoring_model_fields = \
-        _list_formatted_fields(import_status.get_importers().items(), options_pb2.SCORING_MODEL_ID)
-
     used_scoring_models = set()
-    records = list(_iterate_all_records(mongo_db, scoring_model_fields, 'scoring model'))
+    records = list(
+        _iterate_indexed_records(mongo_db, options_pb2.SCORING_MODEL_ID, 'scoring model'))
     for collection, unused_field, field_value, record_id in tqdm.tqdm(records):
         if isinstance(field_value, list):
             field_values = field_value
@@ -144,12 +180,8 @@ def _list_formatted_fields(
         all_importers: ItemsView[str, importers.Importer],
         field_format: 'options_pb2.StringFormat.V') -> Iterator[_MongoField]:
     for collection_name, importer in all_importers:
-        if not importer.proto_type:
-            continue
-        for field in importer.proto_type.DESCRIPTOR.fields_by_name.values():
-            field_string_formats = field.GetOptions().Extensions[options_pb2.string_format]
-            if field_format in field_string_formats:
-                yield _MongoField(collection_name, field.camelcase_name)
+        for field_name in references_index.list_formatted_fields(importer, field_format):
+            yield _MongoField(collection_name, field_name)
 
 
 # A quick URL pattern to find URLs inside our strings.
@@ -157,11 +189,41 @@ _URL_PATTERN = re.compile(r'https?://[^\s\(\)\<\>]+')
 
 
 class _UrlSiteChecker:
-    """A class to check that websites are still up."""
-
-    def __init__(self) -> None:
-        self._checked: dict[str, Optional[str]] = {}
+    """A class to check that websites are still up.
+
+    URLs are collected first with their references, then each distinct URL is checked once, in
+    parallel, and errors are reported for each reference. The URLs of a host are split in at most
+    max_requests_per_host lanes that are checked one URL after the other, so that a slow host never
+    blocks the workers checking other hosts.
+    """
+
+    def __init__(
+            self, *, num_workers: int = _NUM_URL_WORKERS,
+            max_requests_per_host: int = _MAX_REQUESTS_PER_HOST,
+            cache_json: Optional[str] = None,
+            cache_ttl: datetime.timedelta = _URL_CACHE_TTL) -> None:
+        self._references: list[Tuple[str, str]] = []
         self._valid_url_checker = checker.UrlChecker()
+        self._num_workers = num_workers
+        self._max_requests_per_host = max_requests_per_host
+        self._session = requests.Session()
+        adapter = adapters.HTTPAdapter(pool_connections=num_workers, pool_maxsize=num_workers)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._cache_json = cache_json
+        self._cache_ttl = cache_ttl
+        # Timestamps of the last successful check of each URL.
+        self._checked_at: dict[str, float] = {}
+        if cache_json:
+            try:
+                with open(cache_json, encoding='utf-8') as cache_file:
+                    self._checked_at = json.load(cache_file)
+            except (OSError, ValueError):
+                pass
+
+    def _request(self, method: str, url: str) -> requests.Response:
+        return self._session.request(
+            method, url, headers=_HTTP_HEADERS, timeout=_URL_TIMEOUT, allow_redirects=True)
 
     def _check(self, url: str) -> Optional[str]:
         try:
@@ -170,7 +232,16 @@ class _UrlSiteChecker:
             return 'Malformed URL'
 
         try:
-            res = requests.get(url, headers=_HTTP_HEADERS)
+            # Try a light HEAD request first, some websites do not handle it properly though.
+            if self._request('HEAD', url).status_code == 200:
+                return None
+        except requests.exceptions.SSLError:
+            return None
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+        try:
+            res = self._request('GET', url)
             if res.status_code != 200:
                 return f'HTTP Error {res.status_code} while trying to access the URL'
         except requests.exceptions.SSLError:
@@ -181,28 +252,72 @@ class _UrlSiteChecker:
 
         return None
 
-    def check_url(self, url: str, reason: str) -> None:
-        """Check that an URL is valid and is linking to an existing website."""
+    def _check_lane(self, urls: list[str]) -> list[Tuple[str, Optional[str]]]:
+        return [(url, self._check(url)) for url in urls]
 
-        if _is_application_internal_url(url):
-            return
+    def _split_in_lanes(self, urls: Iterable[str]) -> list[list[str]]:
+        urls_by_host: dict[str, list[str]] = collections.defaultdict(list)
+        for url in urls:
+            urls_by_host[parse.urlparse(url).netloc].append(url)
+        lanes = [
+            host_urls[lane_index::self._max_requests_per_host]
+            for host_urls in urls_by_host.values()
+            for lane_index in range(min(len(host_urls), self._max_requests_per_host))
+        ]
+        # Start with the longest lanes, so that they do not end up running alone at the end.
+        return sorted(lanes, key=len, reverse=True)
 
-        if url in self._checked:
-            result = self._checked[url]
-        else:
-            result = self._check(url)
-            self._checked[url] = result
+    def _is_recently_checked(self, url: str, instant: float) -> bool:
+        return instant - self._checked_at.get(url, 0) < self._cache_ttl.total_seconds()
+
+    def add_url(self, url: str, reason: str) -> None:
+        """Add an URL to check that it is valid and is linking to an existing website."""
 
-        if not result:
+        if _is_application_internal_url(url):
             return
 
-        logging.error('%s %s:\n%s', result, reason, url)
+        self._references.append((url, reason))
 
-    def check_string(self, string: str, reason: str) -> None:
-        """Find all URLs in string and checkt that they are linking to an existing website."""
+    def add_string(self, string: str, reason: str) -> None:
+        """Add all URLs in string to check that they are linking to an existing website."""
 
         for url in _URL_PATTERN.finditer(string):
-            self.check_url(url.group(), reason)
+            self.add_url(url.group(), reason)
+
+    def check_all(self) -> None:
+        """Check all distinct URLs added so far and log an error for each invalid reference."""
+
+        instant = time.time()
+        urls = [
+            url for url in dict.fromkeys(url for url, unused_reason in self._references)
+            if not self._is_recently_checked(url, instant)]
+
+        results: dict[str, Optional[str]] = {}
+        with futures.ThreadPoolExecutor(max_workers=self._num_workers) as executor:
+            lanes = [
+                executor.submit(self._check_lane, lane) for lane in self._split_in_lanes(urls)]
+            for lane in tqdm.tqdm(futures.as_completed(lanes)):
+                results.update(lane.result())
+
+        for url, reason in self._references:
+            result = results.get(url)
+            if result:
+                logging.error('%s %s:\n%s', result, reason, url)
+        self._references = []
+
+        if not self._cache_json:
+            return
+        for url, result in results.items():
+            if not result:
+                self._checked_at[url] = instant
+        self._checked_at = {
+            url: checked_at for url, checked_at in self._checked_at.items()
+            if self._is_recently_checked(url, instant)
+        }
+        tmp_cache_json = f'{self._cache_json}.tmp'
+        with open(tmp_cache_json, 'wt', encoding='utf-8') as cache_file:
+            json.dump(self._checked_at, cache_file)
+        os.replace(tmp_cache_json, self._cache_json)
 
 
 class _ClientURL(TypedDict):
@@ -211,31 +326,41 @@ class _ClientURL(TypedDict):
 
 
 def check_urls(
-        mongo_db: pymongo.database.Database, *, client_urls_json: Optional[str] = None) -> None:
-    """Check that all links are valid."""
+        mongo_db: pymongo.database.Database, *, client_urls_json: Optional[str] = None,
+        url_cache_json: Optional[str] = None) -> None:
+    """Check that all links are valid.
+
+    Args:
+        mongo_db: the database with the collections to check.
+        client_urls_json: path to a JSON file containing the URLs used on the client.
+        url_cache_json: path to a JSON file where to keep the links that were checked
+            successfully, so that they are not checked again in the next runs.
+    """
 
     url_fields = _list_formatted_fields(
         import_status.get_importers().items(), options_pb2.URL_FORMAT)
-    url_checker = _UrlSiteChecker()
+    url_checker = _UrlSiteChecker(cache_json=url_cache_json)
 
-    records = list(_iterate_all_records(mongo_db, url_fields, 'link'))
-    for collection, unused_field, url, record_id in tqdm.tqdm(records):
-        url_checker.check_url(url, f' of record "{record_id}" in collection "{collection}"')
+    for collection, unused_field, url, record_id in _iterate_all_records(
+            mongo_db, url_fields, 'link'):
+        url_checker.add_url(url, f' of record "{record_id}" in collection "{collection}"')
 
-    translations_with_urls = list(mongo_db.translations.find(
+    translations_with_urls = mongo_db.translations.find(
         {'string': re.compile('http')},
-        {'string': 1, 'origin': 1, 'origin_id': 1}))
+        {'string': 1, 'origin': 1, 'origin_id': 1})
 
-    for doc in tqdm.tqdm(translations_with_urls):
-        url_checker.check_string(
+    for doc in translations_with_urls:
+        url_checker.add_string(
             doc['string'],
             f'in string to translate "{doc.get("origin", "")}/{doc.get("origin_id", "")}"')
 
     if client_urls_json:
         with open(client_urls_json, encoding='utf-8') as client_urls_file:
             client_urls: list[_ClientURL] = json.load(client_urls_file)
-        for client_url in tqdm.tqdm(client_urls):
-            url_checker.check_url(client_url['url'], f'in file "{client_url["file"]}"')
+        for client_url in client_urls:
+            url_checker.add_url(client_url['url'], f'in file "{client_url["file"]}"')
+
+    url_checker.check_all()
 
 
 def _get_variables_from(template: str) -> Set[str]:
@@ -264,11 +389,10 @@ def check_template_variables(mongo_db: pymongo.database.Database) -> None:
             "AIRTABLE_API_KEY is not set. The used variables won't be uploaded to airtable.")
     template_checker = checker.MissingTemplateVarsChecker()
     unused_vars = set(scoring.scoring_base._TEMPLATE_VARIABLES.keys())  # pylint: disable=protected-access
-    template_fields = _list_formatted_fields(
-        import_status.get_importers().items(), options_pb2.SCORING_PROJECT_TEMPLATE)
 
     # TODO(cyrille): Also check strings from server.
-    records = list(_iterate_all_records(mongo_db, template_fields, 'template')) + \
+    records = list(
+        _iterate_indexed_records(mongo_db, options_pb2.SCORING_PROJECT_TEMPLATE, 'template')) + \
         list(_iterate_translations_templates(mongo_db))
     for collection, field_name, template, record_id in tqdm.tqdm(records):
         try:
@@ -323,6 +447,10 @@ def main(string_args: Optional[list[str]] = None) -> None:
     parser.add_argument(
         '--client_urls_json',
         help='Path to a JSON file containing the URLs used on the client. See extract_urls.ts.')
+    parser.add_argument(
+        '--url_cache_json',
+        help='Path to a JSON file where to keep the links checked successfully, so that they are '
+        'not checked again in the next runs.')
     args = parser.parse_args(string_args)
     for deployment, mongo_url, users_mongo_url in args.deployment:
         logging.info('Running maintenance on deployment "%s".', deployment)
@@ -338,7 +466,9 @@ def main(string_args: Optional[list[str]] = None) -> None:
         if not args.checks or 'scoring-models' in args.checks:
             check_scoring_models(mongo_db)
         if not args.checks or 'URLs' in args.checks:
-            check_urls(mongo_db, client_urls_json=args.client_urls_json)
+            check_urls(
+                mongo_db, client_urls_json=args.client_urls_json,
+                url_cache_json=args.url_cache_json)
         if not args.checks or 'template-variables' in args.checks:
             check_template_variables(mongo_db)
 
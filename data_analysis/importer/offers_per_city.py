@@ -18,8 +18,10 @@ import collections
 import math
 import sys
 import typing
-from typing import Any, Iterable
+from typing import Any, Optional
 
+import numpy as np
+import pandas as pd
 import tqdm
 
 from bob_emploi.data_analysis.lib import cleaned_data
@@ -33,7 +35,14 @@ _JOB_GROUP_CODE_FIELD = 'rome_profession_card_code'
 _LATITUDE_CODE_FIELD = 'latitude'
 _LONGITUDE_CODE_FIELD = 'longitude'
 _CITY_NAME_CODE_FIELD = 'city_name'
-_TOTAL_RECORDS = 11170764
+_CREATION_DATE_FIELD = 'creation_date'
+_DEPARTEMENT_CODE_FIELD = 'departement_code'
+_FIELDS = (
+    _CREATION_DATE_FIELD, _CITY_CODE_FIELD, _CITY_NAME_CODE_FIELD, _DEPARTEMENT_CODE_FIELD,
+    _JOB_GROUP_CODE_FIELD, _LATITUDE_CODE_FIELD, _LONGITUDE_CODE_FIELD)
+_TOTAL_RECORDS = job_offers.TOTAL_RECORDS_ESTIMATE
+# Number of offers processed at once.
+_CHUNK_SIZE = 100_000
 
 
 class _CityData(typing.NamedTuple):
@@ -44,101 +53,124 @@ class _CityData(typing.NamedTuple):
 
 def _add_population_data(
         city_info: dict[str, dict[str, Any]], data_folder: str) -> None:
-    french_city_stats = cleaned_data.french_city_stats(data_folder)
-    for city_code in city_info:
-        try:
-            city_info[city_code]['population'] = int(french_city_stats.loc[city_code, 'population'])
-        except (ValueError, KeyError):
-            city_info[city_code]['population'] = 0
-
-
-def _list_hiring_cities(
-        offers_rows: Iterable['job_offers._JobOffer'], min_creation_date: str,
-        data_folder: str) -> _CityData:
-    """Segmenting the data into three dictionaries."""
-
-    french_cities = cleaned_data.french_cities(data_folder, unique=True)
-    french_cities.loc[french_cities.current_city_id.isnull(), 'current_city_id'] = \
-        french_cities[french_cities.current_city_id.isnull()].index
-
-    job_group_to_city_ids: dict[str, dict[str, int]] = \
-        collections.defaultdict(lambda: collections.defaultdict(int))
-    offers_per_job_group: dict[str, int] = collections.defaultdict(int)
-    city_info: dict[str, Any] = {}
-    bad_format_records = 0
-
-    for offer in tqdm.tqdm(offers_rows, total=_TOTAL_RECORDS, file=sys.stdout):
-        if offer.creation_date < min_creation_date:
-            continue
-
-        city_name = offer.city_name
-        city_code = offer.city_code
-        departement_id = offer.departement_code
-        job_group_code = offer.rome_profession_card_code
-        latitude = offer.latitude
-        longitude = offer.longitude
-
-        if 'NULL' in (city_code, job_group_code, latitude, longitude):
-            bad_format_records += 1
-            continue
-
-        # Try to remove the arrondissement and find current city ids.
-        try:
-            city_code = str(french_cities.loc[city_code, 'current_city_id'])
-        except KeyError:
-            pass
-
-        try:
-            latitude = float(latitude)
-            longitude = float(longitude)
-        except ValueError:
-            bad_format_records += 1
-            continue
-
-        offers_per_job_group[job_group_code] += 1
-        if city_code not in city_info:
-            try:
-                city_name = french_cities.loc[city_code, 'name']
-            except KeyError:
-                pass
-            if not city_name or city_name == 'NULL':
-                continue
-            city_info[city_code] = {
-                'cityId': city_code,
+    populations = cleaned_data.french_city_stats(data_folder).population.to_dict()
+    for city_code, info in city_info.items():
+        info['population'] = int(populations.get(city_code, 0))
+
+
+class HiringCitiesAggregator:
+    """Collect the number of offers per city for each job group.
+
+    Offers are counted by chunks: either given directly as DataFrames with collect_frame, or
+    buffered when collected one by one.
+    """
+
+    required_fields = frozenset(_FIELDS)
+
+    def __init__(self, min_creation_date: str, data_folder: str = 'data') -> None:
+        self._min_creation_date = min_creation_date
+        self._data_folder = data_folder
+        french_cities = cleaned_data.french_cities(data_folder, unique=True)
+        current_city_ids = french_cities.current_city_id\
+            .fillna(french_cities.index.to_series())\
+            .astype(str)
+        # Plain dicts are much faster than pandas label lookups.
+        self._current_city_ids: dict[str, str] = dict(zip(french_cities.index, current_city_ids))
+        self._city_names: dict[str, str] = french_cities.name.dropna().to_dict()
+        self._job_group_to_city_ids: dict[str, dict[str, int]] = \
+            collections.defaultdict(lambda: collections.defaultdict(int))
+        self._offers_per_job_group: dict[str, int] = collections.defaultdict(int)
+        self._city_info: dict[str, Any] = {}
+        self._pending_offers: list[tuple[Optional[str], ...]] = []
+        self.bad_format_records = 0
+
+    def collect(self, offer: 'job_offers._JobOffer') -> None:
+        """Count an offer in its city and job group."""
+
+        self._pending_offers.append(tuple(getattr(offer, field) for field in _FIELDS))
+        if len(self._pending_offers) >= _CHUNK_SIZE:
+            self._collect_pending_offers()
+
+    def _collect_pending_offers(self) -> None:
+        if not self._pending_offers:
+            return
+        self.collect_frame(pd.DataFrame(self._pending_offers, columns=_FIELDS))
+        self._pending_offers = []
+
+    def collect_frame(self, offers: pd.DataFrame) -> None:
+        """Count a chunk of offers, given with one column of strings per required field.
+
+        Offers must be given in the order of the file: the first offer with a name for a city
+        defines its info.
+        """
+
+        offers = offers.fillna('NULL')
+        offers = offers[offers[_CREATION_DATE_FIELD] >= self._min_creation_date]
+        is_valid = (offers[[
+            _CITY_CODE_FIELD, _JOB_GROUP_CODE_FIELD, _LATITUDE_CODE_FIELD, _LONGITUDE_CODE_FIELD,
+        ]] != 'NULL').all(axis=1)
+        latitudes = pd.to_numeric(offers[_LATITUDE_CODE_FIELD].where(is_valid), errors='coerce')
+        longitudes = pd.to_numeric(offers[_LONGITUDE_CODE_FIELD].where(is_valid), errors='coerce')
+        is_valid &= latitudes.notna() & longitudes.notna()
+        self.bad_format_records += int((~is_valid).sum())
+
+        offers = pd.DataFrame({
+            # Remove the arrondissements and use current city IDs.
+            'city_id': offers[_CITY_CODE_FIELD].map(self._current_city_ids)
+            .fillna(offers[_CITY_CODE_FIELD]),
+            'job_group': offers[_JOB_GROUP_CODE_FIELD],
+            'departement_id': offers[_DEPARTEMENT_CODE_FIELD],
+            'name': offers[_CITY_NAME_CODE_FIELD],
+            'latitude': latitudes,
+            'longitude': longitudes,
+        })[is_valid].reset_index(drop=True)
+        offers['name'] = offers.city_id.map(self._city_names).fillna(offers.name)
+
+        for job_group, num_offers in offers.job_group.value_counts(sort=False).items():
+            self._offers_per_job_group[job_group] += int(num_offers)
+
+        # Offers are only counted from the first offer with a name in their city.
+        is_known_city = offers.city_id.isin(list(self._city_info))
+        new_cities = offers[~is_known_city & (offers.name != '') & (offers.name != 'NULL')]\
+            .drop_duplicates('city_id')
+        first_positions = offers.city_id.map(pd.Series(new_cities.index, index=new_cities.city_id))
+        first_positions[is_known_city] = 0
+        is_counted = np.arange(len(offers.index)) >= first_positions
+
+        for city_id, departement_id, name, latitude, longitude in zip(
+                new_cities.city_id.tolist(), new_cities.departement_id.tolist(),
+                new_cities.name.tolist(), new_cities.latitude.tolist(),
+                new_cities.longitude.tolist()):
+            self._city_info[city_id] = {
+                'cityId': city_id,
                 'departementId': departement_id,
-                'name': city_name,
+                'name': name,
                 'latitude': latitude,
                 'longitude': longitude,
             }
-        job_group_to_city_ids[job_group_code][city_code] += 1
-
-    _add_population_data(city_info, data_folder)
 
-    return _CityData(
-        job_group_to_city_ids=job_group_to_city_ids,
-        offers_per_job_group=offers_per_job_group,
-        city_info=city_info)
+        counts = offers[is_counted].groupby(['job_group', 'city_id'], sort=False).size()
+        for (job_group, city_id), num_offers in zip(counts.index.tolist(), counts.tolist()):
+            self._job_group_to_city_ids[job_group][city_id] += num_offers
 
+    def get_city_data(self) -> _CityData:
+        """Get the data collected so far, segmented in three dictionaries."""
 
-def extract_offers_per_cities(
-        offers_file: str, colnames: str, min_creation_date: str, data_folder: str = 'data') \
-        -> list[dict[str, Any]]:
-    """Extract the interesting cities in terms of number of offers for each job group.
+        self._collect_pending_offers()
+        _add_population_data(self._city_info, self._data_folder)
 
-    Args:
-        offers_file: path of cvs file with offers.
-        colnames: the names of the columns in the offer file.
-        min_creation_date: the date from which we consider the offers.
-    """
+        return _CityData(
+            job_group_to_city_ids=self._job_group_to_city_ids,
+            offers_per_job_group=self._offers_per_job_group,
+            city_info=self._city_info)
 
-    required_fields = {
-        _CITY_CODE_FIELD, _JOB_GROUP_CODE_FIELD, _LATITUDE_CODE_FIELD,
-        _LONGITUDE_CODE_FIELD, _CITY_NAME_CODE_FIELD}
+    def get_dicts(self) -> list[dict[str, Any]]:
+        """Get the kept cities per job group as HiringCities JSON-proto compatible dicts."""
 
-    offers_rows = job_offers.iterate(offers_file, colnames, required_fields)
+        return _compute_hiring_cities(self.get_city_data())
 
-    city_data = _list_hiring_cities(offers_rows, min_creation_date, data_folder)
 
+def _compute_hiring_cities(city_data: _CityData) -> list[dict[str, Any]]:
     # Computing the threshold per job group.
     job_group_threshold: dict[str, float] = collections.defaultdict(float)
     for job_group, offers in city_data.offers_per_job_group.items():
@@ -167,5 +199,25 @@ def extract_offers_per_cities(
         for job_group_id, job_group_weighted_cities in job_group_to_kept_cities.items()]
 
 
+def extract_offers_per_cities(
+        offers_file: str, colnames: str, min_creation_date: str, data_folder: str = 'data') \
+        -> list[dict[str, Any]]:
+    """Extract the interesting cities in terms of number of offers for each job group.
+
+    Args:
+        offers_file: path of cvs file with offers.
+        colnames: the names of the columns in the offer file.
+        min_creation_date: the date from which we consider the offers.
+    """
+
+    aggregator = HiringCitiesAggregator(min_creation_date, data_folder)
+    chunks = job_offers.iterate_chunks(
+        offers_file, colnames, aggregator.required_fields, chunk_size=_CHUNK_SIZE)
+    for offers in tqdm.tqdm(
+            chunks, total=math.ceil(_TOTAL_RECORDS / _CHUNK_SIZE), file=sys.stdout):
+        aggregator.collect_frame(offers)
+    return aggregator.get_dicts()
+
+
 if __name__ == '__main__':
     mongo.importer_main(extract_offers_per_cities, 'hiring_cities')
@@ -0,0 +1,114 @@
+"""Benchmark the computation of hiring cities on a synthetic job offers extract.
+
+A job offers extract with only the fields needed by offers_per_city is generated with random
+offers in the cities of the data folder. Hiring cities are then computed from chunks read by
+pandas, and from offers scanned one by one (as in job_offers_scan), and both results are checked
+to be the same.
+
+To use it:
+    docker-compose run --rm data-analysis-prepare \
+        python bob_emploi/data_analysis/importer/offers_per_city_benchmark.py \
+        --num_offers 5000000
+"""
+
+import argparse
+import os
+from os import path
+import random
+import tempfile
+import time
+from typing import Optional, Sequence
+
+from bob_emploi.data_analysis.importer import offers_per_city
+from bob_emploi.data_analysis.lib import cleaned_data
+from bob_emploi.data_analysis.lib import job_offers
+
+_COLUMN_NAMES = (
+    'id_offre', 'rome_profession_card_code', 'creation_date', 'departement_code', 'city_code',
+    'city_name', 'latitude', 'longitude')
+
+
+def _write_extract(
+        offers_csv: str, colnames_txt: str, num_offers: int, data_folder: str,
+        num_job_groups: int) -> None:
+    """Write a synthetic job offers extract with random offers."""
+
+    city_ids = sorted(cleaned_data.french_cities(data_folder, unique=True).index)
+    # Some cities that are unknown in the reference table.
+    city_ids.extend(f'{index:05d}X' for index in range(len(city_ids) // 20 + 1))
+    job_groups = [
+        f'{chr(ord("A") + index % 14)}{1100 + index:04d}' for index in range(num_job_groups)]
+    rand = random.Random(42)
+
+    with open(colnames_txt, 'wt', encoding='utf-8') as colnames_file:
+        colnames_file.write('\n'.join(_COLUMN_NAMES) + '\n')
+    with open(offers_csv, 'wt', encoding='latin-1') as offers_file:
+        for index in range(num_offers):
+            city_id = rand.choice(city_ids)
+            is_null = rand.random() < .01
+            offers_file.write('|'.join((
+                f'{index:07d}X',
+                'NULL' if is_null else rand.choice(job_groups),
+                f'{rand.randint(2014, 2017):d}-{rand.randint(1, 12):02d}-01',
+                city_id[:2],
+                city_id,
+                f'VILLE {city_id}',
+                f'{rand.uniform(42, 51):.5f}',
+                f'{rand.uniform(-5, 8):.5f}',
+            )) + '\n')
+
+
+def main(string_args: Optional[Sequence[str]] = None) -> None:
+    """Time the computation of hiring cities on a synthetic extract."""
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark the computation of hiring cities.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        '--num_offers', type=int, default=3_000_000, help='Number of synthetic job offers.')
+    parser.add_argument(
+        '--num_job_groups', type=int, default=500, help='Number of distinct job groups.')
+    parser.add_argument(
+        '--data_folder', default='data', help='Root folder of the cities data files.')
+    parser.add_argument(
+        '--min_creation_date', default='2015-01-01', help='The date from which to count offers.')
+    parser.add_argument(
+        '--skip_scan', action='store_true',
+        help='Only time the computation from chunks read by pandas.')
+    args = parser.parse_args(string_args)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        offers_csv = path.join(tmp_dir, 'job_offers.csv')
+        colnames_txt = path.join(tmp_dir, 'column_names.txt')
+        _write_extract(
+            offers_csv, colnames_txt, args.num_offers, args.data_folder, args.num_job_groups)
+        print(
+            f'Computing hiring cities for {args.num_offers:d} offers '
+            f'({os.path.getsize(offers_csv) / 1e6:.0f}MB).')
+
+        start = time.perf_counter()
+        chunked_cities = offers_per_city.extract_offers_per_cities(
+            offers_csv, colnames_txt, args.min_creation_date, args.data_folder)
+        chunked_seconds = time.perf_counter() - start
+        print(
+            f'Chunks read by pandas: {chunked_seconds:.2f}s '
+            f'({chunked_seconds / args.num_offers * 1e6:.2f}µs per offer)')
+
+        if args.skip_scan:
+            return
+        start = time.perf_counter()
+        aggregator = offers_per_city.HiringCitiesAggregator(
+            args.min_creation_date, args.data_folder)
+        job_offers.scan(offers_csv, colnames_txt, [aggregator])
+        scanned_cities = aggregator.get_dicts()
+        scan_seconds = time.perf_counter() - start
+        print(
+            f'Offers scanned one by one: {scan_seconds:.2f}s '
+            f'({scan_seconds / args.num_offers * 1e6:.2f}µs per offer)')
+
+    if chunked_cities != scanned_cities:
+        raise ValueError('The hiring cities differ between chunks and scanned offers.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""An index of the scoring models and templates referenced in the imported collections.
+
+For each collection, the values of the fields with a given string format (e.g. scoring model IDs)
+are stored in the references_index collection, split in several documents per collection and
+format, with the updated_at of the import they were computed from. Keeping them out of the meta
+documents avoids growing those towards MongoDB's document size limit. The index is refreshed after
+each import by import_status, and lazily when the collection was imported since it was last
+computed, so that the maintenance checks do not need to scan all the collections on every run.
+"""
+
+import datetime
+import typing
+from typing import Any, Callable, Iterable, Iterator
+
+import pymongo
+from pymongo import collection as pymongo_collection
+
+from bob_emploi.data_analysis.importer import importers
+from bob_emploi.frontend.api import options_pb2
+
+_INDEXED_FORMATS = (options_pb2.SCORING_MODEL_ID, options_pb2.SCORING_PROJECT_TEMPLATE)
+_TRANSLATION_TEMPLATES = 'translation_templates'
+_INDEX_COLLECTION = 'references_index'
+# Number of values stored in each document of an index, to stay far from MongoDB's document size
+# limit even for large collections such as translations.
+_INDEX_CHUNK_SIZE = 500
+
+
+class FieldReferences(typing.NamedTuple):
+    """The values of a field in a collection."""
+
+    field_name: str
+    # Whether at least one record has this field, even if empty.
+    has_field: bool
+    # Pairs of non-empty values and the ID of the record they come from.
+    values: list[tuple[Any, Any]]
+
+
+def list_formatted_fields(
+        importer: importers.Importer, field_format: 'options_pb2.StringFormat.V') -> Iterator[str]:
+    """List the names of the top-level fields with a given format in a collection."""
+
+    if not importer.proto_type:
+        return
+    for field in importer.proto_type.DESCRIPTOR.fields_by_name.values():
+        field_string_formats = field.GetOptions().Extensions[options_pb2.string_format]
+        if field_format in field_string_formats:
+            yield field.camelcase_name
+
+
+def _scan_fields(
+        mongo_db: pymongo.database.Database, collection: str, field_names: Iterable[str]) \
+        -> list[dict[str, Any]]:
+    fields = []
+    for field_name in field_names:
+        has_field = False
+        values = []
+        records = mongo_db.get_collection(collection).\
+            find({field_name: {'$exists': True}}, {field_name: 1})
+        for record in records:
+            has_field = True
+            if record[field_name]:
+                values.append([record[field_name], record['_id']])
+        fields.append({'field_name': field_name, 'has_field': has_field, 'values': values})
+    return fields
+
+
+def _scan_translation_templates(mongo_db: pymongo.database.Database) -> list[dict[str, Any]]:
+    templates = []
+    for record in mongo_db.translations.find({}):
+        record.pop('_id')
+        string = record.pop('string')
+        for lang, translation in record.items():
+            if isinstance(translation, str) and '%' in translation:
+                templates.append({'lang': lang, 'template': translation, 'string': string})
+    return templates
+
+
+def _get_index(
+        mongo_db: pymongo.database.Database, collection: str, index_name: str,
+        compute_index: Callable[[], list[Any]], force: bool = False) -> list[Any]:
+    """Get an index from the index collection, or compute it if it is outdated."""
+
+    meta = mongo_db.meta.find_one({'_id': collection}, {'updated_at': 1}) or {}
+    updated_at = meta.get('updated_at')
+    index_id = f'{collection}:{index_name}'
+    index_collection = mongo_db.get_collection(_INDEX_COLLECTION)
+    if not force and updated_at:
+        chunks = list(index_collection.find({'index_id': index_id}).sort('chunk'))
+        # A partial index (e.g. while it is being written) is considered outdated.
+        if chunks and len(chunks) == chunks[0].get('num_chunks') and \
+                all(chunk.get('updated_at') == updated_at for chunk in chunks):
+            return [value for chunk in chunks for value in chunk['values']]
+
+    values = compute_index()
+    # Without any date of import, there's no way to know whether the index would be up to date.
+    if updated_at:
+        _write_index(index_collection, index_id, updated_at, values)
+    return values
+
+
+def _write_index(
+        index_collection: pymongo_collection.Collection, index_id: str,
+        updated_at: datetime.datetime, values: list[Any]) -> None:
+    num_chunks = max(1, (len(values) + _INDEX_CHUNK_SIZE - 1) // _INDEX_CHUNK_SIZE)
+    index_collection.delete_many({'index_id': index_id})
+    index_collection.insert_many([
+        {
+            '_id': f'{index_id}:{chunk:d}',
+            'index_id': index_id,
+            'chunk': chunk,
+            'num_chunks': num_chunks,
+            'updated_at': updated_at,
+            'values': values[chunk * _INDEX_CHUNK_SIZE:(chunk + 1) * _INDEX_CHUNK_SIZE],
+        }
+        for chunk in range(num_chunks)
+    ])
+
+
+def get_field_references(
+        mongo_db: pymongo.database.Database, collection: str, importer: importers.Importer,
+        field_format: 'options_pb2.StringFormat.V', force: bool = False) \
+        -> list[FieldReferences]:
+    """Get the values of all the fields with a given format in a collection."""
+
+    fields = _get_index(
+        mongo_db, collection, options_pb2.StringFormat.Name(field_format),
+        lambda: _scan_fields(mongo_db, collection, list_formatted_fields(importer, field_format)),
+        force=force)
+    return [
+        FieldReferences(
+            field['field_name'], field['has_field'],
+            [(value, record_id) for value, record_id in field['values']])
+        for field in fields
+    ]
+
+
+def get_translation_templates(mongo_db: pymongo.database.Database, force: bool = False) \
+        -> list[dict[str, str]]:
+    """Get the translations that might contain template variables.
+
+    Returns:
+        a list of dicts with the template, its language and the original string.
+    """
+
+    return typing.cast(list[dict[str, str]], _get_index(
+        mongo_db, 'translations', _TRANSLATION_TEMPLATES,
+        lambda: _scan_translation_templates(mongo_db), force=force))
+
+
+def update_index(
+        mongo_db: pymongo.database.Database, collection: str,
+        importer: importers.Importer) -> None:
+    """Refresh the index of references of a collection, e.g. right after it was imported."""
+
+    for field_format in _INDEXED_FORMATS:
+        if any(list_formatted_fields(importer, field_format)):
+            get_field_references(mongo_db, collection, importer, field_format, force=True)
+    if collection == 'translations':
+        get_translation_templates(mongo_db, force=True)
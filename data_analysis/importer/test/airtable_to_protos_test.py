@@ -1,6 +1,7 @@
 """Tests for the bob_emploi.importer.airtable_to_protos module."""
 
 import os
+import tempfile
 import typing
 from typing import Any, Mapping, Optional, Sequence
 import unittest
@@ -263,6 +264,21 @@ class TipTemplateConverterTestCase(_ConverterTestCase):
             self.airtable2dicts()
         self.assertEqual(2, mock_logging.call_count, msg=mock_logging.call_args_list)
 
+    @mock.patch('logging.error')
+    def test_errors_in_record_order(self, mock_logging: mock.MagicMock) -> None:
+        """Errors are logged in the order of the records."""
+
+        record_ids = [
+            self.add_record({'title': f'This field has whitespace in back {index:d} '})
+            for index in range(20)
+        ]
+        with self.assertRaises(ValueError):
+            self.airtable2dicts()
+        self.assertEqual(
+            record_ids,
+            [call[0][2].split('"')[1] for call in mock_logging.call_args_list],
+            msg=mock_logging.call_args_list)
+
     def test_validate_links(self) -> None:
         """Test that the converter accepts a valid link."""
 
@@ -474,6 +490,22 @@ class TranslatableContactLeadConverterTestCase(_ConverterTestCase):
             any('import translations' in call[0][0] for call in mock_logging.call_args_list),
             msg=mock_logging.call_args_list)
 
+    @mock.patch('logging.warning')
+    def test_logs_warning_once(self, mock_logging: mock.MagicMock) -> None:
+        """Test that the converter warns only once for many records."""
+
+        for index in range(20):
+            self.add_record({
+                'email_template': '',
+                'name': f'Name {index:d}',
+            })
+            self.add_translation(f'Name {index:d}', {'fr@tu': f'Nom {index:d}', 'en': 'Name'})
+        self.airtable2dicts()
+        self.assertEqual(
+            1,
+            sum(1 for call in mock_logging.call_args_list if 'import translations' in call[0][0]),
+            msg=mock_logging.call_args_list)
+
     def test_raises_on_missing_translation(self) -> None:
         """Test that the converter breaks when a translation is missing."""
 
@@ -1339,6 +1371,31 @@ class StrategyAdviceTemplateConverterTestCase(_ConverterTestCase):
         error_message = mock_logging.call_args[0][0] % mock_logging.call_args[0][1:]
         self.assertIn('There are duplicate records', error_message)
 
+    @mock.patch('logging.error')
+    def test_wrong_order(self, mock_logging: mock.MagicMock) -> None:
+        """Should log an error when a record is not sorted after the previous one."""
+
+        self.add_record({
+            'advice_id': ['commute'],
+            'why_template': 'Voici comment commuter.',
+            'strategy_id': ['rec1'],
+        })
+        self.add_record({
+            'advice_id': ['commute'],
+            'why_template': 'Voici comment commuter.',
+            'strategy_id': ['rec3'],
+        })
+        misplaced_id = self.add_record({
+            'advice_id': ['commute'],
+            'why_template': 'Voici comment commuter.',
+            'strategy_id': ['rec2'],
+        })
+        with self.assertRaises(ValueError):
+            self.airtable2dicts()
+        mock_logging.assert_called_once()
+        error_message = mock_logging.call_args[0][0] % mock_logging.call_args[0][1:]
+        self.assertIn(f'Records are not sorted properly: record "{misplaced_id}"', error_message)
+
 
 class MailingCampaignConverterTestCase(_ConverterTestCase):
     """Tests for the campaign converter."""
@@ -1485,6 +1542,18 @@ class AirtableToProtosTests(_ConverterTestCase):
             self._expected_records,
             self.airtable2dicts(table='other-table-name', alt_table=self._table))
 
+    def test_alt_table_offline(self) -> None:
+        """Test that we fallback to the alt_table snapshot when offline."""
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with mock.patch.dict(os.environ, {'AIRTABLE_SNAPSHOT_FOLDER': tmp_dir}):
+                self.airtable2dicts()
+                with mock.patch.dict(os.environ, {'AIRTABLE_SNAPSHOT_OFFLINE': '1'}):
+                    records = self.airtable2dicts(
+                        table='other-table-name', alt_table=self._table)
+
+        self.assertEqual(self._expected_records, records)
+
     def test_alt_table_fails(self) -> None:
         """Test that we properly fail if both talbe and alt_table are missing."""
 
@@ -29,6 +29,28 @@ class CityLocationsImporterTestCase(unittest.TestCase):
         self.assertAlmostEqual(5.38333, city.longitude, places=5)
         other_city = protos['01002']
         self.assertEqual(geo_pb2.PERIURBAN, other_city.urban_context)
+        self.assertFalse(other_city.name)
+
+    def test_full_cities(self) -> None:
+        """Add the full data of current cities when given the data folder."""
+
+        collection = city_locations.csv2dicts(
+            self.stats_filename, self.urban_context_filename, data_folder=self.test_data_folder)
+
+        protos = dict(mongo.collection_to_proto_mapping(collection, geo_pb2.FrenchCity))
+        self.assertEqual(11, len(protos))
+
+        city = protos['01002']
+        self.assertEqual("L'Abergement-de-Varey", city.name)
+        self.assertEqual('01', city.departement_id)
+        self.assertEqual('Ain', city.departement_name)
+        self.assertEqual("dans l'", city.departement_prefix)
+        self.assertEqual('Auvergne-Rhône-Alpes', city.region_name)
+        self.assertEqual('en ', city.region_prefix)
+        self.assertEqual('01640', city.postcodes)
+        self.assertEqual(221, city.population)
+        self.assertAlmostEqual(46, city.latitude, places=5)
+        self.assertEqual(geo_pb2.PERIURBAN, city.urban_context)
 
 
 if __name__ == '__main__':
@@ -7,6 +7,8 @@ import logging
 import os
 import re
 import subprocess
+import tempfile
+import time
 import typing
 from typing import Any
 import unittest
@@ -472,6 +474,162 @@ class ImportStatusBasicTests(unittest.TestCase):
             'python my-folder/my-script.py --long-argument value \\\n    --other-arg other-value',
             'the error')
 
+    @mock.patch(logging.__name__ + '.info', new=mock.MagicMock())
+    @mock.patch('subprocess.run')
+    @mock.patch.dict(import_status.get_importers(), {
+        'first': importers.Importer(
+            name='First', script='first-script', args=None, is_imported=True,
+            run_every=None, proto_type=None, key=None, has_pii=False),
+        'second': importers.Importer(
+            name='Second', script='second-script', args=None, is_imported=True,
+            run_every=None, proto_type=None, key=None, has_pii=False),
+        'third': importers.Importer(
+            name='Third', script='third-script', args=None, is_imported=True,
+            run_every=None, proto_type=None, key=None, has_pii=False),
+        'no_import': importers.Importer(
+            name='No import', script=None, args=None, is_imported=False,
+            run_every=None, proto_type=None, key=None, has_pii=False),
+        'personal': importers.Importer(
+            name='Personal', script='personal-script', args=None, is_imported=True,
+            run_every=None, proto_type=None, key=None, has_pii=True),
+    }, clear=True)
+    def test_run_all(self, mock_subprocess_run: mock.MagicMock) -> None:
+        """Run all the importers."""
+
+        import_status.main(['--run_all', '--jobs', '2', '--always_accept_diff'])
+
+        scripts = [
+            os.path.basename(call[0][0][1]) for call in mock_subprocess_run.call_args_list]
+        self.assertEqual(
+            ['first-script.py', 'second-script.py', 'third-script.py'], sorted(scripts))
+        for call in mock_subprocess_run.call_args_list:
+            self.assertEqual('--always_accept_diff', call[0][0][-1])
+
+    @mock.patch(logging.__name__ + '.info', new=mock.MagicMock())
+    @mock.patch(logging.__name__ + '.exception')
+    @mock.patch('subprocess.run')
+    @mock.patch.dict(import_status.get_importers(), {
+        'first': importers.Importer(
+            name='First', script='first-script', args=None, is_imported=True,
+            run_every=None, proto_type=None, key=None, has_pii=False),
+        'second': importers.Importer(
+            name='Second', script='second-script', args=None, is_imported=True,
+            run_every=None, proto_type=None, key=None, has_pii=False),
+    }, clear=True)
+    def test_run_all_unexpected_error(
+            self, mock_subprocess_run: mock.MagicMock, mock_log_exception: mock.MagicMock) -> None:
+        """Report an unexpected error of an importer without stopping the others."""
+
+        def _run(command: list[str], **unused_kwargs: Any) -> None:
+            if command[1].endswith('first-script.py'):
+                raise OSError('No such file')
+
+        mock_subprocess_run.side_effect = _run
+        import_status.main(['--run_all', '--jobs', '1'])
+
+        self.assertEqual(2, mock_subprocess_run.call_count)
+        mock_log_exception.assert_called_once_with(
+            'Unexpected error while importing "%s".', 'first')
+
+    @mock.patch(logging.__name__ + '.info')
+    @mock.patch('subprocess.run')
+    def test_run_all_skips_unchanged_inputs(
+            self, mock_subprocess_run: mock.MagicMock, mock_log_info: mock.MagicMock) -> None:
+        """Skip importers whose input files have not changed since the last import."""
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_file = os.path.join(tmp_dir, 'data/my_target.csv')
+            os.makedirs(os.path.dirname(data_file))
+            with open(data_file, 'w', encoding='utf-8') as data:
+                data.write('a,b\n1,2\n')
+            importer = importers.Importer(
+                name='Collection name', script='my-script-name',
+                args={'needed_data': 'data/my_target.csv'}, is_imported=True,
+                run_every=None, proto_type=None, key=None, has_pii=False)
+            current_dir = os.getcwd()
+            os.chdir(tmp_dir)
+            self.addCleanup(os.chdir, current_dir)
+
+            def _run_importer(*unused_args: Any, **unused_kwargs: Any) -> None:
+                self.mongo_db.meta.update_one(
+                    {'_id': 'collection_id'}, {'$inc': {'updated_at': 1}}, upsert=True)
+
+            mock_subprocess_run.side_effect = _run_importer
+            with mock.patch.dict(
+                    import_status.get_importers(), {'collection_id': importer}, clear=True):
+                import_status.main(['--run_all'])
+                mock_subprocess_run.assert_called_once()
+                meta = self.mongo_db.meta.find_one({'_id': 'collection_id'})
+                assert meta
+                self.assertTrue(meta.get('input_hash'))
+
+                mock_subprocess_run.reset_mock()
+                import_status.main(['--run_all'])
+                mock_subprocess_run.assert_not_called()
+                mock_log_info.assert_any_call(
+                    'Inputs of "%s" have not changed, skipping it.', 'collection_id')
+
+                with open(data_file, 'a', encoding='utf-8') as data:
+                    data.write('3,4\n')
+                import_status.main(['--run_all'])
+                mock_subprocess_run.assert_called_once()
+
+    @mock.patch(logging.__name__ + '.info', new=mock.MagicMock())
+    @mock.patch('subprocess.run')
+    def test_run_all_declined_import(self, mock_subprocess_run: mock.MagicMock) -> None:
+        """Do not record the inputs of an import that did not update the collection."""
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_file = os.path.join(tmp_dir, 'data/my_target.csv')
+            os.makedirs(os.path.dirname(data_file))
+            with open(data_file, 'w', encoding='utf-8') as data:
+                data.write('a,b\n1,2\n')
+            importer = importers.Importer(
+                name='Collection name', script='my-script-name',
+                args={'needed_data': 'data/my_target.csv'}, is_imported=True,
+                run_every=None, proto_type=None, key=None, has_pii=False)
+            current_dir = os.getcwd()
+            os.chdir(tmp_dir)
+            self.addCleanup(os.chdir, current_dir)
+
+            with mock.patch.dict(
+                    import_status.get_importers(), {'collection_id': importer}, clear=True):
+                import_status.main(['--run_all'])
+                import_status.main(['--run_all'])
+
+        self.assertEqual(2, mock_subprocess_run.call_count)
+        self.assertFalse(self.mongo_db.meta.find_one({'_id': 'collection_id'}))
+
+    @mock.patch(logging.__name__ + '.info', new=mock.MagicMock())
+    @mock.patch('subprocess.run')
+    @mock.patch.dict(import_status.get_importers(), {
+        'first': importers.Importer(
+            name='First', script='first-script', args={'needed_data': 'data/rome/csv/a.csv'},
+            is_imported=True, run_every=None, proto_type=None, key=None, has_pii=False),
+        'second': importers.Importer(
+            name='Second', script='second-script', args={'needed_data': 'data/rome/csv/b.csv'},
+            is_imported=True, run_every=None, proto_type=None, key=None, has_pii=False),
+    }, clear=True)
+    def test_run_all_make_data(self, mock_subprocess_run: mock.MagicMock) -> None:
+        """Never run make in parallel, even for different targets."""
+
+        running_makes: list[list[str]] = []
+        max_running_makes: list[int] = []
+
+        def _run(command: list[str], **unused_kwargs: Any) -> None:
+            if command[0] != 'make':
+                return
+            running_makes.append(command)
+            max_running_makes.append(len(running_makes))
+            time.sleep(.05)
+            running_makes.remove(command)
+
+        mock_subprocess_run.side_effect = _run
+        import_status.main(['--run_all', '--make_data', '--jobs', '2'])
+
+        self.assertEqual(4, mock_subprocess_run.call_count)
+        self.assertEqual([1, 1], max_running_makes)
+
     @mock.patch(logging.__name__ + '.info', new=mock.MagicMock())
     def test_main_unknown_extra_args(self) -> None:
         """Unknown arg."""
@@ -505,6 +663,30 @@ class ImportStatusBasicTests(unittest.TestCase):
         self.assertNotIn(
             'collection_id.2019-03-20_5784037a837ed', self.mongo_db.list_collection_names())
 
+    @mock.patch.dict(import_status.get_importers(), {
+        'collection_id': importers.Importer(
+            name='Collection name',
+            script='my-script-name',
+            args=None,
+            is_imported=True,
+            run_every=None,
+            proto_type=None, key=None, has_pii=False),
+    }, clear=True)
+    @mock.patch(logging.__name__ + '.info')
+    def test_revert_import_skips_change_logs(self, mock_log_info: mock.MagicMock) -> None:
+        """Reverting a collection does not use the change logs of incremental imports."""
+
+        self.mongo_db.collection_id.insert_many([{'_id': i} for i in range(10)])
+        self.mongo_db.get_collection('collection_id.2019-03-20_5784037a837ed.changes')\
+            .insert_many([{'_id': i} for i in range(5)])
+        self.mongo_db.get_collection('collection_id.2019-03-18_45830e7a865fa').insert_many([
+            {'_id': i} for i in range(20, 30)])
+        import_status.main(['--revert', 'collection_id'])
+        mock_log_info.assert_called_with(
+            'Reverting collection "%s" to version from %s…', 'collection_id', '2019-03-18')
+        self.assertEqual(
+            list(range(20, 30)), [doc['_id'] for doc in self.mongo_db.collection_id.find({})])
+
     @mock.patch.dict(import_status.get_importers(), {
         'collection_id': importers.Importer(
             name='Collection name',
@@ -1,6 +1,8 @@
 """Unit tests for the maintenance module."""
 
+import datetime
 import os
+import tempfile
 import typing
 from typing import Any
 import unittest
@@ -91,6 +93,28 @@ class ScoringModelCheckTestCase(unittest.TestCase):
         self.assertIn('has_scoring_models', mock_logging_error.call_args[0])
         self.assertIn('culprit', mock_logging_error.call_args[0])
 
+    @mock.patch('logging.error')
+    def test_reuse_index(self, mock_logging_error: mock.MagicMock) -> None:
+        """Only rescan the collections that were imported since the last check."""
+
+        self._db.meta.insert_one({
+            '_id': 'has_scoring_models',
+            'updated_at': datetime.datetime(2021, 1, 4),
+        })
+        maintenance.check_scoring_models(self._db)
+
+        self._db.has_scoring_models.insert_one(
+            {'_id': 'culprit', 'filters': ['unknown-not-implemented']})
+        maintenance.check_scoring_models(self._db)
+        self.assertFalse(mock_logging_error.called, msg=mock_logging_error.call_args)
+
+        self._db.meta.update_one(
+            {'_id': 'has_scoring_models'},
+            {'$set': {'updated_at': datetime.datetime(2021, 1, 5)}})
+        maintenance.check_scoring_models(self._db)
+        mock_logging_error.assert_called_once()
+        self.assertIn('culprit', mock_logging_error.call_args[0])
+
     @mock.patch('logging.error')
     def test_unknown_model_command_line(self, mock_logging_error: mock.MagicMock) -> None:
         """A record has an unknown scoring model (using CLI)."""
@@ -273,6 +297,85 @@ class UrlCheckTestCase(unittest.TestCase):
         self.assertIn('src/bob.ts', logging_error)
         self.assertIn('https://does-not-exist.com', logging_error)
 
+    @mock.patch('logging.error')
+    @requests_mock.mock()
+    def test_same_link_in_records(
+            self, mock_logging_error: mock.MagicMock,
+            mock_requests: 'requests_mock._RequestObjectProxy') -> None:
+        """Check a link used in several records only once."""
+
+        mock_requests.get('http://does-not-exist.com', status_code=404)
+        self._db.has_url_link.insert_many([
+            {'_id': 'first-record', 'link': 'http://does-not-exist.com'},
+            {'_id': 'second-record', 'link': 'http://does-not-exist.com'},
+        ])
+        maintenance.check_urls(self._db)
+
+        self.assertEqual(2, mock_logging_error.call_count)
+        logging_errors = [
+            call[0][0] % call[0][1:] for call in mock_logging_error.call_args_list]
+        self.assertIn('first-record', logging_errors[0])
+        self.assertIn('second-record', logging_errors[1])
+        self.assertEqual(
+            1, len([request for request in mock_requests.request_history
+                    if request.method == 'GET']))
+
+    @mock.patch('logging.error')
+    @requests_mock.mock()
+    def test_head_request(
+            self, mock_logging_error: mock.MagicMock,
+            mock_requests: 'requests_mock._RequestObjectProxy') -> None:
+        """Do not download the page if a HEAD request is enough."""
+
+        mock_requests.head('https://www.google.com', status_code=200)
+        mock_requests.get('https://www.google.com', status_code=200)
+        self._db.has_url_link.insert_one({'link': 'https://www.google.com'})
+        maintenance.check_urls(self._db)
+
+        self.assertFalse(mock_logging_error.called, msg=mock_logging_error.call_args)
+        self.assertEqual(['HEAD'], [request.method for request in mock_requests.request_history])
+
+    @mock.patch('logging.error')
+    @requests_mock.mock()
+    def test_cache(
+            self, mock_logging_error: mock.MagicMock,
+            mock_requests: 'requests_mock._RequestObjectProxy') -> None:
+        """Do not check again the links that were recently checked successfully."""
+
+        mock_requests.get('https://www.google.com', status_code=200)
+        mock_requests.get('http://does-not-exist.com', status_code=404)
+        self._db.has_url_link.insert_many([
+            {'link': 'https://www.google.com'},
+            {'_id': 'link-to-missing', 'link': 'http://does-not-exist.com'},
+        ])
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_json = os.path.join(tmp_dir, 'urls.json')
+            maintenance.check_urls(self._db, url_cache_json=cache_json)
+            mock_logging_error.assert_called_once()
+            mock_logging_error.reset_mock()
+            mock_requests.reset_mock()
+
+            maintenance.check_urls(self._db, url_cache_json=cache_json)
+
+        # Errors are always checked again.
+        mock_logging_error.assert_called_once()
+        self.assertEqual(
+            {'http://does-not-exist.com/'},
+            {request.url for request in mock_requests.request_history})
+
+    def test_split_in_lanes(self) -> None:
+        """Split the URLs of each host in a limited number of lanes."""
+
+        url_checker = maintenance._UrlSiteChecker(  # pylint: disable=protected-access
+            max_requests_per_host=2)
+
+        lanes = url_checker._split_in_lanes([  # pylint: disable=protected-access
+            'https://a.com/1', 'https://b.com/1', 'https://a.com/2', 'https://a.com/3'])
+
+        self.assertEqual(
+            [['https://a.com/1', 'https://a.com/3'], ['https://a.com/2'], ['https://b.com/1']],
+            lanes)
+
 
 @mock.patch('tqdm.tqdm', new=lambda iterable: iterable)
 @mock.patch(
@@ -44,6 +44,20 @@ class OffersPerCityTestCase(unittest.TestCase):
         # Test that the arrondissement gets removed for LYON 06
         self.assertEqual('Lyon', f_cities[2].city.name)
 
+    def test_small_chunks(self) -> None:
+        """The size of the chunks does not change the result."""
+
+        cities = offers_per_city.extract_offers_per_cities(
+            self.offers_csv, self.colnames_csv, '2015-01-01',
+            data_folder=path.join(path.dirname(__file__), 'testdata'))
+
+        with mock.patch(offers_per_city.__name__ + '._CHUNK_SIZE', new=2):
+            chunked_cities = offers_per_city.extract_offers_per_cities(
+                self.offers_csv, self.colnames_csv, '2015-01-01',
+                data_folder=path.join(path.dirname(__file__), 'testdata'))
+
+        self.assertEqual(cities, chunked_cities)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,133 @@
+"""Unit tests for the references_index module."""
+
+import datetime
+import unittest
+from unittest import mock
+
+import mongomock
+
+from bob_emploi.data_analysis.importer import importers
+from bob_emploi.data_analysis.importer import references_index
+from bob_emploi.data_analysis.importer.test.testdata import test_pb2
+from bob_emploi.frontend.api import options_pb2
+
+_IMPORTER = importers.Importer(
+    name='Test Importer',
+    script='airtable_to_protos',
+    args=None,
+    proto_type=test_pb2.ScoringModels,
+    is_imported=True,
+    run_every=None,
+    key='',
+    has_pii=False)
+
+
+class UpdateIndexTestCase(unittest.TestCase):
+    """Unit tests for the update_index function."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._db = mongomock.MongoClient().test
+        self._db.has_scoring_models.insert_many([
+            {'_id': 'a', 'filters': ['for-women']},
+            {'_id': 'b', 'filters': []},
+        ])
+        self._db.meta.insert_one({
+            '_id': 'has_scoring_models',
+            'updated_at': datetime.datetime(2021, 1, 4),
+        })
+
+    def test_update_index(self) -> None:
+        """Store the references of a collection in the index collection."""
+
+        references_index.update_index(self._db, 'has_scoring_models', _IMPORTER)
+
+        self.assertEqual(
+            {'_id': 'has_scoring_models', 'updated_at': datetime.datetime(2021, 1, 4)},
+            self._db.meta.find_one({'_id': 'has_scoring_models'}))
+        index = self._db.references_index.find_one({'_id': 'has_scoring_models:SCORING_MODEL_ID:0'})
+        assert index
+        self.assertEqual(datetime.datetime(2021, 1, 4), index.get('updated_at'))
+        self.assertEqual(
+            [{'field_name': 'filters', 'has_field': True, 'values': [[['for-women'], 'a']]}],
+            index.get('values'))
+
+        self._db.has_scoring_models.drop()
+        self.assertEqual(
+            [references_index.FieldReferences('filters', True, [(['for-women'], 'a')])],
+            references_index.get_field_references(
+                self._db, 'has_scoring_models', _IMPORTER, options_pb2.SCORING_MODEL_ID))
+
+    def test_no_meta(self) -> None:
+        """Do not store the index of a collection that has never been imported."""
+
+        self._db.meta.drop()
+
+        references_index.update_index(self._db, 'has_scoring_models', _IMPORTER)
+
+        self.assertFalse(list(self._db.meta.find()))
+        self.assertFalse(list(self._db.references_index.find()))
+
+    def test_translation_templates(self) -> None:
+        """Index the translations that contain template variables."""
+
+        self._db.translations.insert_many([
+            {'string': 'no variable', 'en': 'no variable'},
+            {'string': 'in %inCity', 'en': 'in %inCity', 'de': 'in %inCity'},
+        ])
+        self._db.meta.insert_one({
+            '_id': 'translations',
+            'updated_at': datetime.datetime(2021, 1, 4),
+        })
+
+        references_index.update_index(self._db, 'translations', importers.Importer(
+            name='Translations', script='translations', args=None, proto_type=None,
+            is_imported=True, run_every=None, key=None, has_pii=False))
+
+        self._db.translations.drop()
+        self.assertEqual(
+            [
+                {'lang': 'en', 'template': 'in %inCity', 'string': 'in %inCity'},
+                {'lang': 'de', 'template': 'in %inCity', 'string': 'in %inCity'},
+            ],
+            references_index.get_translation_templates(self._db))
+
+    @mock.patch(references_index.__name__ + '._INDEX_CHUNK_SIZE', 2)
+    def test_translation_templates_in_chunks(self) -> None:
+        """Split the translation templates in several documents."""
+
+        self._db.translations.insert_many([
+            {'string': f'in %inCity {index:d}', 'en': f'in %inCity {index:d}'}
+            for index in range(5)
+        ])
+        self._db.meta.insert_one({
+            '_id': 'translations',
+            'updated_at': datetime.datetime(2021, 1, 4),
+        })
+
+        self.assertEqual(5, len(references_index.get_translation_templates(self._db)))
+        self.assertEqual(
+            ['translations:translation_templates:0', 'translations:translation_templates:1',
+             'translations:translation_templates:2'],
+            sorted(index['_id'] for index in self._db.references_index.find()))
+
+        # Shrink the collection in a new import.
+        self._db.translations.delete_many({'string': {'$ne': 'in %inCity 0'}})
+        self._db.meta.update_one(
+            {'_id': 'translations'}, {'$set': {'updated_at': datetime.datetime(2021, 1, 5)}})
+        self.assertEqual(
+            [{'lang': 'en', 'template': 'in %inCity 0', 'string': 'in %inCity 0'}],
+            references_index.get_translation_templates(self._db))
+        self.assertEqual(
+            ['translations:translation_templates:0'],
+            [index['_id'] for index in self._db.references_index.find()])
+
+        # Read the index from its chunks.
+        self._db.translations.drop()
+        self.assertEqual(
+            [{'lang': 'en', 'template': 'in %inCity 0', 'string': 'in %inCity 0'}],
+            references_index.get_translation_templates(self._db))
+
+
+if __name__ == '__main__':
+    unittest.main()
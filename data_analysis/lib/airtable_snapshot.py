@@ -0,0 +1,182 @@
+"""A local snapshot cache of Airtable tables.
+
+When the AIRTABLE_SNAPSHOT_FOLDER env var is set, the records fetched from Airtable are stored in
+NDJSON files in this folder, one per base, table and view: the first line contains the metadata
+of the snapshot (base, table, view and fetch time), and each other line is a record with its id,
+createdTime and fields. The records are then read from the snapshot instead of calling the API
+again while it is recent enough (AIRTABLE_SNAPSHOT_MAX_AGE_SECONDS, default to one hour).
+
+With AIRTABLE_SNAPSHOT_OFFLINE set, the API is never called and the snapshots are used whatever
+their age: this allows repeatable imports from a local copy of the tables.
+"""
+
+from concurrent import futures
+import datetime
+import json
+import logging
+import os
+from os import path
+import typing
+from typing import Any, Iterable, Mapping, Optional, TextIO
+from urllib import parse
+
+from airtable import airtable
+import requests
+
+from bob_emploi.common.python import now
+
+_Record = airtable.Record[Mapping[str, Any]]
+
+
+class TableRef(typing.NamedTuple):
+    """A reference to a table (or a view of a table) in Airtable."""
+
+    base_id: str
+    table: str
+    view: Optional[str] = None
+
+
+class MissingSnapshotError(ValueError):
+    """Raised when offline and a table has no snapshot."""
+
+
+class _Snapshot(typing.NamedTuple):
+    fetched_at: datetime.datetime
+    records: list[_Record]
+
+
+def _get_folder() -> str:
+    return os.getenv('AIRTABLE_SNAPSHOT_FOLDER', '')
+
+
+def _get_max_age() -> datetime.timedelta:
+    return datetime.timedelta(seconds=int(os.getenv('AIRTABLE_SNAPSHOT_MAX_AGE_SECONDS', '3600')))
+
+
+def is_offline() -> bool:
+    """Whether the snapshots should be used without ever calling the Airtable API."""
+
+    return bool(os.getenv('AIRTABLE_SNAPSHOT_OFFLINE'))
+
+
+def _quote(name: str) -> str:
+    return parse.quote(name, safe='')
+
+
+def _get_snapshot_path(folder: str, table_ref: TableRef) -> str:
+    filename = _quote(table_ref.table)
+    if table_ref.view:
+        filename += f'@{_quote(table_ref.view)}'
+    return path.join(folder, _quote(table_ref.base_id), f'{filename}.ndjson')
+
+
+def _read_fetched_at(snapshot_file: TextIO) -> datetime.datetime:
+    metadata = json.loads(next(snapshot_file))
+    return datetime.datetime.fromisoformat(metadata['fetchedAt'])
+
+
+def _read_snapshot(snapshot_path: str) -> Optional[_Snapshot]:
+    try:
+        with open(snapshot_path, 'rt', encoding='utf-8') as snapshot_file:
+            fetched_at = _read_fetched_at(snapshot_file)
+            records = [json.loads(line) for line in snapshot_file]
+        return _Snapshot(fetched_at, records)
+    except (OSError, StopIteration, ValueError, KeyError):
+        return None
+
+
+def _is_fresh(fetched_at: Optional[datetime.datetime]) -> bool:
+    return fetched_at is not None and now.get() - fetched_at < _get_max_age()
+
+
+def _is_snapshot_fresh(snapshot_path: str) -> bool:
+    """Check the age of a snapshot, reading only its metadata line."""
+
+    try:
+        with open(snapshot_path, 'rt', encoding='utf-8') as snapshot_file:
+            return _is_fresh(_read_fetched_at(snapshot_file))
+    except (OSError, StopIteration, ValueError, KeyError):
+        return False
+
+
+def _write_snapshot(snapshot_path: str, table_ref: TableRef, records: Iterable[_Record]) -> None:
+    os.makedirs(path.dirname(snapshot_path), exist_ok=True)
+    tmp_path = f'{snapshot_path}.tmp'
+    with open(tmp_path, 'wt', encoding='utf-8') as snapshot_file:
+        json.dump({
+            'baseId': table_ref.base_id,
+            'table': table_ref.table,
+            'view': table_ref.view,
+            'fetchedAt': now.get().isoformat(),
+        }, snapshot_file)
+        snapshot_file.write('\n')
+        for record in records:
+            json.dump(record, snapshot_file, ensure_ascii=False)
+            snapshot_file.write('\n')
+    os.replace(tmp_path, snapshot_path)
+
+
+def _fetch(table_ref: TableRef, api_key: Optional[str]) -> list[_Record]:
+    client = airtable.Airtable(table_ref.base_id, api_key or os.getenv('AIRTABLE_API_KEY', ''))
+    records = list(client.iterate(table_ref.table, view=table_ref.view))
+    folder = _get_folder()
+    if folder:
+        _write_snapshot(_get_snapshot_path(folder, table_ref), table_ref, records)
+    return records
+
+
+def get_records(
+        base_id: str, table: str, *, view: Optional[str] = None,
+        api_key: Optional[str] = None) -> list[_Record]:
+    """Get all the records of an Airtable table, from its snapshot if possible.
+
+    Raises:
+        MissingSnapshotError: if offline and there is no snapshot for this table.
+        Any error from the Airtable client if the table needs to be fetched.
+    """
+
+    table_ref = TableRef(base_id, table, view)
+    folder = _get_folder()
+    if not folder:
+        return _fetch(table_ref, api_key)
+
+    snapshot = _read_snapshot(_get_snapshot_path(folder, table_ref))
+    if is_offline():
+        if not snapshot:
+            raise MissingSnapshotError(
+                f'No snapshot for the Airtable table {table_ref} in "{folder}".')
+        return snapshot.records
+    if snapshot and _is_fresh(snapshot.fetched_at):
+        return snapshot.records
+    return _fetch(table_ref, api_key)
+
+
+def refresh(
+        table_refs: Iterable[TableRef], *, api_key: Optional[str] = None,
+        num_workers: int = 4) -> None:
+    """Fetch in parallel the tables whose snapshots are missing or too old.
+
+    To refetch all the tables, set AIRTABLE_SNAPSHOT_MAX_AGE_SECONDS to 0. Tables that cannot be
+    fetched are skipped with a warning.
+    """
+
+    folder = _get_folder()
+    if not folder or is_offline():
+        return
+
+    stale_table_refs = [
+        table_ref for table_ref in dict.fromkeys(table_refs)
+        if not _is_snapshot_fresh(_get_snapshot_path(folder, table_ref))
+    ]
+    with futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+        fetches = {
+            executor.submit(_fetch, table_ref, api_key): table_ref
+            for table_ref in stale_table_refs
+        }
+        for fetch in futures.as_completed(fetches):
+            try:
+                fetch.result()
+            except (AttributeError, requests.exceptions.HTTPError) as error:
+                logging.warning(
+                    'Could not refresh the snapshot of the Airtable table %s:\n%s',
+                    fetches[fetch], error)
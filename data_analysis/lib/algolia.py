@@ -1,42 +1,124 @@
 """Helper functions for algolia index handling."""
 
+from concurrent import futures
+import hashlib
 import json
 import logging
+import os
 import time
-from typing import Any, Iterable
+import typing
+from typing import Any, Callable, Iterable, Optional
 
 from algoliasearch import exceptions
 from algoliasearch import search_client
+from algoliasearch import search_index
 
 from bob_emploi.data_analysis.lib import batch
 
 
+def _hash_item(item: Any) -> str:
+    return hashlib.sha1(
+        json.dumps(item, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'),
+    ).hexdigest()
+
+
+def _read_manifest(manifest_path: str, index: str) -> Optional[dict[str, str]]:
+    """Read the hashes of the objects from the last upload to an index, if any."""
+
+    try:
+        with open(manifest_path, 'rt', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('index') != index:
+        return None
+    return typing.cast(Optional[dict[str, str]], manifest.get('hashes'))
+
+
+def _write_manifest(manifest_path: str, index: str, hashes: dict[str, str]) -> None:
+    tmp_path = f'{manifest_path}.tmp'
+    with open(tmp_path, 'wt', encoding='utf-8') as manifest_file:
+        json.dump({'index': index, 'hashes': hashes}, manifest_file)
+    os.replace(tmp_path, manifest_path)
+
+
+def _run_in_batches(
+        func: Callable[[list[Any]], Any], items: Iterable[Any], batch_size: int,
+        num_workers: int) -> None:
+    """Call func on batches of items concurrently, and log the first batch in error."""
+
+    with futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+        batches = {
+            executor.submit(func, batch_items): batch_items
+            for batch_items in batch.batch_iterator(items, batch_size)
+        }
+        for future, batch_items in batches.items():
+            try:
+                future.result()
+            except exceptions.AlgoliaException as error:
+                for other_future in batches:
+                    other_future.cancel()
+                logging.error(
+                    'An error occurred while saving to Algolia:\n%s',
+                    json.dumps(batch_items[:10], indent=2), exc_info=error)
+                raise
+
+
+def _upload_delta(
+        index: search_index.SearchIndex, items: list[Any], hashes: dict[str, str],
+        previous_hashes: dict[str, str], batch_size: int, num_workers: int) -> None:
+    changed_items = [
+        item for item in items if previous_hashes.get(item['objectID']) != hashes[item['objectID']]]
+    removed_ids = sorted(previous_hashes.keys() - hashes.keys())
+    logging.info(
+        'Uploading %d changed objects and deleting %d objects out of %d.',
+        len(changed_items), len(removed_ids), len(items))
+    _run_in_batches(index.save_objects, changed_items, batch_size, num_workers)
+    _run_in_batches(index.delete_objects, removed_ids, batch_size, num_workers)
+
+
 # TODO(cyrille): Use wherever relevant.
-def upload(items: Iterable[Any], *, app_id: str, api_key: str, index: str, batch_size: int = 5000) \
-        -> None:
-    """Seamlessly upload items to Algolia, by creating a temporary index."""
+def upload(
+        items: Iterable[Any], *, app_id: str, api_key: str, index: str, batch_size: int = 5000,
+        manifest_path: Optional[str] = None, num_workers: int = 4) -> None:
+    """Seamlessly upload items to Algolia, by creating a temporary index.
+
+    If a manifest file is given, it keeps a hash of each object uploaded. On the next upload to
+    the same index, only the objects that were added or changed since are sent, and the ones that
+    were removed are deleted, directly in the index. This mode requires items to be dicts with an
+    objectID, and the index not to be modified by other means.
+    """
 
     client = search_client.SearchClient.create(app_id, api_key)
     _index = client.init_index(index)
+
+    hashes: dict[str, str] = {}
+    if manifest_path:
+        items = list(items)
+        hashes = {item['objectID']: _hash_item(item) for item in items}
+        previous_hashes = _read_manifest(manifest_path, index)
+        if previous_hashes is not None:
+            _upload_delta(_index, items, hashes, previous_hashes, batch_size, num_workers)
+            _write_manifest(manifest_path, index, hashes)
+            return
+
     tmp_index_name = f'{index}_{round(time.time())}'
     tmp_index = client.init_index(tmp_index_name)
 
-    batch_items: list[Any] = []
     try:
         previous_settings = _index.get_settings()
         # move_index doesn't allow its source to have replicas.
         # The destination replicas are kept anyway.
-        del previous_settings['replicas']
+        previous_settings.pop('replicas', None)
         tmp_index.set_settings(previous_settings)
         # TODO(pascal): Add synonyms if we start having some.
-        for batch_items in batch.batch_iterator(items, batch_size):
-            tmp_index.save_objects(batch_items)
+        _run_in_batches(tmp_index.save_objects, items, batch_size, num_workers)
 
         # OK we're ready finally replace the index.
         client.move_index(tmp_index_name, index)
-    except exceptions.AlgoliaException as error:
+    except exceptions.AlgoliaException:
         tmp_index.delete()
-        logging.error(
-            'An error occurred while saving to Algolia:\n%s',
-            json.dumps(batch_items[:10], indent=2), exc_info=error)
         raise
+
+    if manifest_path:
+        _write_manifest(manifest_path, index, hashes)
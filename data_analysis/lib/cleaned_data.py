@@ -14,13 +14,28 @@ to import from. Each function should return a pandas DataFrame with cleaned
 values and column names. The documentation of the function should currently be
 the documentation of the returned DataFrame. See the rome_job_group as a good
 example.
+
+Tables are memoized in-process: calling the same function with the same
+arguments only parses the files once as long as they are not modified. Set the
+CLEANED_DATA_CACHE_FOLDER env var to also cache them on disk across processes.
+Note that a new table function must read its files through `_source` for this
+invalidation to work.
 """
 
 import codecs
 import collections
+import copy
+import functools
+import hashlib
+import inspect
+import logging
+import os
 from os import path
+import pickle
 import re
-from typing import Any, Optional, Set, Union
+import threading
+import typing
+from typing import Any, Callable, Optional, Set, TypeVar, Union
 
 import pandas
 from scrapy import selector
@@ -31,8 +46,171 @@ _ROME_VERSION = 'v347'
 # offers are given for 10 candidates.
 _YEARLY_AVG_OFFERS_DENOMINATOR = 10
 
+_Table = TypeVar('_Table', bound=Callable[..., Any])
+
+# Signature of a source file: path, modification time and size.
+_SourceSignature = tuple[str, int, int]
+
+# In-process cache of tables: keyed by function name and arguments, the values
+# are the signatures of the source files used to compute the table and the
+# table itself.
+_MEMO: dict[tuple[str, str], tuple[tuple[_SourceSignature, ...], Any]] = {}
+
+
+class _LoadingState(threading.local):
+
+    def __init__(self) -> None:
+        super().__init__()
+        # A stack of the sets of source files for the tables being computed.
+        self.sources: list[Set[str]] = []
+
+
+_LOADING = _LoadingState()
+
+
+def _source(filename: str) -> str:
+    """Record a file as a source of the table being computed and return its path."""
+
+    if _LOADING.sources:
+        _LOADING.sources[-1].add(filename)
+    return filename
+
+
+def _sign_sources(filenames: Set[str]) -> tuple[_SourceSignature, ...]:
+    signatures = []
+    for filename in sorted(filenames):
+        stat = os.stat(filename)
+        signatures.append((filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(signatures)
+
+
+def _are_sources_fresh(signatures: tuple[_SourceSignature, ...]) -> bool:
+    try:
+        return _sign_sources({filename for filename, unused_mtime, unused_size in signatures}) \
+            == signatures
+    except OSError:
+        return False
+
+
+def _is_mutable(value: Any) -> bool:
+    return isinstance(value, (list, dict, set))
+
+
+def _copy_mutable_cells(column: pandas.Series) -> pandas.Series:
+    if not column.map(_is_mutable).any():
+        return column
+    return column.map(copy.deepcopy)
+
+
+def _copy_table(table: Any) -> Any:
+    """Copy a cached table so that callers can modify it without changing the cache.
+
+    Cells holding mutable objects, e.g. lists of skills, are copied as well.
+    """
+
+    if isinstance(table, pandas.DataFrame):
+        table = table.copy()
+        for column in table.select_dtypes(include='object').columns:
+            table[column] = _copy_mutable_cells(table[column])
+        return table
+    if isinstance(table, pandas.Series):
+        return _copy_mutable_cells(table.copy())
+    return copy.deepcopy(table)
+
+
+def _read_disk_cache(cache_path: str) -> Optional[tuple[tuple[_SourceSignature, ...], Any]]:
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            cached = pickle.load(cache_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError) as error:
+        logging.warning('Ignoring unreadable cache file "%s": %s', cache_path, error)
+        return None
+    if not isinstance(cached, tuple) or len(cached) != 2:
+        return None
+    return cached
+
+
+def _write_disk_cache(
+        cache_path: str, cached: tuple[tuple[_SourceSignature, ...], Any]) -> None:
+    os.makedirs(path.dirname(cache_path), exist_ok=True)
+    # Write to a temp file first so that concurrent processes never read a partial file.
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as cache_file:
+        pickle.dump(cached, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+
+@functools.lru_cache()
+def _get_code_version() -> str:
+    """Get a hash of this module's code, so that on-disk caches are not reused across changes."""
+
+    with open(__file__, 'rb') as code_file:
+        return hashlib.sha1(code_file.read()).hexdigest()[:12]
+
+
+def _cached_table(func: _Table) -> _Table:
+    """Decorator to memoize a table and optionally cache it on disk.
+
+    The cache is invalidated as soon as the modification time or the size of
+    one of the source files (recorded with `_source`) changes.
+    """
+
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def _wrapped(*args: Any, **kwargs: Any) -> Any:
+        bound_args = signature.bind(*args, **kwargs)
+        bound_args.apply_defaults()
+        # Data folders are usually relative paths.
+        args_key = repr((os.getcwd(), sorted(bound_args.arguments.items())))
+        key = (func.__name__, args_key)
+
+        cached = _MEMO.get(key)
+        cache_folder = os.getenv('CLEANED_DATA_CACHE_FOLDER')
+        if cache_folder:
+            disk_key = hashlib.sha1(f'{_get_code_version()}:{args_key}'.encode('utf-8'))
+            cache_path: Optional[str] = path.join(
+                cache_folder, f'{func.__name__}_{disk_key.hexdigest()}.pickle')
+        else:
+            cache_path = None
+        if (not cached or not _are_sources_fresh(cached[0])) and cache_path:
+            cached = _read_disk_cache(cache_path)
+            if cached:
+                _MEMO[key] = cached
+
+        if cached and _are_sources_fresh(cached[0]):
+            # Let the table being computed, if any, depend on the same sources.
+            for filename, unused_mtime, unused_size in cached[0]:
+                _source(filename)
+            return _copy_table(cached[1])
+
+        _LOADING.sources.append(set())
+        try:
+            table = func(*args, **kwargs)
+        finally:
+            sources = _LOADING.sources.pop()
+        if _LOADING.sources:
+            _LOADING.sources[-1].update(sources)
+
+        cached = (_sign_sources(sources), table)
+        _MEMO[key] = cached
+        if cache_path:
+            _write_disk_cache(cache_path, cached)
+        return _copy_table(table)
+
+    return typing.cast(_Table, _wrapped)
+
+
+def clear_cache() -> None:
+    """Clear the in-process cache of tables (the on-disk cache is left untouched)."""
+
+    _MEMO.clear()
+
 
 # TODO: Use this function in city suggest importer to read the stats file.
+@_cached_table
 def french_city_stats(data_folder: str = 'data', filename_city_stats: Optional[str] = None) \
         -> pandas.DataFrame:
     """Read the french city stats."""
@@ -40,7 +218,7 @@ def french_city_stats(data_folder: str = 'data', filename_city_stats: Optional[s
     if not filename_city_stats:
         filename_city_stats = path.join(data_folder, 'geo/french_cities.csv')
     return pandas.read_csv(
-        filename_city_stats,
+        _source(filename_city_stats),
         sep=',', header=None, usecols=[1, 8, 10, 14, 19, 20],
         names=['departement_id', 'zipCode', 'city_id', 'population', 'longitude', 'latitude'],
         dtype={
@@ -108,6 +286,7 @@ def job_offers(
     return offers
 
 
+@_cached_table
 def rome_to_skills(
         data_folder: str = 'data', filename_items: Optional[str] = None,
         filename_skills: Optional[str] = None) -> pandas.DataFrame:
@@ -124,8 +303,8 @@ def rome_to_skills(
     if not filename_skills:
         filename_skills = path.join(
             data_folder, f'rome/csv/unix_referentiel_competence_{_ROME_VERSION}_utf8.csv')
-    rome_to_item = pandas.read_csv(filename_items, dtype=str)
-    skills = pandas.read_csv(filename_skills, dtype=str)
+    rome_to_item = pandas.read_csv(_source(filename_items), dtype=str)
+    skills = pandas.read_csv(_source(filename_skills), dtype=str)
     merged = pandas.merge(rome_to_item, skills, on='code_ogr')
     merged['skill_name'] = merged.libelle_competence.str.replace("''", "'", regex=False)\
         .apply(maybe_add_accents)
@@ -133,6 +312,7 @@ def rome_to_skills(
     return merged[['code_rome', 'code_ogr', 'skill_name', 'skill_is_practical']]
 
 
+@_cached_table
 def rome_job_groups(data_folder: str = 'data', filename: Optional[str] = None) -> pandas.DataFrame:
     """A list of all job groups in ROME with their names.
 
@@ -144,7 +324,7 @@ def rome_job_groups(data_folder: str = 'data', filename: Optional[str] = None) -
         filename = path.join(
             data_folder, f'rome/csv/unix_referentiel_code_rome_{_ROME_VERSION}_utf8.csv')
 
-    job_groups = pandas.read_csv(filename)
+    job_groups = pandas.read_csv(_source(filename))
 
     # Fix names that contain double '.
     job_groups['name'] = job_groups['libelle_rome'].str.replace("''", "'", regex=False)\
@@ -155,6 +335,7 @@ def rome_job_groups(data_folder: str = 'data', filename: Optional[str] = None) -
     return job_groups[['name']]
 
 
+@_cached_table
 def rome_holland_codes(data_folder: str = 'data', filename: Optional[str] = None) \
         -> pandas.DataFrame:
     """A list of all job groups in ROME with their Holland Codes.
@@ -169,12 +350,13 @@ def rome_holland_codes(data_folder: str = 'data', filename: Optional[str] = None
         filename = path.join(data_folder, filename)
 
     column_names = ['code_rome', 'major', 'minor']
-    holland_codes = pandas.read_csv(filename, names=column_names)
+    holland_codes = pandas.read_csv(_source(filename), names=column_names)
     holland_codes.major.fillna('', inplace=True)
     holland_codes.minor.fillna('', inplace=True)
     return holland_codes.set_index('code_rome')
 
 
+@_cached_table
 def rome_texts(data_folder: str = 'data', filename: Optional[str] = None) -> pandas.DataFrame:
     """A list of all job groups in ROME with some lengthy text definitions.
 
@@ -185,7 +367,7 @@ def rome_texts(data_folder: str = 'data', filename: Optional[str] = None) -> pan
     if not filename:
         filename = path.join(data_folder, f'rome/csv/unix_texte_{_ROME_VERSION}_utf8.csv')
 
-    texts = pandas.read_csv(filename).pivot_table(
+    texts = pandas.read_csv(_source(filename)).pivot_table(
         index='code_rome',
         columns='libelle_type_texte',
         values='libelle_texte',
@@ -196,6 +378,7 @@ def rome_texts(data_folder: str = 'data', filename: Optional[str] = None) -> pan
     })
 
 
+@_cached_table
 def rome_work_environments(
         data_folder: str = 'data', links_filename: Optional[str] = None,
         ref_filename: Optional[str] = None) -> pandas.DataFrame:
@@ -212,8 +395,8 @@ def rome_work_environments(
         ref_filename = path.join(
             data_folder, f'rome/csv/unix_referentiel_env_travail_{_ROME_VERSION}_utf8.csv')
 
-    links = pandas.read_csv(links_filename)
-    ref = pandas.read_csv(ref_filename)
+    links = pandas.read_csv(_source(links_filename))
+    ref = pandas.read_csv(_source(ref_filename))
     environments = pandas.merge(links, ref, on='code_ogr', how='inner')
     environments['name'] = environments.libelle_env_travail.str.replace("''", "'", regex=False)\
         .apply(maybe_add_accents)
@@ -222,6 +405,7 @@ def rome_work_environments(
     })[['name', 'code_ogr', 'code_rome', 'section']]
 
 
+@_cached_table
 def rome_jobs(data_folder: str = 'data', filename: Optional[str] = None) -> pandas.DataFrame:
     """A list of all jobs in ROME with their names and their groups.
 
@@ -233,7 +417,7 @@ def rome_jobs(data_folder: str = 'data', filename: Optional[str] = None) -> pand
         filename = path.join(
             data_folder, f'rome/csv/unix_referentiel_appellation_{_ROME_VERSION}_utf8.csv')
 
-    jobs = pandas.read_csv(filename, dtype=str)
+    jobs = pandas.read_csv(_source(filename), dtype=str)
 
     # Fix names that contain double '.
     jobs['name'] = jobs['libelle_appellation_court'].str.replace("''", "'", regex=False)\
@@ -244,6 +428,7 @@ def rome_jobs(data_folder: str = 'data', filename: Optional[str] = None) -> pand
     return jobs[['name', 'code_rome']]
 
 
+@_cached_table
 def rome_job_groups_mobility(
         data_folder: str = 'data', filename: Optional[str] = None, expand_jobs: bool = False) \
         -> pandas.DataFrame:
@@ -262,7 +447,7 @@ def rome_job_groups_mobility(
         filename = path.join(
             data_folder, f'rome/csv/unix_rubrique_mobilite_{_ROME_VERSION}_utf8.csv')
 
-    mobility = pandas.read_csv(filename, dtype=str)
+    mobility = pandas.read_csv(_source(filename), dtype=str)
     mobility.rename(columns={
         'code_rome': 'source_rome_id',
         'code_rome_cible': 'target_rome_id',
@@ -295,6 +480,7 @@ def rome_job_groups_mobility(
     ]]
 
 
+@_cached_table
 def rome_fap_mapping(data_folder: str = 'data', filename: Optional[str] = None) -> pandas.DataFrame:
     """Mapping from ROME ID to FAP codes.
 
@@ -304,7 +490,7 @@ def rome_fap_mapping(data_folder: str = 'data', filename: Optional[str] = None)
 
     if not filename:
         filename = path.join(data_folder, 'crosswalks/passage_fap2009_romev3.txt')
-    with codecs.open(filename, 'r', 'latin-1') as fap_file:
+    with codecs.open(_source(filename), 'r', 'latin-1') as fap_file:
         mapping: dict[str, Set[str]] = collections.defaultdict(set)
         for line in fap_file:
             matches = re.search(r'"(.*?)"+\s+=\s+"(.*?)"', line)
@@ -318,6 +504,7 @@ def rome_fap_mapping(data_folder: str = 'data', filename: Optional[str] = None)
     return pandas.Series(mapping, name='fap_codes').to_frame()
 
 
+@_cached_table
 def rome_isco08_mapping(
         data_folder: str = 'data', filename: Optional[str] = None) -> pandas.DataFrame:
     """Mapping from ROME ID to ISCO 08 codes.
@@ -327,7 +514,7 @@ def rome_isco08_mapping(
 
     if not filename:
         filename = path.join(data_folder, 'crosswalks/Correspondance_ROME_ISCO08.xlsx')
-    rome_to_isco_file = pandas.ExcelFile(filename, engine='openpyxl')
+    rome_to_isco_file = pandas.ExcelFile(_source(filename), engine='openpyxl')
     mapping = rome_to_isco_file.parse('ROME to ISCO-08', dtype='str')
     mapping.rename(
         {'Code ISCO08': 'isco08_code', 'Code ROME': 'rome_id'}, axis='columns', inplace=True)
@@ -335,6 +522,7 @@ def rome_isco08_mapping(
     return mapping.set_index('rome_id')[['isco08_code']]
 
 
+@_cached_table
 def naf_subclasses(data_folder: str = 'data', filename: Optional[str] = None) -> pandas.DataFrame:
     """NAF Sub classes.
 
@@ -344,13 +532,14 @@ def naf_subclasses(data_folder: str = 'data', filename: Optional[str] = None) ->
 
     if not filename:
         filename = path.join(data_folder, 'naf-2008.xls')
-    naf_2008 = pandas.read_excel(filename)
+    naf_2008 = pandas.read_excel(_source(filename))
     naf_2008 = naf_2008.iloc[2:, :]
     naf_2008.columns = ['code', 'name']
     naf_2008['code'] = naf_2008.code.str.replace('.', '', regex=False)
     return naf_2008.set_index('code')
 
 
+@_cached_table
 def french_departements(
         data_folder: str = 'data', filename: Optional[str] = None,
         oversea_filename: Optional[str] = None,
@@ -368,9 +557,9 @@ def french_departements(
     if not prefix_filename:
         prefix_filename = path.join(data_folder, 'geo/departement_prefix.tsv')
     departements = pandas.concat([
-        pandas.read_csv(filename, sep='\t', dtype=str),
-        pandas.read_csv(oversea_filename, sep='\t', dtype=str)])
-    prefixes = pandas.read_csv(prefix_filename, sep='\t', dtype=str).set_index('DEP')
+        pandas.read_csv(_source(filename), sep='\t', dtype=str),
+        pandas.read_csv(_source(oversea_filename), sep='\t', dtype=str)])
+    prefixes = pandas.read_csv(_source(prefix_filename), sep='\t', dtype=str).set_index('DEP')
     departements.rename(
         columns={
             'REGION': 'region_id',
@@ -384,6 +573,7 @@ def french_departements(
     return departements[['name', 'region_id', 'prefix']]
 
 
+@_cached_table
 def french_regions(
         data_folder: str = 'data', filename: Optional[str] = None,
         prefix_filename: Optional[str] = None) -> pandas.DataFrame:
@@ -396,16 +586,17 @@ def french_regions(
         filename = path.join(data_folder, 'geo/insee_france_regions.tsv')
     if not prefix_filename:
         prefix_filename = path.join(data_folder, 'geo/region_prefix.tsv')
-    regions = pandas.read_csv(filename, sep='\t', dtype=str)
+    regions = pandas.read_csv(_source(filename), sep='\t', dtype=str)
     regions.rename(
         columns={'REGION': 'region_id', 'NCCENR': 'name'}, inplace=True)
-    prefixes = pandas.read_csv(prefix_filename, sep='\t', dtype=str).set_index('REGION')
+    prefixes = pandas.read_csv(_source(prefix_filename), sep='\t', dtype=str).set_index('REGION')
     regions.set_index('region_id', inplace=True)
     regions['prefix'] = prefixes.PREFIX
     regions.prefix.fillna('', inplace=True)
     return regions[['name', 'prefix']]
 
 
+@_cached_table
 def french_cities(
         data_folder: str = 'data', filename: Optional[str] = None, unique: bool = False) \
         -> pandas.DataFrame:
@@ -419,7 +610,7 @@ def french_cities(
 
     if not filename:
         filename = path.join(data_folder, 'geo/insee_france_cities.tsv')
-    cities = pandas.read_csv(filename, sep='\t', dtype=str)
+    cities = pandas.read_csv(_source(filename), sep='\t', dtype=str)
 
     cities['city_id'] = cities.DEP + cities.COM
     if unique:
@@ -449,6 +640,7 @@ def french_cities(
         'name', 'departement_id', 'region_id', 'current', 'current_city_id', 'arrondissement']]
 
 
+@_cached_table
 def french_urban_areas(data_folder: str = 'data', filename: Optional[str] = None) \
         -> pandas.DataFrame:
     """French urban entities.
@@ -464,7 +656,7 @@ def french_urban_areas(data_folder: str = 'data', filename: Optional[str] = None
     if not filename:
         filename = path.join(data_folder, 'geo/french_urban_areas.xls')
     cities = pandas.read_excel(
-        filename,
+        _source(filename),
         sheet_name='Composition_communale',
         skiprows=5,
         index_col=0)
@@ -476,6 +668,7 @@ def french_urban_areas(data_folder: str = 'data', filename: Optional[str] = None
     return cities[['AU2010', 'periurban']]
 
 
+@_cached_table
 def french_urban_entities(data_folder: str = 'data', filename: Optional[str] = None) \
         -> pandas.DataFrame:
     """French urban entities.
@@ -498,7 +691,7 @@ def french_urban_entities(data_folder: str = 'data', filename: Optional[str] = N
     if not filename:
         filename = path.join(data_folder, 'geo/french_urban_entities.xls')
     sheets = pandas.read_excel(
-        filename,
+        _source(filename),
         sheet_name=['UU2010', 'Composition_communale'],
         skiprows=5,
         index_col=0)
@@ -509,6 +702,7 @@ def french_urban_entities(data_folder: str = 'data', filename: Optional[str] = N
     return entities[['UU2010', 'urban']]
 
 
+@_cached_table
 def scraped_imt(data_folder: str = 'data', filename: Optional[str] = None) -> pandas.DataFrame:
     """IMT - Information sur le Marché du Travail.
 
@@ -520,18 +714,19 @@ def scraped_imt(data_folder: str = 'data', filename: Optional[str] = None) -> pa
 
     if not filename:
         filename = path.join(data_folder, 'scraped_imt_local_job_stats.json')
-    imt = pandas.read_json(filename, orient='records')
+    imt = pandas.read_json(_source(filename), orient='records')
     imt['departement_id'] = imt.city.apply(lambda c: c['departementId'])
     imt['rome_id'] = imt.job.apply(lambda j: j['jobGroup']['romeId'])
     return imt.set_index(['departement_id', 'rome_id'])
 
 
+@_cached_table
 def transport_scores(data_folder: str = 'data', filename: Optional[str] = None) -> pandas.DataFrame:
     """Table of public transportation scores by city ID from ville-ideale.fr."""
 
     if not filename:
         filename = path.join(data_folder, 'geo/ville-ideale-transports.html')
-    with open(filename, 'rt', encoding='utf-8') as transport_file:
+    with open(_source(filename), 'rt', encoding='utf-8') as transport_file:
         page_text = transport_file.read()
     page_selector = selector.Selector(text=page_text)
 
@@ -579,6 +774,7 @@ def _merge_hard_skills(
     return skill_ids + activitie_ids
 
 
+# Not memoized: this table is too large to be kept in memory.
 def job_offers_skills(
         data_folder: str = 'data', job_offers_filename: Optional[str] = None,
         skills_filename: Optional[str] = None,
@@ -593,19 +789,19 @@ def job_offers_skills(
     if not job_offers_filename:
         job_offers_filename = path.join(data_folder, 'job_offers/recent_job_offers.csv')
     offers = pandas.read_csv(
-        job_offers_filename,
+        _source(job_offers_filename),
         dtype={'POSTCODE': str, 'ROME_LIST_SKILL_CODE': str, 'ROME_LIST_ACTIVITY_CODE': str},
         parse_dates=['CREATION_DATE', 'MODIFICATION_DATE'],
         dayfirst=True, infer_datetime_format=True, low_memory=False)
     if not skills_filename:
         skills_filename = path.join(
             data_folder, f'rome/csv/unix_referentiel_competence_{_ROME_VERSION}_utf8.csv')
-    skills = pandas.read_csv(skills_filename)
+    skills = pandas.read_csv(_source(skills_filename))
     skills.set_index('code_ogr', inplace=True)
     if not activities_filename:
         activities_filename = path.join(
             data_folder, f'rome/csv/unix_referentiel_activite_{_ROME_VERSION}_utf8.csv')
-    activities = pandas.read_csv(activities_filename)
+    activities = pandas.read_csv(_source(activities_filename))
     activities.set_index('code_ogr', inplace=True)
 
     # Cleaning columns.
@@ -642,6 +838,7 @@ def job_offers_skills(
     return unwind_offers_skills
 
 
+@_cached_table
 def market_scores(data_folder: str = 'data', filename: Optional[str] = None) -> pandas.DataFrame:
     """Market score at the departement level gathered and provided by Pôle emploi.
 
@@ -654,7 +851,7 @@ def market_scores(data_folder: str = 'data', filename: Optional[str] = None) ->
     if not filename:
         filename = path.join(data_folder, 'imt/market_score.csv')
 
-    market_stats = pandas.read_csv(filename, dtype={'AREA_CODE': 'str'})
+    market_stats = pandas.read_csv(_source(filename), dtype={'AREA_CODE': 'str'})
     market_stats['departement_id'] = market_stats.AREA_CODE
     market_stats['market_score'] = market_stats.TENSION_RATIO.div(_YEARLY_AVG_OFFERS_DENOMINATOR)
     market_stats['yearly_avg_offers_per_10_candidates'] = market_stats.TENSION_RATIO
@@ -669,6 +866,7 @@ def market_scores(data_folder: str = 'data', filename: Optional[str] = None) ->
     ]]
 
 
+@_cached_table
 def imt_salaries(
         data_folder: str = 'data', filename: Optional[str] = None,
         pcs_crosswalk_filename: Optional[str] = None) -> pandas.DataFrame:
@@ -683,8 +881,8 @@ def imt_salaries(
     if not pcs_crosswalk_filename:
         pcs_crosswalk_filename = path.join(data_folder, 'crosswalks/passage_pcs_romev3.csv')
 
-    pcs_rome = pandas.read_csv(pcs_crosswalk_filename)
-    salaries = pandas.read_csv(filename, dtype={'AREA_CODE': 'str'})
+    pcs_rome = pandas.read_csv(_source(pcs_crosswalk_filename))
+    salaries = pandas.read_csv(_source(filename), dtype={'AREA_CODE': 'str'})
     salaries_dept = salaries[
         (salaries.AREA_TYPE_CODE == 'D') & (salaries.MINIMUM_SALARY > 0)]
     salaries_dept = salaries_dept\
@@ -705,6 +903,7 @@ def imt_salaries(
         .apply(_group_salary_per_seniority)
 
 
+@_cached_table
 def jobs_without_qualifications(data_folder: str = 'data', filename: Optional[str] = None) \
         -> pandas.DataFrame:
     """Job groups that don't require any qualifications to get hired (training nor experience).
@@ -722,7 +921,7 @@ def jobs_without_qualifications(data_folder: str = 'data', filename: Optional[st
         filename = path.join(
             data_folder, f'rome/csv/unix_item_arborescence_{_ROME_VERSION}_utf8.csv')
 
-    rome_item_arborescence_data = pandas.read_csv(filename)
+    rome_item_arborescence_data = pandas.read_csv(_source(filename))
     unqualification_jobs_index = '017'
     first_level = rome_item_arborescence_data[
         rome_item_arborescence_data.code_pere == unqualification_jobs_index]
@@ -750,6 +949,7 @@ def _get_app_modes_perc(fap_modes: pandas.DataFrame) -> dict[str, Any]:
             for row in fap_modes.itertuples()]}
 
 
+@_cached_table
 def fap_application_modes(data_folder: str = 'data', filename: Optional[str] = None) \
         -> pandas.DataFrame:
     """Application modes per FAP.
@@ -761,6 +961,6 @@ def fap_application_modes(data_folder: str = 'data', filename: Optional[str] = N
     if not filename:
         filename = path.join(data_folder, 'imt/application_modes.csv')
 
-    modes = pandas.read_csv(filename)
+    modes = pandas.read_csv(_source(filename))
     return modes.sort_values('RECRUT_PERCENT', ascending=False).\
         groupby('FAP_CODE').apply(_get_app_modes_perc)
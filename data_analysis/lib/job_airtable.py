@@ -4,8 +4,11 @@ import os
 from typing import Any, Iterable, Optional
 
 from airtable import airtable
+import numpy
 import pandas
 
+from bob_emploi.data_analysis.lib import prefix_index
+
 
 def load_prefixed_info(
         job_groups: Iterable[str], airtable_ids: str, *,
@@ -38,6 +41,8 @@ def load_prefixed_info(
         view = None
 
     info = pandas.DataFrame(index=job_groups, columns=columns.keys())
+    positions_by_job_group = prefix_index.PrefixIndex(
+        (str(job_group), position) for position, job_group in enumerate(info.index))
 
     client = airtable.Airtable(base_id, airtable_api_key)
     sorted_records = sorted(
@@ -48,11 +53,13 @@ def load_prefixed_info(
         job_group_id_prefix = fields.get(job_group_id_field)
         if not job_group_id_prefix:
             continue
+        affected_job_groups = numpy.zeros(len(info.index), dtype=bool)
+        affected_job_groups[list(
+            positions_by_job_group.iterate_with_prefix(job_group_id_prefix))] = True
         for column in columns:
             if column not in fields:
                 continue
             field_value = fields[column]
-            affected_job_groups = info.index.str.startswith(job_group_id_prefix)
             if isinstance(field_value, str):
                 info.loc[affected_job_groups, column] = field_value.strip()
             else:
@@ -5,9 +5,14 @@ import collections
 import csv
 import logging
 import sys
-from typing import AbstractSet, Iterator, Optional, Tuple
+import typing
+from typing import AbstractSet, Any, Iterable, Iterator, Optional, TextIO, Tuple
 
 import pandas as pd
+import tqdm
+
+# Total number of job offers that we have in our "standard" input.
+TOTAL_RECORDS_ESTIMATE = 11170764
 
 
 def double_property_frequency(job_offers: pd.DataFrame, column: str, req_column: str) \
@@ -61,6 +66,33 @@ class _JobOffer(Tuple[Optional[str], ...]):
         """Access a field of the job offer."""
 
 
+def _read_column_names(colnames_txt: str) -> list[str]:
+    with open(colnames_txt, encoding='utf-8') as colnames_lines:
+        return [line.strip() for line in colnames_lines]
+
+
+def _get_min_num_values(column_names: list[str], required_fields: AbstractSet[str]) -> int:
+    """Get the minimum number of values a short row needs to cover all the required fields.
+
+    Without any required fields, short rows are never used.
+    """
+
+    if not required_fields:
+        return len(column_names)
+    if not required_fields < set(column_names):
+        raise ValueError(f'Required fields are missing: {required_fields - set(column_names)}')
+    return max(column_names.index(field) for field in required_fields) + 1
+
+
+def _iterate_rows(job_offers_csv: str) -> Iterator[list[str]]:
+    with codecs.open(job_offers_csv, encoding='latin-1') as job_offers_file:
+        # The CSV file has some very long fields.
+        csv.field_size_limit(sys.maxsize)
+        yield from csv.reader(
+            job_offers_file, delimiter='|', escapechar='\\',
+            quoting=csv.QUOTE_NONE)
+
+
 def iterate(
         job_offers_csv: str, colnames_txt: str,
         required_fields: Optional[AbstractSet[str]] = None) \
@@ -81,29 +113,120 @@ def iterate(
             fields.
     """
 
+    column_names = _read_column_names(colnames_txt)
+    min_num_values = _get_min_num_values(column_names, required_fields or set())
+    job_offer_type = collections.namedtuple('JobOffer', column_names)  # type: ignore
+    for row in _iterate_rows(job_offers_csv):
+        if len(row) != len(column_names):
+            logging.warning('A line does not contain enough values:\n%s', row)
+            if min_num_values < len(row):
+                row = row + [None] * (len(column_names) - len(row))  # type: ignore
+            else:
+                logging.warning('Skipping this line')
+                continue
+        yield job_offer_type(*row)  # type: ignore
+
+
+def iterate_chunks(
+        job_offers_csv: str, colnames_txt: str, fields: AbstractSet[str],
+        chunk_size: int = 100_000) -> Iterator[pd.DataFrame]:
+    """Iterate on all job offers lazily, by chunks of rows with only some columns.
+
+    This is much faster than iterate when only a few fields are needed.
+
+    Args:
+        job_offers_csv: The CSV containing all job offers.
+        colnames_txt: A txt file containing the name of the CSV's columns (one
+            by line).
+        fields: the fields to read, they should exist in the CSV file.
+        chunk_size: the max number of job offers in each chunk.
+
+    Yields:
+        A DataFrame with one column of strings per field, and one row per job
+        offer. Missing values at the end of short lines are NaN.
+
+    Raises:
+        ValueError: if the column names do not include one of the fields.
+    """
+
     with open(colnames_txt, encoding='utf-8') as colnames_lines:
         column_names = [line.strip() for line in colnames_lines]
-    if required_fields and not required_fields < set(column_names):
-        raise ValueError(f'Required fields are missing: {required_fields - set(column_names)}')
-    min_num_required_fields = -1
-    if required_fields:
-        for field in required_fields:
-            field_index = column_names.index(field)
-            if field_index + 1 > min_num_required_fields:
-                min_num_required_fields = field_index + 1
+    if not fields <= set(column_names):
+        raise ValueError(f'Required fields are missing: {fields - set(column_names)}')
+    with pd.read_csv(
+            job_offers_csv, sep='|', escapechar='\\', quoting=csv.QUOTE_NONE,
+            encoding='latin-1', header=None, names=column_names, usecols=sorted(fields),
+            dtype=str, keep_default_na=False, on_bad_lines='warn',
+            chunksize=chunk_size) as chunks:
+        yield from chunks
+
+
+class Aggregator(typing.Protocol):
+    """An object that collects data from job offers during a scan."""
+
+    @property
+    def required_fields(self) -> AbstractSet[str]:
+        """Fields of the job offers needed by this aggregator."""
+
+    def collect(self, job_offer: _JobOffer) -> None:
+        """Collect data from a single job offer."""
+
+
+class DictsAggregator(Aggregator, typing.Protocol):
+    """An aggregator whose output is a list of JSON-proto compatible dicts."""
+
+    def get_dicts(self) -> list[dict[str, Any]]:
+        """Get the data collected as a list of dicts, ready to be imported."""
+
+
+def scan(
+        job_offers_csv: str, colnames_txt: str, aggregators: Iterable[Aggregator],
+        total: Optional[int] = None, progress_file: Optional[TextIO] = None) -> None:
+    """Feed all job offers to several aggregators in a single pass on the file.
+
+    Args:
+        job_offers_csv: The CSV containing all job offers.
+        colnames_txt: A txt file containing the name of the CSV's columns (one
+            by line).
+        aggregators: the aggregators to feed. Each job offer is given to each
+            aggregator in turn, in the order they are given. A line that is too
+            short is only given to the aggregators whose required fields it
+            covers, as iterate would do for each of them.
+        total: if set, the estimated number of job offers in the file, and a
+            progress bar is shown.
+        progress_file: the file where to display the progress bar, defaults to
+            stderr.
+
+    Raises:
+        ValueError: if the column names do not include one of the fields
+            required by the aggregators.
+    """
+
+    aggregators = list(aggregators)
+    column_names = _read_column_names(colnames_txt)
+    # Each aggregator gets the same job offers as when iterating on the file on its own: a short
+    # line is only given to the aggregators whose fields it covers.
+    min_num_values = [
+        _get_min_num_values(column_names, aggregator.required_fields)
+        for aggregator in aggregators]
     job_offer_type = collections.namedtuple('JobOffer', column_names)  # type: ignore
-    with codecs.open(job_offers_csv, encoding='latin-1') as job_offers_file:
-        # The CSV file has some very long fields.
-        csv.field_size_limit(sys.maxsize)
-        job_offers_rows = csv.reader(
-            job_offers_file, delimiter='|', escapechar='\\',
-            quoting=csv.QUOTE_NONE)
-        for row in job_offers_rows:
-            if len(row) != len(column_names):
-                logging.warning('A line does not contain enough values:\n%s', row)
-                if required_fields and min_num_required_fields < len(row):
-                    row = row + [None] * (len(column_names) - len(row))  # type: ignore
-                else:
-                    logging.warning('Skipping this line')
-                    continue
-            yield job_offer_type(*row)  # type: ignore
+    rows: Iterable[list[str]] = _iterate_rows(job_offers_csv)
+    if total:
+        rows = tqdm.tqdm(rows, total=total, file=progress_file)
+    for row in rows:
+        num_values = len(row)
+        if num_values == len(column_names):
+            row_aggregators = aggregators
+        else:
+            logging.warning('A line does not contain enough values:\n%s', row)
+            row_aggregators = [
+                aggregator
+                for aggregator, aggregator_min_num_values in zip(aggregators, min_num_values)
+                if aggregator_min_num_values < num_values]
+            if not row_aggregators:
+                logging.warning('Skipping this line')
+                continue
+            row = row + [None] * (len(column_names) - num_values)  # type: ignore
+        job_offer = job_offer_type(*row)
+        for aggregator in row_aggregators:
+            aggregator.collect(job_offer)
@@ -10,54 +10,77 @@ TODO(cyrille): Replace with area_id.
     smaller values mean a more stressed market.
 """
 
-import itertools
 import typing
-from typing import Any, Iterator, Optional, TypedDict
+from typing import Any, Callable, Iterator, Optional
 
+import numpy as np
 import pandas as pd
 
 
-class _BetterMarket(TypedDict):
-    target_job_group: str
-    market_score_target: int
-
-
-def _less_stressful_job_groups(
-        job_group_prefix: str, market_scores: pd.DataFrame, career_jumps: pd.DataFrame) \
-        -> dict[str, list[_BetterMarket]]:
-    """Compute the less stressful job groups locally.
-
-    Assumes market_scores has columns 'Area', 'local_id', 'job_group' and 'market_score'.
+def get_better_markets(
+        markets: pd.DataFrame, career_jumps: pd.DataFrame,
+        is_better: Callable[[pd.Series, pd.Series], pd.Series],
+        max_better_markets: int = 5) -> pd.DataFrame:
+    """Find the best markets to switch to from each market, following career jumps.
+
+    Markets and career jumps are joined once on integer codes of their keys, there is no need to
+    chunk them.
+
+    Args:
+        markets: a DataFrame with columns 'job_group', 'district_id' and 'market_score'.
+        career_jumps: a DataFrame with columns 'job_group' and 'target_job_group'.
+        is_better: a function taking the market scores of the source and target markets, and
+            returning whether the switch is interesting.
+        max_better_markets: the maximum number of better markets to keep for each market.
+    Returns:
+        a DataFrame with a row per switch sorted by source market (job group, then district) and
+        by decreasing target market score. Its columns 'market', 'jump' and 'target_market' are
+        the positions of the source market, the career jump and the target market in the inputs,
+        and 'market_score' and 'target_score' are the scores of the markets.
     """
 
-    career_jumps = career_jumps[career_jumps.job_group.str.startswith(job_group_prefix)]
-    all_changes = career_jumps\
-        .merge(market_scores, on='job_group')\
-        .merge(
-            market_scores[['job_group', 'market_score', 'district_id']],
-            left_on=['target_job_group', 'district_id'], right_on=['job_group', 'district_id'],
-            suffixes=('', '_target'))
-    local_stats = \
-        all_changes[all_changes.market_score * 1.5 < all_changes.market_score_target]\
-        .sort_values('market_score_target', ascending=False)[[
-            'local_id', 'market_score_target', 'target_job_group']]\
-        .groupby(['local_id'])\
-        .apply(lambda x: x[:5].to_dict(orient='records'))
-    return typing.cast(dict[str, list[_BetterMarket]], local_stats.to_dict())
+    num_markets = len(markets.index)
+    num_jumps = len(career_jumps.index)
+    job_group_codes = pd.factorize(pd.concat([
+        markets.job_group, career_jumps.job_group, career_jumps.target_job_group,
+    ], ignore_index=True), sort=True)[0]
+    coded_markets = pd.DataFrame({
+        'job_group': job_group_codes[:num_markets],
+        'district': pd.factorize(markets.district_id, sort=True)[0],
+        'market_score': markets.market_score.to_numpy(),
+        'market': np.arange(num_markets),
+    })
+    coded_jumps = pd.DataFrame({
+        'job_group': job_group_codes[num_markets:num_markets + num_jumps],
+        'target_job_group': job_group_codes[num_markets + num_jumps:],
+        'jump': np.arange(num_jumps),
+    })
+    target_markets = coded_markets.rename(columns={
+        'job_group': 'target_job_group',
+        'market_score': 'target_score',
+        'market': 'target_market',
+    })
+    switches = coded_jumps\
+        .merge(coded_markets, on='job_group')\
+        .merge(target_markets, on=['target_job_group', 'district'])
+    switches = switches[is_better(switches.market_score, switches.target_score)]\
+        .sort_values(['job_group', 'district', 'target_score'], ascending=[True, True, False])
+    ranks = switches\
+        .groupby(['job_group', 'district'])\
+        .target_score.rank(method='first', ascending=False)
+    return switches[ranks <= max_better_markets].reset_index(drop=True)
 
 
 def local_diagnosis(
         market_score_frame: pd.DataFrame,
         career_jumps: Optional[pd.DataFrame] = None,
-        salaries: Optional[pd.Series] = None, prefix_length: int = 0,
+        salaries: Optional[pd.Series] = None,
         job_group_names: Optional[dict[str, str]] = None,
         skip_markets: Optional[frozenset[str]] = None) \
         -> Iterator[dict[str, Any]]:
     """Add the lessStressfulJobGroups and numLessStressfulDepartements to the local diagnosis.
 
     career_jumps is a DataFrame with columns 'job_group', 'target_job_group'.
-    prefix_length is a cursor to avoid doing joins on large table. Smaller values use more memory,
-        but less time.
     """
 
     local_stats = market_score_frame[[
@@ -67,34 +90,41 @@ def local_diagnosis(
         .groupby(['job_group'])\
         .cumcount()
 
-    salaries_map = salaries.set_index('local_id').to_dict() if salaries is not None else {}
-    for job_group_prefix, markets in itertools.groupby(
-            local_stats.itertuples(),
-            lambda market: typing.cast(str, market.job_group[:prefix_length])):
-        better_job_groups = _less_stressful_job_groups(
-            job_group_prefix, local_stats, career_jumps) if career_jumps is not None else {}
-        for market in markets:
-            if skip_markets and market.local_id in skip_markets:
-                continue
-            yield {
-                '_id': market.local_id,
-                'imt': {
-                    'yearlyAvgOffersPer10Candidates': market.market_score,
-                    'medianSalary': salaries_map.get('salary', {}).get(market.local_id, {})
+    better_job_groups: dict[str, list[dict[str, Any]]] = {}
+    if career_jumps is not None:
+        switches = get_better_markets(
+            local_stats, career_jumps, lambda score, target_score: score * 1.5 < target_score)
+        local_ids = local_stats.local_id.to_numpy()[switches.market.to_numpy()]
+        target_job_groups = local_stats.job_group.to_numpy()[switches.target_market.to_numpy()]
+        for local_id, target_job_group, target_score in zip(
+                local_ids.tolist(), target_job_groups.tolist(), switches.target_score.tolist()):
+            better_job_groups.setdefault(local_id, []).append({
+                'jobGroup': {
+                    'romeId': target_job_group,
+                    'name': job_group_names.get(target_job_group, '') if job_group_names else '',
                 },
-                'lessStressfulJobGroups': [{
-                    'jobGroup': {
-                        'romeId': jg['target_job_group'],
-                        'name':
-                        job_group_names.get(jg['target_job_group'], '') if job_group_names else '',
-                    },
-                    'mobilityType': 'CLOSE',
-                    'localStats': {
-                        'imt': {'yearlyAvgOffersPer10Candidates': jg['market_score_target']},
-                    },
-                } for jg in better_job_groups.get(market.local_id, [])],
-                'numLessStressfulDepartements': market.numLessStressfulDepartements,
-            }
+                'mobilityType': 'CLOSE',
+                'localStats': {
+                    'imt': {'yearlyAvgOffersPer10Candidates': target_score},
+                },
+            })
+
+    salaries_map = salaries.set_index('local_id').to_dict() if salaries is not None else {}
+    median_salaries = salaries_map.get('salary', {})
+    for local_id, market_score, num_less_stressful_departements in zip(
+            local_stats.local_id.tolist(), local_stats.market_score.tolist(),
+            local_stats.numLessStressfulDepartements.tolist()):
+        if skip_markets and local_id in skip_markets:
+            continue
+        yield {
+            '_id': local_id,
+            'imt': {
+                'yearlyAvgOffersPer10Candidates': market_score,
+                'medianSalary': median_salaries.get(local_id, {})
+            },
+            'lessStressfulJobGroups': better_job_groups.get(local_id, []),
+            'numLessStressfulDepartements': num_less_stressful_departements,
+        }
 
 
 def _zero_to_minus_one(val: int) -> int:
@@ -109,15 +139,16 @@ def get_less_stressful_districts(market_scores: pd.DataFrame, max_districts: int
     """
 
     scores = market_scores.sort_values(['job_group', 'market_score'], ascending=False)
-
-    return pd.Series({
-        job_group: [{
-            'departementId': local_market.district_id,
+    if max_districts:
+        scores = scores[scores.groupby('job_group').cumcount() < max_districts]
+
+    districts: dict[str, list[dict[str, Any]]] = {}
+    for job_group, district_id, market_score in zip(
+            scores.job_group.tolist(), scores.district_id.tolist(), scores.market_score.tolist()):
+        districts.setdefault(typing.cast(str, job_group), []).append({
+            'departementId': district_id,
             'localStats': {'imt': {
-                'yearlyAvgOffersPer10Candidates':
-                _zero_to_minus_one(local_market.market_score),
+                'yearlyAvgOffersPer10Candidates': _zero_to_minus_one(market_score),
             }},
-        } for local_market in (
-            itertools.islice(markets, max_districts) if max_districts else markets)]
-        for job_group, markets in itertools.groupby(
-            scores.itertuples(), lambda t: typing.cast(str, t.job_group))})
+        })
+    return pd.Series(districts)
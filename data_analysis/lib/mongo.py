@@ -2,6 +2,9 @@
 
 import argparse
 import collections
+from concurrent import futures
+import functools
+import hashlib
 import inspect
 import itertools
 import json
@@ -9,6 +12,7 @@ import logging
 import os
 import re
 import sys
+import threading
 import time
 import typing
 from typing import Any, Callable, Iterable, Iterator, Mapping, NoReturn, Optional, \
@@ -26,6 +30,7 @@ from google.protobuf import message
 from bob_emploi.common.python import now
 from bob_emploi.data_analysis.lib import batch
 
+# pylint: disable=too-many-lines
 _TQDM_OUTPUT = sys.stdout
 
 # Get mongo URL from the environment.
@@ -38,6 +43,18 @@ _SLACK_IMPORT_URL = os.getenv('SLACK_IMPORT_URL')
 JsonType = dict[str, Any]
 _FlagableCallable = Callable[..., Iterable[JsonType]]
 
+# Above this number of entries, only a summary of the diff is shown.
+_MAX_ENTRIES_FOR_DETAILED_DIFF = 1000
+
+# Maximum number of sample IDs shown per kind of change in a diff summary.
+_MAX_DIFF_SAMPLES = 10
+
+# Field in which the hash of a document's content can be stored.
+_HASH_FIELD = '_hash'
+
+# Suffix of the archives that only contain the documents changed by an incremental import.
+CHANGE_LOG_SUFFIX = '.changes'
+
 
 _T = typing.TypeVar('_T')
 
@@ -93,6 +110,10 @@ class Importer:
         real_collection = self._collection_from_flags(collection_name)
         has_old_data = bool(real_collection.estimated_document_count())
 
+        if self.flag_values.incremental and has_old_data:
+            self._import_incrementally(items, real_collection, check_error)
+            return
+
         items_list: list[JsonType] = []
         if count_estimate is None:
             items_list = list(items)
@@ -111,11 +132,12 @@ class Importer:
         if not has_diff:
             return
 
-        if self.flag_values.fail_on_diff:
-            self._print_in_report('There are some diffs to import.')
-            raise ValueError('There are some diffs to import.')
+        # Streamed items can only be compared to the old ones once they are in the DB.
+        # The temporary collection is then dropped if the diff is not accepted, e.g. with
+        # fail_on_diff, so that the new items never need to be sorted in memory.
+        should_diff_after_insert = has_old_data and count_estimate is not None
 
-        if has_diff_to_review and not self._approve_diff():
+        if not should_diff_after_insert and not self._accept_diff(has_diff_to_review):
             return
 
         unique_suffix = f'_{round(time.time() * 1e6):x}'
@@ -124,8 +146,10 @@ class Importer:
         collection = collection.database.get_collection(collection.name)
         chunk_size = self.flag_values.chunk_size
         try:
-            # Splitting in chunk is only done to display progress, as pymongo
-            # already cut it in small pieces:
+            if not self.flag_values.defer_indexes:
+                _copy_secondary_indexes(real_collection, collection)
+            # Splitting in chunk is done to display progress and to send
+            # several chunks in parallel, as pymongo already cut it in small pieces:
             # https://api.mongodb.com/python/current/examples/bulk.html
             if not chunk_size or chunk_size >= total:
                 self._print_in_report(f'Inserting all {total:d} objects at once.')
@@ -137,36 +161,218 @@ class Importer:
                     raise
             else:
                 self._print_in_report(f'Inserting {total:d} objects in chunks of {chunk_size}')
-                with tqdm.tqdm(None, total=total, file=_TQDM_OUTPUT) as progress_bar:
-                    for chunk in batch.batch_iterator(items, chunk_size):
-                        try:
-                            collection.insert_many(chunk)
-                            progress_bar.update(len(chunk))
-                        except pymongo_errors.BulkWriteError as error:
-                            self._print_in_report(error.details)
-                            raise
+                self._insert_concurrently(
+                    collection, batch.batch_iterator(items, chunk_size), total)
+            if self.flag_values.defer_indexes:
+                _copy_secondary_indexes(real_collection, collection)
+
+            if should_diff_after_insert:
+                has_diff_to_review, has_diff = self._print_sorted_diff(
+                    _iterate_sorted_hashes(collection), real_collection)
+                if not has_diff or not self._accept_diff(has_diff_to_review):
+                    collection.drop()
+                    return
         except Exception:
             collection.drop()
             raise
 
         # Archive current content if any.
         if has_old_data:
-            today = now.get().date().isoformat()
-            archive_collection = self._collection_from_flags(
-                collection_name, suffix=f'.{today}{unique_suffix}')
+            archive_collection = self._archive_collection(real_collection, unique_suffix)
             real_collection.aggregate([{'$out': archive_collection.name}])
-            # Drop old archives (exclude the ones archived today and keep only one additional).
-            old_versions = sorted(
-                name for name in real_collection.database.list_collection_names()
-                if name.startswith(real_collection.name + '.') and
-                not name.startswith(real_collection.name + f'.{today}')
-            )
-            for old_version in old_versions[:-1]:
-                real_collection.database.drop_collection(old_version)
 
         collection.rename(real_collection.name, dropTarget=True)
+        self._update_meta(real_collection)
+
+    def _insert_concurrently(
+            self,
+            collection: pymongo_collection.Collection,
+            chunks: Iterable[list[JsonType]],
+            total: int) -> None:
+        """Insert chunks of documents in parallel, as they get produced.
+
+        Only a bounded number of chunks are kept in memory: when all writers are busy, the
+        production of chunks is paused. Chunks are inserted unordered, and if some insertions fail,
+        the other chunks are still inserted, and errors are aggregated in a single BulkWriteError.
+        """
+
+        num_writers = max(1, self.flag_values.num_writers)
+        # Chunks being written, and chunks waiting for a writer.
+        available_slots = threading.BoundedSemaphore(2 * num_writers)
+        inserted_counts: list[int] = []
+        error_details: list[Tuple[int, JsonType]] = []
+        other_errors: list[BaseException] = []
+
+        def _insert_chunk(chunk: list[JsonType]) -> int:
+            try:
+                collection.insert_many(chunk, ordered=False)
+                return len(chunk)
+            finally:
+                available_slots.release()
+
+        with tqdm.tqdm(None, total=total, file=_TQDM_OUTPUT) as progress_bar, \
+                futures.ThreadPoolExecutor(max_workers=num_writers) as executor:
+
+            def _on_chunk_done(future: 'futures.Future[int]', offset: int) -> None:
+                error = future.exception()
+                if isinstance(error, pymongo_errors.BulkWriteError):
+                    error_details.append((offset, error.details))
+                elif error:
+                    other_errors.append(error)
+                else:
+                    inserted_counts.append(future.result())
+                    progress_bar.update(future.result())
+
+            offset = 0
+            for chunk in chunks:
+                available_slots.acquire()
+                if error_details or other_errors:
+                    available_slots.release()
+                    break
+                future = executor.submit(_insert_chunk, chunk)
+                future.add_done_callback(functools.partial(_on_chunk_done, offset=offset))
+                offset += len(chunk)
+
+        if other_errors:
+            raise other_errors[0]
+        if error_details:
+            details = _merge_bulk_write_error_details(error_details)
+            details['nInserted'] += sum(inserted_counts)
+            self._print_in_report(details)
+            raise pymongo_errors.BulkWriteError(details)
+
+    def _import_incrementally(
+            self,
+            items: Iterable[JsonType],
+            real_collection: pymongo_collection.Collection,
+            check_error: Optional[Exception] = None) -> None:
+        """Only write the documents that changed since the previous import.
+
+        The old hashes are fetched from the DB for each chunk of new documents, so only the IDs of
+        the new documents are kept in memory, as well as the changed documents.
+        """
+
+        has_stored_hashes = not real_collection.find_one(
+            {_HASH_FIELD: {'$exists': False}}, {'_id': 1})
+        hash_projection = {_HASH_FIELD: 1} if has_stored_hashes else None
+
+        summary = _DiffSummary()
+        writes: list[Union[pymongo.ReplaceOne, pymongo.DeleteOne]] = []
+        touched_ids: list[Any] = []
+        new_ids: Set[Any] = set()
+        for chunk in batch.batch_iterator(items, self.flag_values.chunk_size or 10000):
+            chunk_ids = [document.get('_id') for document in chunk]
+            if None in chunk_ids:
+                raise ValueError('Incremental imports need an "_id" in each document.')
+            old_hashes = {
+                old_document['_id']: old_document[_HASH_FIELD] if has_stored_hashes else
+                hash_document(old_document)
+                for old_document in real_collection.find(
+                    {'_id': {'$in': chunk_ids}}, hash_projection)
+            }
+            for document_id, document in zip(chunk_ids, chunk):
+                new_ids.add(document_id)
+                document_hash = hash_document(document)
+                old_hash = old_hashes.get(document_id)
+                if old_hash == document_hash:
+                    continue
+                if old_hash is None:
+                    summary.add(document_id)
+                else:
+                    summary.change(document_id)
+                    touched_ids.append(document_id)
+                writes.append(pymongo.ReplaceOne(
+                    {'_id': document_id}, dict(document, **{_HASH_FIELD: document_hash}),
+                    upsert=True))
+        for old_document in real_collection.find({}, {'_id': 1}).sort('_id', pymongo.ASCENDING):
+            document_id = old_document['_id']
+            if document_id in new_ids:
+                continue
+            summary.remove(document_id)
+            touched_ids.append(document_id)
+            writes.append(pymongo.DeleteOne({'_id': document_id}))
+
+        if check_error:
+            raise check_error
+
+        has_diff_to_review, has_diff = self._print_diff_summary(summary)
+        if not has_diff:
+            if not has_stored_hashes:
+                self._store_hashes(real_collection)
+            return
+
+        if not self._accept_diff(has_diff_to_review):
+            return
+
+        # Keep the previous version of the changed and removed documents as a change log. It is
+        # not a full archive, so it cannot be used to revert the collection.
+        chunk_size = self.flag_values.chunk_size or len(writes)
+        unique_suffix = f'_{round(time.time() * 1e6):x}'
+        archive_collection = self._archive_collection(
+            real_collection, unique_suffix + CHANGE_LOG_SUFFIX)
+        for ids in batch.batch_iterator(touched_ids, chunk_size):
+            archive_collection.insert_many(real_collection.find({'_id': {'$in': ids}}))
+
+        self._print_in_report(f'Writing {len(writes):d} changes in chunks of {chunk_size}')
+        with tqdm.tqdm(None, total=len(writes), file=_TQDM_OUTPUT) as progress_bar:
+            for chunk in batch.batch_iterator(writes, chunk_size):
+                try:
+                    real_collection.bulk_write(chunk, ordered=False)
+                    progress_bar.update(len(chunk))
+                except pymongo_errors.BulkWriteError as error:
+                    self._print_in_report(error.details)
+                    raise
+
+        if not has_stored_hashes:
+            self._store_hashes(real_collection)
+
+        self._update_meta(real_collection, {
+            'last_changes': {
+                'added': summary.num_added,
+                'changed': summary.num_changed,
+                'removed': summary.num_removed,
+            },
+        })
+
+    def _store_hashes(self, collection: pymongo_collection.Collection) -> None:
+        """Store the content hash of all the documents that do not have one yet."""
+
+        chunk_size = self.flag_values.chunk_size or 10000
+        documents = collection.find({_HASH_FIELD: {'$exists': False}})
+        for chunk in batch.batch_iterator(documents, chunk_size):
+            collection.bulk_write([
+                pymongo.UpdateOne(
+                    {'_id': document['_id']}, {'$set': {_HASH_FIELD: hash_document(document)}})
+                for document in chunk
+            ], ordered=False)
+
+    def _archive_collection(
+            self, real_collection: pymongo_collection.Collection, unique_suffix: str) \
+            -> pymongo_collection.Collection:
+        """Get a new archive collection and drop the old archives.
+
+        Archives made today are kept, and only one additional one. Change logs of incremental
+        imports are pruned separately, so that they never replace the last full archive.
+        """
+
+        today = now.get().date().isoformat()
+        old_versions = sorted(
+            name for name in real_collection.database.list_collection_names()
+            if name.startswith(real_collection.name + '.') and
+            not name.startswith(real_collection.name + f'.{today}')
+        )
+        old_archives = [name for name in old_versions if not name.endswith(CHANGE_LOG_SUFFIX)]
+        old_change_logs = [name for name in old_versions if name.endswith(CHANGE_LOG_SUFFIX)]
+        for old_version in old_archives[:-1] + old_change_logs[:-1]:
+            real_collection.database.drop_collection(old_version)
+        return real_collection.database.get_collection(
+            f'{real_collection.name}.{today}{unique_suffix}')
+
+    def _update_meta(
+            self, real_collection: pymongo_collection.Collection,
+            extra_fields: Optional[JsonType] = None) -> None:
         meta = self._collection_from_flags('meta', collection_name_from_flags=False)
-        setter = {'updated_at': now.get()}
+        setter = dict(extra_fields or {}, updated_at=now.get())
         if self.flag_values.run_every:
             setter['run_every'] = self.flag_values.run_every
         meta.update_one(
@@ -194,12 +400,14 @@ class Importer:
         Returns: whether there is a diff to approve, and whether there is a diff to import.
         """
 
-        new_list_len = len(new_list)
-        if new_list_len > 1000:
-            self._print_in_report(f'Too many entries to diff ({new_list_len}).')
-            return False, True
+        if len(new_list) > _MAX_ENTRIES_FOR_DETAILED_DIFF:
+            new_hashes = sorted(
+                ((document.get('_id'), hash_document(document)) for document in new_list),
+                key=lambda id_and_hash: _sort_key(id_and_hash[0]))
+            return self._print_sorted_diff(new_hashes, old_mongo_collection)
 
-        old_list = list(old_mongo_collection.find())
+        # Hashes stored by incremental imports are not part of the data.
+        old_list = list(old_mongo_collection.find({}, {_HASH_FIELD: 0}))
 
         diff = _compute_diff(old_list, new_list)
         if not diff:
@@ -211,6 +419,51 @@ class Importer:
 
         return True, True
 
+    def _print_sorted_diff(
+            self,
+            new_hashes: Iterable[Tuple[Any, str]],
+            old_mongo_collection: pymongo_collection.Collection) -> Tuple[bool, bool]:
+        """Print a summary of the difference between an old and a new dataset.
+
+        Contrary to _print_diff, this never holds the old or new dataset in memory.
+
+        Args:
+            new_hashes: the IDs and content hashes of the new documents, sorted by ID.
+            old_mongo_collection: the collection containing the old dataset.
+
+        Returns: whether there is a diff to approve, and whether there is a diff to import.
+        """
+
+        return self._print_diff_summary(
+            _compute_sorted_diff(_iterate_sorted_hashes(old_mongo_collection), new_hashes))
+
+    def _print_diff_summary(self, summary: '_DiffSummary') -> Tuple[bool, bool]:
+        """Print the summary of a diff.
+
+        Returns: whether there is a diff to approve, and whether there is a diff to import.
+        """
+
+        if not summary:
+            self._print_in_report('The data is already up to date.')
+            return False, False
+
+        self._print_in_report(
+            f'Diff summary: {summary.num_added:d} added, {summary.num_removed:d} removed, '
+            f'{summary.num_changed:d} changed.')
+        if not self.flag_values.always_accept_diff:
+            self._print(json.dumps(summary.samples, indent=2, ensure_ascii=False))
+
+        return True, True
+
+    def _accept_diff(self, has_diff_to_review: bool) -> bool:
+        """Check whether a diff can be imported, asking for a review if needed."""
+
+        if self.flag_values.fail_on_diff:
+            self._print_in_report('There are some diffs to import.')
+            raise ValueError('There are some diffs to import.')
+
+        return not has_diff_to_review or self._approve_diff()
+
     def _approve_diff(self) -> bool:
         """Review the difference between an old and new dataset."""
 
@@ -372,10 +625,12 @@ def importer_main(
 
     Flags:
         to_json: when this flag is used all the other mongo flags are ignored
-            and nothing is imported to the DB.
+            and nothing is imported to the DB. If the file has an .ndjson or
+            .jsonl extension, documents are written one per line as they are
+            computed.
         from_json: when this flag is used, all the other importing flags are
             ignored and no data is computed from source, just pulled from the
-            json file.
+            json file. NDJSON files are streamed line by line.
     """
 
     logging.basicConfig(level='INFO')
@@ -388,8 +643,14 @@ def importer_main(
 
     _define_flags_args(func, parser, extra_args)
 
-    parser.add_argument('--to_json', help='Path to the JSON file to save the data in.')
-    parser.add_argument('--from_json', help='Path to the JSON file from which to read data.')
+    parser.add_argument(
+        '--to_json',
+        help='Path to the JSON file to save the data in. Use the .ndjson extension to stream '
+        'documents one per line.')
+    parser.add_argument(
+        '--from_json',
+        help='Path to the JSON file from which to read data. NDJSON files (.ndjson extension) '
+        'are read lazily.')
     parser.add_argument(
         '--filter_ids',
         help='A regular expression to filter data before importing it. This is '
@@ -401,6 +662,17 @@ def importer_main(
         help='The frequency at which the import should be made, if it were automated.')
     parser.add_argument(
         '--chunk-size', type=int, default=10000, help='Import data in chunks of chunk_size.')
+    parser.add_argument(
+        '--num_writers', type=int, default=4,
+        help='Number of chunks to insert in parallel when importing in chunks.')
+    parser.add_argument(
+        '--defer_indexes', action='store_true',
+        help='Build the secondary indexes of the collection after the data is loaded, instead of '
+        'maintaining them while inserting.')
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help='Only write the documents that changed since the last import, instead of '
+        'rebuilding the whole collection.')
     parser.add_argument(
         '--always_accept_diff', action='store_true',
         help='Skip asking validation of difference between an old and new dataset')
@@ -427,9 +699,12 @@ def importer_main(
     importer = Importer(flags, out=out)
     check_error: Optional[Exception] = None
 
-    if flags.from_json:
+    data: Iterable[JsonType]
+    if flags.from_json and _is_ndjson(flags.from_json):
+        count_estimate = _count_lines(flags.from_json)
+        data = _iterate_ndjson(flags.from_json)
+    elif flags.from_json:
         with open(flags.from_json, encoding='utf-8') as input_file:
-            # TODO(cyrille): Fix data type to Iterable[JsonType].
             data = json.load(input_file)
     else:
         try:
@@ -445,16 +720,69 @@ def importer_main(
             if match_id.match(document.get('_id', '')))
 
     if flags.to_json:
-        with open(flags.to_json, 'w', encoding='utf-8') as output_file:
-            json.dump(
-                data, output_file,
-                indent=1, sort_keys=True, ensure_ascii=False, cls=_IterEncoder)
-            # End the file with a new line.
-            output_file.write('\n')
+        dump_to_json(data, flags.to_json)
     else:
         importer.import_in_collection(data, collection_name, count_estimate, check_error)
 
 
+def _is_ndjson(json_path: str) -> bool:
+    return json_path.endswith(('.ndjson', '.jsonl'))
+
+
+def _count_lines(file_path: str) -> int:
+    """Count the lines of a file without decoding it.
+
+    Blank lines are counted as well, so this is only an upper bound of the number of documents in
+    an NDJSON file.
+    """
+
+    num_lines = 0
+    last_chunk = b''
+    with open(file_path, 'rb') as input_file:
+        for chunk in iter(lambda: input_file.read(1 << 20), b''):
+            num_lines += chunk.count(b'\n')
+            last_chunk = chunk
+    if last_chunk and not last_chunk.endswith(b'\n'):
+        num_lines += 1
+    return num_lines
+
+
+def _iterate_ndjson(json_path: str) -> Iterator[JsonType]:
+    with open(json_path, encoding='utf-8') as input_file:
+        for line in input_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _encode_iterable(value: Any) -> Any:
+    if isinstance(value, collections.abc.Iterable):
+        return list(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dump_to_json(data: Iterable[JsonType], json_path: str) -> None:
+    """Save documents in a JSON file, in the format expected by the --from_json flag.
+
+    If the file has an NDJSON extension (.ndjson or .jsonl), documents are written one per line
+    as they are yielded, otherwise they are written as an indented JSON list.
+    """
+
+    if _is_ndjson(json_path):
+        with open(json_path, 'w', encoding='utf-8') as output_file:
+            for document in data:
+                output_file.write(json.dumps(
+                    document, sort_keys=True, ensure_ascii=False, default=_encode_iterable))
+                output_file.write('\n')
+        return
+
+    with open(json_path, 'w', encoding='utf-8') as output_file:
+        json.dump(
+            data, output_file,
+            indent=1, sort_keys=True, ensure_ascii=False, cls=_IterEncoder)
+        # End the file with a new line.
+        output_file.write('\n')
+
+
 class _IterableAsList(list[_AType]):
     """Used to trick JSON encoder (dump) into serializing iterators."""
 
@@ -574,3 +902,160 @@ def _compute_dict_diff(
             diff[b_key] = {'added': b_value}
 
     return diff
+
+
+def _copy_secondary_indexes(
+        source: pymongo_collection.Collection, target: pymongo_collection.Collection) -> None:
+    """Create in the target collection the same secondary indexes as in the source one."""
+
+    if source.name not in source.database.list_collection_names():
+        return
+    for name, index_info in source.index_information().items():
+        if name == '_id_':
+            continue
+        options = {
+            key: value for key, value in index_info.items()
+            if key not in {'key', 'ns', 'v'}
+        }
+        target.create_index(index_info['key'], name=name, **options)
+
+
+def _merge_bulk_write_error_details(error_details: Iterable[Tuple[int, JsonType]]) -> JsonType:
+    """Merge the details of BulkWriteErrors that happened on several chunks.
+
+    Args:
+        error_details: for each failed chunk, the index of its first document in the whole
+            import, and the details of its BulkWriteError.
+    Returns:
+        the details of a single BulkWriteError, with indices relative to the whole import.
+    """
+
+    merged: JsonType = {'nInserted': 0, 'writeErrors': [], 'writeConcernErrors': []}
+    for offset, details in sorted(error_details, key=lambda offset_details: offset_details[0]):
+        merged['nInserted'] += details.get('nInserted', 0)
+        merged['writeErrors'].extend(
+            dict(write_error, index=write_error.get('index', 0) + offset)
+            for write_error in details.get('writeErrors', []))
+        merged['writeConcernErrors'].extend(details.get('writeConcernErrors', []))
+    return merged
+
+
+def hash_document(document: JsonType) -> str:
+    """Compute a stable hash of the content of a document.
+
+    The hash does not depend on the order of the keys, and ignores the field where the hash itself
+    might be stored.
+    """
+
+    content = {key: value for key, value in document.items() if key != _HASH_FIELD}
+    serialized = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+
+# Rank of types in the MongoDB sort order, see
+# https://docs.mongodb.com/manual/reference/bson-type-comparison-order/
+_TYPE_SORT_RANKS: dict[type, int] = {
+    type(None): 1,
+    int: 2,
+    float: 2,
+    str: 3,
+    dict: 4,
+    list: 5,
+    bytes: 6,
+    bool: 8,
+}
+
+
+def _sort_key(document_id: Any) -> Tuple[int, Any]:
+    """Compute a key to sort document IDs in Python in the same order as MongoDB."""
+
+    rank = _TYPE_SORT_RANKS.get(type(document_id))
+    if rank is None:
+        # Mostly ObjectIds.
+        return 7, str(document_id)
+    if rank == 1:
+        return rank, 0
+    if rank in {4, 5}:
+        return rank, json.dumps(document_id, sort_keys=True, default=str)
+    return rank, document_id
+
+
+def _iterate_sorted_hashes(collection: pymongo_collection.Collection) \
+        -> Iterator[Tuple[Any, str]]:
+    """Iterate over the IDs and content hashes of all documents in a collection, sorted by ID.
+
+    Stored hashes are used if all documents have one, otherwise the documents are hashed one by
+    one as they are streamed from the DB.
+    """
+
+    has_stored_hashes = not collection.find_one({_HASH_FIELD: {'$exists': False}}, {'_id': 1})
+    projection = {_HASH_FIELD: 1} if has_stored_hashes else None
+    for document in collection.find({}, projection).sort('_id', pymongo.ASCENDING):
+        yield document['_id'], document[_HASH_FIELD] if has_stored_hashes else \
+            hash_document(document)
+
+
+class _DiffSummary:
+    """Counts and samples of the differences between two datasets."""
+
+    def __init__(self) -> None:
+        self.num_added = 0
+        self.num_removed = 0
+        self.num_changed = 0
+        self.samples: dict[str, list[str]] = {'added': [], 'removed': [], 'changed': []}
+
+    def _add_sample(self, kind: str, document_id: Any) -> None:
+        if document_id is not None and len(self.samples[kind]) < _MAX_DIFF_SAMPLES:
+            self.samples[kind].append(str(document_id))
+
+    def add(self, document_id: Any) -> None:  # pylint: disable=invalid-name
+        """Record a document that was added."""
+
+        self.num_added += 1
+        self._add_sample('added', document_id)
+
+    def remove(self, document_id: Any) -> None:
+        """Record a document that was removed."""
+
+        self.num_removed += 1
+        self._add_sample('removed', document_id)
+
+    def change(self, document_id: Any) -> None:
+        """Record a document that was changed."""
+
+        self.num_changed += 1
+        self._add_sample('changed', document_id)
+
+    def __bool__(self) -> bool:
+        return bool(self.num_added or self.num_removed or self.num_changed)
+
+
+def _compute_sorted_diff(
+        old_hashes: Iterable[Tuple[Any, str]],
+        new_hashes: Iterable[Tuple[Any, str]]) -> _DiffSummary:
+    """Compute the diff between two streams of IDs and hashes, both sorted by ID.
+
+    Documents without IDs in the new stream are always considered as added.
+    """
+
+    summary = _DiffSummary()
+    old_iterator = iter(old_hashes)
+    new_iterator = iter(new_hashes)
+    old = next(old_iterator, None)
+    new = next(new_iterator, None)
+    while old or new:
+        if new and new[0] is None:
+            summary.add(None)
+            new = next(new_iterator, None)
+        elif old and new and _sort_key(old[0]) == _sort_key(new[0]):
+            if old[1] != new[1]:
+                summary.change(new[0])
+            old = next(old_iterator, None)
+            new = next(new_iterator, None)
+        elif old and (not new or _sort_key(old[0]) < _sort_key(new[0])):
+            summary.remove(old[0])
+            old = next(old_iterator, None)
+        elif new:
+            summary.add(new[0])
+            new = next(new_iterator, None)
+    return summary
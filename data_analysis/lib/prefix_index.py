@@ -0,0 +1,29 @@
+"""An index to find quickly all the values whose keys start with a given prefix."""
+
+import bisect
+import typing
+from typing import Generic, Iterable, Iterator
+
+_T = typing.TypeVar('_T')
+
+
+class PrefixIndex(Generic[_T]):
+    """An index of values by string keys, sorted to find all keys starting with a prefix.
+
+    Finding the values for a prefix costs a binary search plus the number of
+    matching keys, instead of a scan of all the keys.
+    """
+
+    def __init__(self, items: Iterable[tuple[str, _T]]) -> None:
+        # The sort is stable, so values with the same key keep their input order.
+        sorted_items = sorted(items, key=lambda item: item[0])
+        self._keys = [key for key, unused_value in sorted_items]
+        self._values = [value for unused_key, value in sorted_items]
+
+    def iterate_with_prefix(self, prefix: str) -> Iterator[_T]:
+        """Iterate on all the values whose key starts with the prefix, sorted by key."""
+
+        index = bisect.bisect_left(self._keys, prefix)
+        while index < len(self._keys) and self._keys[index].startswith(prefix):
+            yield self._values[index]
+            index += 1
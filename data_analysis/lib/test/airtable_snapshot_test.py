@@ -0,0 +1,123 @@
+"""Unit tests for the bob_emploi.data_analysis.lib.airtable_snapshot module."""
+
+import datetime
+import glob
+import json
+import os
+from os import path
+import tempfile
+import unittest
+from unittest import mock
+
+import airtablemock
+
+from bob_emploi.common.python.test import nowmock
+from bob_emploi.data_analysis.lib import airtable_snapshot
+
+
+class GetRecordsTestCase(airtablemock.TestCase):
+    """Unit tests for the get_records function."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.folder = tmp_dir.name
+        env_patcher = mock.patch.dict(os.environ, {
+            'AIRTABLE_API_KEY': 'apikey42',
+            'AIRTABLE_SNAPSHOT_FOLDER': self.folder,
+        })
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        self.base = airtablemock.Airtable('app123', 'apikey42')
+        self.base.create('My table', {'name': 'First'})
+        self.base.create('My table', {'name': 'Second'})
+
+    def _get_names(self) -> list[str]:
+        return [
+            record['fields']['name']
+            for record in airtable_snapshot.get_records('app123', 'My table')]
+
+    def test_no_folder(self) -> None:
+        """Call the API directly when there is no snapshot folder."""
+
+        with mock.patch.dict(os.environ, {'AIRTABLE_SNAPSHOT_FOLDER': ''}):
+            self.assertEqual(['First', 'Second'], self._get_names())
+            self.base.create('My table', {'name': 'Third'})
+            self.assertEqual(['First', 'Second', 'Third'], self._get_names())
+
+        self.assertFalse(os.listdir(self.folder))
+
+    def test_snapshot(self) -> None:
+        """Read the records from the snapshot while it is recent enough."""
+
+        with nowmock.patch() as mock_now:
+            mock_now.return_value = datetime.datetime(2021, 3, 4, 12)
+            self.assertEqual(['First', 'Second'], self._get_names())
+            self.base.create('My table', {'name': 'Third'})
+
+            mock_now.return_value += datetime.timedelta(minutes=10)
+            self.assertEqual(['First', 'Second'], self._get_names())
+
+            mock_now.return_value += datetime.timedelta(hours=2)
+            self.assertEqual(['First', 'Second', 'Third'], self._get_names())
+
+        snapshot_path, = glob.glob(path.join(self.folder, 'app123', '*.ndjson'))
+        with open(snapshot_path, 'rt', encoding='utf-8') as snapshot_file:
+            metadata = json.loads(next(snapshot_file))
+            records = [json.loads(line) for line in snapshot_file]
+        self.assertEqual('My table', metadata['table'])
+        self.assertEqual('2021-03-04T14:10:00', metadata['fetchedAt'])
+        self.assertEqual(3, len(records))
+        self.assertTrue(records[0]['id'])
+
+    @mock.patch.dict(os.environ, {'AIRTABLE_SNAPSHOT_OFFLINE': '1'})
+    def test_offline(self) -> None:
+        """Never call the API when offline."""
+
+        with self.assertRaises(airtable_snapshot.MissingSnapshotError):
+            self._get_names()
+
+        with mock.patch.dict(os.environ, {'AIRTABLE_SNAPSHOT_OFFLINE': ''}):
+            self._get_names()
+        self.base.create('My table', {'name': 'Third'})
+
+        with nowmock.patch() as mock_now:
+            mock_now.return_value = datetime.datetime.now() + datetime.timedelta(days=30)
+            self.assertEqual(['First', 'Second'], self._get_names())
+
+    def test_refresh(self) -> None:
+        """Fetch the missing snapshots in parallel."""
+
+        self.base.create('Other table', {'name': 'Other'})
+
+        airtable_snapshot.refresh([
+            airtable_snapshot.TableRef('app123', 'My table'),
+            airtable_snapshot.TableRef('app123', 'Other table'),
+            airtable_snapshot.TableRef('app123', 'My table'),
+        ])
+        self.base.create('My table', {'name': 'Third'})
+
+        self.assertEqual(2, len(glob.glob(path.join(self.folder, 'app123', '*.ndjson'))))
+        self.assertEqual(['First', 'Second'], self._get_names())
+
+    def test_refresh_stale(self) -> None:
+        """Only fetch again the snapshots that are too old."""
+
+        with nowmock.patch() as mock_now:
+            mock_now.return_value = datetime.datetime(2021, 3, 4, 12)
+            self._get_names()
+            self.base.create('My table', {'name': 'Third'})
+
+            mock_now.return_value += datetime.timedelta(minutes=10)
+            airtable_snapshot.refresh([airtable_snapshot.TableRef('app123', 'My table')])
+            self.assertEqual(['First', 'Second'], self._get_names())
+
+            mock_now.return_value += datetime.timedelta(hours=2)
+            airtable_snapshot.refresh([airtable_snapshot.TableRef('app123', 'My table')])
+            with mock.patch.dict(os.environ, {'AIRTABLE_SNAPSHOT_OFFLINE': '1'}):
+                self.assertEqual(['First', 'Second', 'Third'], self._get_names())
+
+
+if __name__ == '__main__':
+    unittest.main()
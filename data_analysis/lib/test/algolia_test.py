@@ -0,0 +1,200 @@
+"""Unit tests for the bob_emploi.data_analysis.lib.algolia module."""
+
+import json
+import logging
+from os import path
+import tempfile
+import threading
+from typing import Any
+import unittest
+from unittest import mock
+
+from algoliasearch import exceptions
+
+from bob_emploi.data_analysis.lib import algolia
+
+
+class _FakeIndex:
+    """A fake Algolia index keeping its objects in memory."""
+
+    def __init__(self, client: '_FakeClient', name: str) -> None:
+        self._client = client
+        self.name = name
+        self.objects: dict[str, dict[str, Any]] = {}
+        self.settings: dict[str, Any] = {'replicas': [], 'searchableAttributes': ['name']}
+        self.num_saved_objects = 0
+        self.num_deleted_objects = 0
+        self._lock = threading.Lock()
+
+    def get_settings(self) -> dict[str, Any]:
+        """Get a copy of the settings of the index."""
+
+        return dict(self.settings)
+
+    def set_settings(self, settings: dict[str, Any]) -> None:
+        """Replace the settings of the index."""
+
+        self.settings = dict(settings)
+
+    def save_objects(self, objects: list[dict[str, Any]]) -> None:
+        """Add or replace objects in the index, unless the client is set to fail."""
+
+        if self._client.fail_on_save:
+            raise exceptions.AlgoliaException('Quota exceeded')
+        with self._lock:
+            for obj in objects:
+                self.objects[obj['objectID']] = dict(obj)
+            self.num_saved_objects += len(objects)
+
+    def delete_objects(self, object_ids: list[str]) -> None:
+        """Delete objects from the index."""
+
+        with self._lock:
+            for object_id in object_ids:
+                self.objects.pop(object_id, None)
+            self.num_deleted_objects += len(object_ids)
+
+    def delete(self) -> None:
+        """Delete the index from its client."""
+
+        self._client.indices.pop(self.name, None)
+
+
+class _FakeClient:
+    """A fake Algolia client keeping its indices in memory."""
+
+    def __init__(self) -> None:
+        self.indices: dict[str, _FakeIndex] = {}
+        self.fail_on_save = False
+
+    def init_index(self, name: str) -> _FakeIndex:
+        """Get an index, creating it if needed."""
+
+        if name not in self.indices:
+            self.indices[name] = _FakeIndex(self, name)
+        return self.indices[name]
+
+    def move_index(self, source: str, destination: str) -> None:
+        """Rename an index, replacing the destination one."""
+
+        index = self.indices.pop(source)
+        index.name = destination
+        self.indices[destination] = index
+
+
+class UploadTestCase(unittest.TestCase):
+    """Unit tests for the upload function."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.client = _FakeClient()
+        patcher = mock.patch(
+            algolia.search_client.__name__ + '.SearchClient.create', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.manifest_path = path.join(tmp_dir.name, 'manifest.json')
+
+    def _upload(self, items: list[dict[str, Any]], **kwargs: Any) -> None:
+        algolia.upload(
+            items, app_id='my-app', api_key='my-key', index='cities', batch_size=2, **kwargs)
+
+    def test_full_upload(self) -> None:
+        """Upload all objects in a new index."""
+
+        self.client.init_index('cities').objects['old'] = {'objectID': 'old'}
+
+        self._upload([{'objectID': f'{index:d}', 'name': 'A'} for index in range(5)])
+
+        self.assertEqual(['cities'], list(self.client.indices))
+        index = self.client.indices['cities']
+        self.assertEqual([f'{index:d}' for index in range(5)], sorted(index.objects))
+        self.assertEqual({'searchableAttributes': ['name']}, index.settings)
+
+    def test_full_upload_without_replicas(self) -> None:
+        """Upload all objects in an index whose settings do not list any replicas."""
+
+        self.client.init_index('cities').settings = {'searchableAttributes': ['name']}
+
+        self._upload([{'objectID': f'{index:d}', 'name': 'A'} for index in range(3)])
+
+        index = self.client.indices['cities']
+        self.assertEqual(['0', '1', '2'], sorted(index.objects))
+        self.assertEqual({'searchableAttributes': ['name']}, index.settings)
+
+    def test_delta_upload(self) -> None:
+        """Only upload the objects that changed since the last upload."""
+
+        self._upload(
+            [{'objectID': f'{index:d}', 'name': 'A'} for index in range(5)],
+            manifest_path=self.manifest_path)
+        with open(self.manifest_path, 'rt', encoding='utf-8') as manifest_file:
+            self.assertEqual('cities', json.load(manifest_file).get('index'))
+        index = self.client.indices['cities']
+        index.num_saved_objects = 0
+
+        self._upload(
+            [
+                {'objectID': '0', 'name': 'A'},
+                {'objectID': '1', 'name': 'B'},
+                {'objectID': '3', 'name': 'A'},
+                {'objectID': '4', 'name': 'A'},
+                {'objectID': '5', 'name': 'C'},
+            ],
+            manifest_path=self.manifest_path)
+
+        self.assertEqual(['cities'], list(self.client.indices))
+        self.assertIs(index, self.client.indices['cities'])
+        self.assertEqual(2, index.num_saved_objects)
+        self.assertEqual(1, index.num_deleted_objects)
+        self.assertEqual(
+            {'0': 'A', '1': 'B', '3': 'A', '4': 'A', '5': 'C'},
+            {object_id: obj['name'] for object_id, obj in index.objects.items()})
+
+        # Nothing changed.
+        index.num_saved_objects = 0
+        self._upload(
+            [
+                {'objectID': '0', 'name': 'A'},
+                {'objectID': '1', 'name': 'B'},
+                {'objectID': '3', 'name': 'A'},
+                {'objectID': '4', 'name': 'A'},
+                {'objectID': '5', 'name': 'C'},
+            ],
+            manifest_path=self.manifest_path)
+        self.assertEqual(0, index.num_saved_objects)
+
+    def test_manifest_of_other_index(self) -> None:
+        """Do a full upload if the manifest was for another index."""
+
+        with open(self.manifest_path, 'wt', encoding='utf-8') as manifest_file:
+            json.dump({'index': 'jobs', 'hashes': {'0': 'abc'}}, manifest_file)
+
+        self._upload([{'objectID': '0', 'name': 'A'}], manifest_path=self.manifest_path)
+
+        index = self.client.indices['cities']
+        self.assertEqual(1, index.num_saved_objects)
+        self.assertEqual(0, index.num_deleted_objects)
+        with open(self.manifest_path, 'rt', encoding='utf-8') as manifest_file:
+            self.assertEqual('cities', json.load(manifest_file).get('index'))
+
+    def test_delta_upload_failure(self) -> None:
+        """Keep the previous manifest if the delta upload fails."""
+
+        self._upload([{'objectID': '0', 'name': 'A'}], manifest_path=self.manifest_path)
+        with open(self.manifest_path, 'rt', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+        self.client.fail_on_save = True
+
+        with self.assertRaises(exceptions.AlgoliaException):
+            with self.assertLogs(level=logging.ERROR) as logged:
+                self._upload([{'objectID': '0', 'name': 'B'}], manifest_path=self.manifest_path)
+
+        self.assertIn('"objectID": "0"', logged.records[0].getMessage())
+        with open(self.manifest_path, 'rt', encoding='utf-8') as manifest_file:
+            self.assertEqual(manifest, json.load(manifest_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
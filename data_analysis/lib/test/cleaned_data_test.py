@@ -0,0 +1,119 @@
+"""Unit tests for the cache of the bob_emploi.lib.cleaned_data module."""
+
+import os
+from os import path
+import tempfile
+import unittest
+from unittest import mock
+
+from bob_emploi.data_analysis.lib import cleaned_data
+
+
+class CachedTableTests(unittest.TestCase):
+    """Unit tests for the cache of tables."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        cleaned_data.clear_cache()
+        self.addCleanup(cleaned_data.clear_cache)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.data_folder = tmp_dir.name
+        self.rome_filename = path.join(self.data_folder, 'rome.csv')
+        self._write_rome('A1234,Pilote\n')
+
+    def _write_rome(self, rows: str, mtime: int = 1_000_000_000) -> None:
+        with open(self.rome_filename, 'wt', encoding='utf-8') as rome_file:
+            rome_file.write('code_rome,libelle_rome\n' + rows)
+        os.utime(self.rome_filename, (mtime, mtime))
+
+    @mock.patch(cleaned_data.pandas.__name__ + '.read_csv', wraps=cleaned_data.pandas.read_csv)
+    def test_memoized(self, mock_read_csv: mock.MagicMock) -> None:
+        """Files are only parsed once for the same table."""
+
+        job_groups = cleaned_data.rome_job_groups(filename=self.rome_filename)
+        self.assertEqual(['Pilote'], job_groups.name.tolist())
+        # Modifying the table does not modify the cache.
+        job_groups.loc['A1234', 'name'] = 'Copilote'
+
+        job_groups = cleaned_data.rome_job_groups('data', self.rome_filename)
+        self.assertEqual(['Pilote'], job_groups.name.tolist())
+        self.assertEqual(1, mock_read_csv.call_count)
+
+    def test_memoized_mutable_cells(self) -> None:
+        """Modifying the objects in the cells of a table does not modify the cache."""
+
+        @cleaned_data._cached_table  # pylint: disable=protected-access
+        def _skills(filename: str) -> cleaned_data.pandas.DataFrame:
+            table = cleaned_data.pandas.read_csv(
+                cleaned_data._source(filename))  # pylint: disable=protected-access
+            table['skills'] = table.libelle_rome.str.split()
+            return table
+
+        skills = _skills(self.rome_filename)
+        skills.skills.iloc[0].append('Copilote')
+
+        self.assertEqual([['Pilote']], _skills(self.rome_filename).skills.tolist())
+
+    @mock.patch(cleaned_data.pandas.__name__ + '.read_csv', wraps=cleaned_data.pandas.read_csv)
+    def test_invalidated_on_change(self, mock_read_csv: mock.MagicMock) -> None:
+        """The cache is invalidated when a source file changes."""
+
+        cleaned_data.rome_job_groups(filename=self.rome_filename)
+        self._write_rome('A1234,Pilote\nB1234,Artiste\n', mtime=1_000_000_100)
+
+        job_groups = cleaned_data.rome_job_groups(filename=self.rome_filename)
+        self.assertEqual(['Pilote', 'Artiste'], job_groups.name.tolist())
+        self.assertEqual(2, mock_read_csv.call_count)
+
+    def test_disk_cache(self) -> None:
+        """Tables are cached on disk across processes."""
+
+        cache_folder = path.join(self.data_folder, 'cache')
+        with mock.patch.dict(os.environ, {'CLEANED_DATA_CACHE_FOLDER': cache_folder}):
+            cleaned_data.rome_job_groups(filename=self.rome_filename)
+            self.assertEqual(1, len(os.listdir(cache_folder)))
+
+            # Simulate a new process.
+            cleaned_data.clear_cache()
+            with mock.patch(cleaned_data.pandas.__name__ + '.read_csv') as mock_read_csv:
+                job_groups = cleaned_data.rome_job_groups(filename=self.rome_filename)
+            mock_read_csv.assert_not_called()
+            self.assertEqual(['Pilote'], job_groups.name.tolist())
+
+            # A change in the file invalidates the disk cache as well.
+            cleaned_data.clear_cache()
+            self._write_rome('A1234,Pilote de ligne\n', mtime=1_000_000_100)
+            job_groups = cleaned_data.rome_job_groups(filename=self.rome_filename)
+            self.assertEqual(['Pilote de ligne'], job_groups.name.tolist())
+
+    def test_nested_tables(self) -> None:
+        """A table depending on another one is invalidated when the other one's file changes."""
+
+        mobility_filename = path.join(self.data_folder, 'mobility.csv')
+        with open(mobility_filename, 'wt', encoding='utf-8') as mobility_file:
+            mobility_file.write(
+                'code_rome,code_rome_cible,code_appellation_source,code_appellation_cible,'
+                'libelle_type_mobilite\n'
+                'A1234,A1234,,,Proche\n')
+
+        rome_folder = path.join(self.data_folder, 'rome/csv')
+        os.makedirs(rome_folder)
+        self.rome_filename = path.join(rome_folder, 'unix_referentiel_code_rome_test_utf8.csv')
+        self._write_rome('A1234,Pilote\n')
+
+        with mock.patch.object(cleaned_data, '_ROME_VERSION', 'test'):
+            # Fill the cache for job groups first.
+            cleaned_data.rome_job_groups(data_folder=self.data_folder)
+            mobility = cleaned_data.rome_job_groups_mobility(
+                data_folder=self.data_folder, filename=mobility_filename)
+            self.assertEqual(['Pilote'], mobility.source_rome_name.tolist())
+
+            self._write_rome('A1234,Pilote de ligne\n', mtime=1_000_000_100)
+            mobility = cleaned_data.rome_job_groups_mobility(
+                data_folder=self.data_folder, filename=mobility_filename)
+            self.assertEqual(['Pilote de ligne'], mobility.source_rome_name.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
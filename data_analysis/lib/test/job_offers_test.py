@@ -1,6 +1,8 @@
 """Unit tests for the bob_emploi.lib.job_offers module."""
 
 from os import path
+import tempfile
+from typing import AbstractSet, Optional
 import unittest
 
 import pandas as pd
@@ -60,5 +62,93 @@ class IterateTestCase(unittest.TestCase):
         self.assertRaises(ValueError, next, offers)
 
 
+class IterateChunksTestCase(unittest.TestCase):
+    """Unit tests for the iterate_chunks function."""
+
+    testdata_folder = path.join(
+        path.dirname(__file__), 'testdata/job_offers')
+
+    def test_basic(self) -> None:
+        """Test basic usage."""
+
+        chunks = list(job_offers.iterate_chunks(
+            path.join(self.testdata_folder, 'job_offers.csv'),
+            path.join(self.testdata_folder, 'column_names.txt'),
+            {'id_offre', 'contract_nature_name'}, chunk_size=4))
+
+        self.assertEqual([4, 4, 1], [len(chunk.index) for chunk in chunks])
+        self.assertEqual(
+            {'id_offre', 'contract_nature_name'}, set(chunks[0].columns))
+        # Same values as with iterate.
+        offers = list(job_offers.iterate(
+            path.join(self.testdata_folder, 'job_offers.csv'),
+            path.join(self.testdata_folder, 'column_names.txt')))
+        self.assertEqual(
+            [offer.id_offre for offer in offers],
+            pd.concat(chunks).id_offre.tolist())
+        self.assertEqual(
+            [offer.contract_nature_name for offer in offers],
+            pd.concat(chunks).contract_nature_name.tolist())
+
+    def test_missing_required_fields(self) -> None:
+        """Test missing required field."""
+
+        chunks = job_offers.iterate_chunks(
+            path.join(self.testdata_folder, 'job_offers.csv'),
+            path.join(self.testdata_folder, 'column_names.txt'),
+            {'id_offre', 'foobar'})
+        self.assertRaises(ValueError, next, chunks)
+
+
+
+class _IdsAggregator:
+    """An aggregator that keeps the IDs of the job offers it collects."""
+
+    def __init__(self, required_fields: AbstractSet[str]) -> None:
+        self.required_fields = required_fields
+        self.ids: list[Optional[str]] = []
+
+    def collect(self, job_offer: 'job_offers._JobOffer') -> None:
+        """Collect the ID of a job offer."""
+
+        self.ids.append(job_offer.id)
+
+
+class ScanTestCase(unittest.TestCase):
+    """Unit tests for the scan function."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.colnames_txt = path.join(tmp_dir.name, 'column_names.txt')
+        with open(self.colnames_txt, 'w', encoding='utf-8') as colnames_file:
+            colnames_file.write('id\ncity\nsalary\n')
+        self.offers_csv = path.join(tmp_dir.name, 'job_offers.csv')
+        with open(self.offers_csv, 'w', encoding='latin-1') as offers_file:
+            offers_file.write('full|Lyon|2000\nshort|Paris\ntiny\n')
+
+    def test_short_lines(self) -> None:
+        """Each aggregator gets the same job offers as when iterating on its own."""
+
+        city_aggregator = _IdsAggregator({'id', 'city'})
+        salary_aggregator = _IdsAggregator({'salary'})
+
+        job_offers.scan(self.offers_csv, self.colnames_txt, [city_aggregator, salary_aggregator])
+
+        self.assertEqual(['full', 'short'], city_aggregator.ids)
+        self.assertEqual(['full'], salary_aggregator.ids)
+        self.assertEqual(
+            city_aggregator.ids,
+            [offer.id for offer in job_offers.iterate(
+                self.offers_csv, self.colnames_txt, {'id', 'city'})])
+
+    def test_missing_required_fields(self) -> None:
+        """Fail if an aggregator requires a missing field."""
+
+        with self.assertRaises(ValueError):
+            job_offers.scan(self.offers_csv, self.colnames_txt, [_IdsAggregator({'foobar'})])
+
+
 if __name__ == '__main__':
     unittest.main()
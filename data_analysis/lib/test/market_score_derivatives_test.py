@@ -0,0 +1,187 @@
+"""Tests for the bob_emploi.data_analysis.lib.market_score_derivatives module."""
+
+import itertools
+import typing
+from typing import Any, Iterator
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from bob_emploi.data_analysis.lib import market_score_derivatives
+
+
+def _reference_local_diagnosis(
+        market_score_frame: pd.DataFrame, career_jumps: pd.DataFrame, prefix_length: int,
+        job_group_names: dict[str, str]) -> Iterator[dict[str, Any]]:
+    """The previous implementation of local_diagnosis, chunked by job group prefixes."""
+
+    local_stats = market_score_frame[[
+        'market_score', 'job_group', 'district_id', 'local_id']]\
+        .sort_values(['job_group', 'market_score'], ascending=False)
+    local_stats['numLessStressfulDepartements'] = local_stats\
+        .groupby(['job_group'])\
+        .cumcount()
+
+    for job_group_prefix, markets in itertools.groupby(
+            local_stats.itertuples(),
+            lambda market: typing.cast(str, market.job_group[:prefix_length])):
+        prefixed_jumps = career_jumps[career_jumps.job_group.str.startswith(job_group_prefix)]
+        all_changes = prefixed_jumps\
+            .merge(local_stats, on='job_group')\
+            .merge(
+                local_stats[['job_group', 'market_score', 'district_id']],
+                left_on=['target_job_group', 'district_id'],
+                right_on=['job_group', 'district_id'],
+                suffixes=('', '_target'))
+        better_job_groups = \
+            all_changes[all_changes.market_score * 1.5 < all_changes.market_score_target]\
+            .sort_values('market_score_target', ascending=False)[[
+                'local_id', 'market_score_target', 'target_job_group']]\
+            .groupby(['local_id'])\
+            .apply(lambda x: x[:5].to_dict(orient='records'))\
+            .to_dict()
+        for market in markets:
+            yield {
+                '_id': market.local_id,
+                'imt': {
+                    'yearlyAvgOffersPer10Candidates': market.market_score,
+                    'medianSalary': {},
+                },
+                'lessStressfulJobGroups': [{
+                    'jobGroup': {
+                        'romeId': jg['target_job_group'],
+                        'name': job_group_names.get(jg['target_job_group'], ''),
+                    },
+                    'mobilityType': 'CLOSE',
+                    'localStats': {
+                        'imt': {'yearlyAvgOffersPer10Candidates': jg['market_score_target']},
+                    },
+                } for jg in better_job_groups.get(market.local_id, [])],
+                'numLessStressfulDepartements': market.numLessStressfulDepartements,
+            }
+
+
+def _reference_less_stressful_districts(market_scores: pd.DataFrame, max_districts: int) \
+        -> dict[str, list[dict[str, Any]]]:
+    """The previous implementation of get_less_stressful_districts."""
+
+    scores = market_scores.sort_values(['job_group', 'market_score'], ascending=False)
+    return {
+        job_group: [{
+            'departementId': local_market.district_id,
+            'localStats': {'imt': {
+                'yearlyAvgOffersPer10Candidates': local_market.market_score or -1,
+            }},
+        } for local_market in (
+            itertools.islice(markets, max_districts) if max_districts else markets)]
+        for job_group, markets in itertools.groupby(
+            scores.itertuples(), lambda t: typing.cast(str, t.job_group))}
+
+
+def _create_markets(seed: int = 42, num_job_groups: int = 40, num_districts: int = 15) \
+        -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Create random markets, with distinct scores, and career jumps."""
+
+    random = np.random.default_rng(seed)
+    job_groups = [f'{letter}{index:04d}' for letter in 'AB' for index in range(num_job_groups // 2)]
+    districts = [f'{index:02d}' for index in range(num_districts)]
+    markets = pd.DataFrame(
+        list(itertools.product(job_groups, districts)), columns=['job_group', 'district_id'])
+    # Drop some markets to have missing targets.
+    markets = markets[random.random(len(markets.index)) > .2].reset_index(drop=True)
+    markets['market_score'] = random.permutation(len(markets.index)) + 1
+    markets['local_id'] = markets.district_id + ':' + markets.job_group
+
+    career_jumps = pd.DataFrame({
+        'job_group': random.choice(job_groups, size=400),
+        'target_job_group': random.choice(job_groups, size=400),
+    })
+    career_jumps = career_jumps[career_jumps.job_group != career_jumps.target_job_group]\
+        .drop_duplicates()
+    return markets, career_jumps
+
+
+class LocalDiagnosisTestCase(unittest.TestCase):
+    """Unit tests for the local_diagnosis function."""
+
+    def test_basic(self) -> None:
+        """Find less stressful job groups."""
+
+        markets = pd.DataFrame({
+            'job_group': ['A1234', 'A1234', 'B1234', 'C1234'],
+            'district_id': ['75', '69', '75', '75'],
+            'market_score': [2, 5, 10, 3],
+        })
+        markets['local_id'] = markets.district_id + ':' + markets.job_group
+        career_jumps = pd.DataFrame({
+            'job_group': ['A1234', 'A1234', 'A1234'],
+            'target_job_group': ['B1234', 'C1234', 'D1234'],
+        })
+
+        diagnoses = {
+            diagnosis['_id']: diagnosis
+            for diagnosis in market_score_derivatives.local_diagnosis(
+                markets, career_jumps, job_group_names={'B1234': 'Boulanger'})
+        }
+
+        self.assertEqual({'75:A1234', '69:A1234', '75:B1234', '75:C1234'}, diagnoses.keys())
+        self.assertEqual([{
+            'jobGroup': {'romeId': 'B1234', 'name': 'Boulanger'},
+            'mobilityType': 'CLOSE',
+            'localStats': {'imt': {'yearlyAvgOffersPer10Candidates': 10}},
+        }], diagnoses['75:A1234']['lessStressfulJobGroups'])
+        self.assertEqual([], diagnoses['69:A1234']['lessStressfulJobGroups'])
+        self.assertEqual(1, diagnoses['75:A1234']['numLessStressfulDepartements'])
+
+    def test_same_as_reference(self) -> None:
+        """Same outputs as the previous implementation chunked by job group prefixes."""
+
+        markets, career_jumps = _create_markets()
+        job_group_names = {'A0001': 'First job group', 'B0003': 'Another one'}
+
+        diagnoses = list(market_score_derivatives.local_diagnosis(
+            markets, career_jumps, job_group_names=job_group_names))
+
+        self.assertTrue(
+            any(len(diagnosis['lessStressfulJobGroups']) == 5 for diagnosis in diagnoses))
+        for prefix_length in (0, 2):
+            self.assertEqual(
+                list(_reference_local_diagnosis(
+                    markets, career_jumps, prefix_length, job_group_names)),
+                diagnoses, msg=f'prefix_length={prefix_length:d}')
+
+    def test_skip_markets(self) -> None:
+        """Skip some markets."""
+
+        markets, career_jumps = _create_markets()
+        skipped = frozenset(markets.local_id[:10])
+
+        diagnoses = list(market_score_derivatives.local_diagnosis(
+            markets, career_jumps, skip_markets=skipped))
+
+        self.assertEqual(len(markets.index) - 10, len(diagnoses))
+        self.assertFalse(skipped & {diagnosis['_id'] for diagnosis in diagnoses})
+
+
+class LessStressfulDistrictsTestCase(unittest.TestCase):
+    """Unit tests for the get_less_stressful_districts function."""
+
+    def test_same_as_reference(self) -> None:
+        """Same outputs as the previous implementation."""
+
+        markets, unused_career_jumps = _create_markets()
+        markets.loc[:20, 'market_score'] = 0
+
+        for max_districts in (0, 3):
+            districts = market_score_derivatives.get_less_stressful_districts(
+                markets, max_districts=max_districts)
+            self.assertEqual(
+                _reference_less_stressful_districts(markets, max_districts),
+                districts.to_dict(), msg=f'max_districts={max_districts:d}')
+            self.assertEqual(
+                sorted(markets.job_group.unique(), reverse=True), districts.index.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
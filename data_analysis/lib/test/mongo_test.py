@@ -156,6 +156,33 @@ class ImporterMainTestCase(unittest.TestCase):
 
         self.assertEqual(0, len(list(self.db_client.test['my-collection'].find())))
 
+    def test_importer_main_with_ndjson_files(self) -> None:
+        """Stream documents through NDJSON files."""
+
+        def importer_func() -> typing.Iterator[dict[str, Any]]:
+            """Foo."""
+
+            yield {'_id': 'a', 'values': (value for value in range(3))}
+            yield {'_id': 'b', 'name': 'Bé'}
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        ndjson_path = path.join(tmp_dir.name, 'data.ndjson')
+        mongo.importer_main(
+            importer_func, 'my-collection', ['--to_json', ndjson_path], out=self.output)
+
+        with open(ndjson_path, encoding='utf-8') as json_file:
+            self.assertEqual(
+                ['{"_id": "a", "values": [0, 1, 2]}\n', '{"_id": "b", "name": "Bé"}\n'],
+                json_file.readlines())
+        self.assertEqual(0, len(list(self.db_client.test['my-collection'].find())))
+
+        mongo.importer_main(
+            importer_func, 'my-collection', ['--from_json', ndjson_path], out=self.output)
+        self.assertEqual(
+            [{'_id': 'a', 'values': [0, 1, 2]}, {'_id': 'b', 'name': 'Bé'}],
+            list(self.db_client.test['my-collection'].find().sort('_id')))
+
     def test_importer_collection_name(self) -> None:
         """Test the importer_main getting the collection name."""
 
@@ -368,6 +395,9 @@ class ImporterTestCase(unittest.TestCase):
         flag_values.always_accept_diff = False
         flag_values.report_to_slack = False
         flag_values.fail_on_diff = False
+        flag_values.incremental = False
+        flag_values.num_writers = 1
+        flag_values.defer_indexes = False
         flag_values.run_every = '7 days'
         self.output = io.StringIO()
         self.importer = mongo.Importer(flag_values, out=self.output)
@@ -548,7 +578,7 @@ class ImporterTestCase(unittest.TestCase):
                 'attachments': [{
                     'mrkdwn_in': ['text'],
                     'title': 'Automatic import of my_collec',
-                    'text': 'Too many entries to diff (1100).\n'
+                    'text': 'Diff summary: 1100 added, 1 removed, 0 changed.\n'
                     'Inserting all 1100 objects at once.',
                 }],
             },
@@ -653,6 +683,53 @@ class ImporterTestCase(unittest.TestCase):
         # Check current data
         self.assertEqual(100, self.db_client.test.my_collec.count_documents({}))
 
+    def test_import_batched_concurrently(self) -> None:
+        """Test importing chunks with several writers."""
+
+        self.importer.flag_values.chunk_size = 10
+        self.importer.flag_values.num_writers = 3
+        self.importer.import_in_collection((
+            {'_id': str(i), 'field1': i}
+            for i in range(100)), 'my_collec', count_estimate=100)
+
+        self.assertEqual(
+            set(range(100)),
+            {document['field1'] for document in self.db_client.test.my_collec.find()})
+
+    def test_import_batched_errors(self) -> None:
+        """Test that errors are aggregated from all chunks."""
+
+        self.db_client.test.my_collec.insert_one({'_id': 'Previous data'})
+        self.importer.flag_values.chunk_size = 10
+        self.importer.flag_values.always_accept_diff = True
+
+        with self.assertRaises(pymongo_errors.BulkWriteError) as error:
+            self.importer.import_in_collection(
+                [{'_id': str(i % 25), 'field1': i} for i in range(30)], 'my_collec')
+
+        self.assertEqual(
+            [25, 26, 27, 28, 29],
+            [write_error['index'] for write_error in error.exception.details['writeErrors']])
+        self.assertEqual(25, error.exception.details['nInserted'])
+        self.assertEqual(
+            [{'_id': 'Previous data'}], list(self.db_client.test.my_collec.find()))
+
+    def test_import_keeps_indexes(self) -> None:
+        """Test that secondary indexes are kept when rebuilding a collection."""
+
+        self.db_client.test.my_collec.insert_one({'_id': 'Previous data', 'field1': 0})
+        self.db_client.test.my_collec.create_index('field1', name='field1_index')
+        self.importer.flag_values.chunk_size = 10
+        self.importer.flag_values.always_accept_diff = True
+        self.importer.flag_values.defer_indexes = True
+
+        self.importer.import_in_collection([
+            {'_id': str(i), 'field1': i}
+            for i in range(100)], 'my_collec')
+
+        self.assertEqual(100, self.db_client.test.my_collec.count_documents({}))
+        self.assertIn('field1_index', self.db_client.test.my_collec.index_information())
+
     def test_import_with_low_estimate(self) -> None:
         """Test importing an iterator with more values than estimated."""
 
@@ -664,6 +741,265 @@ class ImporterTestCase(unittest.TestCase):
         # Check current data
         self.assertEqual(100, self.db_client.test.my_collec.count_documents({}))
 
+    def test_import_large_list_diff_summary(self) -> None:
+        """Test showing a summary of the diff for a large list."""
+
+        self.db_client.test.my_collec.insert_many([
+            {'_id': f'{i:04d}', 'field1': i} for i in range(1100)])
+
+        self.importer.import_in_collection(
+            [{'_id': f'{i:04d}', 'field1': 2 * i} for i in range(1, 1200)], 'my_collec')
+
+        output = self.output.getvalue()
+        self.assertIn('Diff summary: 100 added, 1 removed, 1099 changed.', output)
+        self.assertIn('"0000"', output)
+        self.assertIn('"1100"', output)
+        self.assertEqual(1199, self.db_client.test.my_collec.count_documents({}))
+
+    def test_import_large_list_no_diff(self) -> None:
+        """Test importing the same large list twice."""
+
+        self.db_client.test.my_collec.insert_many([
+            {'field1': i, '_id': f'{i:04d}'} for i in range(1100)])
+
+        self.importer.import_in_collection(
+            [{'_id': f'{i:04d}', 'field1': i} for i in range(1100)], 'my_collec')
+
+        self.assertEqual('The data is already up to date.', self.output.getvalue().strip())
+        self.assertEqual(['my_collec'], self.db_client.test.list_collection_names())
+
+    @mock.patch('builtins.input')
+    def test_import_iterator_show_diff(self, mock_input: mock.MagicMock) -> None:
+        """Test showing the diff of an iterator with previous data."""
+
+        mock_input.return_value = 'N'
+        self.db_client.test.my_collec.insert_many([
+            {'_id': 'a', 'field1': 3},
+            {'_id': 'b', 'field1': 42},
+            {'_id': 'c', 'field1': 5},
+        ])
+
+        self.importer.import_in_collection(iter([
+            {'_id': 'd', 'field1': 5},
+            {'_id': 'b', 'field1': 2018},
+            {'_id': 'a', 'field1': 3},
+        ]), 'my_collec', count_estimate=3)
+
+        mock_input.assert_called_once()
+        self.assertIn('Diff summary: 1 added, 1 removed, 1 changed.', self.output.getvalue())
+        # Diff was not approved.
+        self.assertEqual(['my_collec'], self.db_client.test.list_collection_names())
+        self.assertEqual(
+            {'a', 'b', 'c'}, {doc['_id'] for doc in self.db_client.test.my_collec.find()})
+
+    def test_import_iterator_no_diff(self) -> None:
+        """Test importing an iterator that is already up to date."""
+
+        self.db_client.test.my_collec.insert_many([
+            {'_id': 'a', 'field1': 3},
+            {'_id': 'b', 'field1': 42},
+        ])
+
+        self.importer.flag_values.fail_on_diff = True
+        self.importer.import_in_collection(iter([
+            {'_id': 'b', 'field1': 42},
+            {'_id': 'a', 'field1': 3},
+        ]), 'my_collec', count_estimate=2)
+
+        self.assertIn('The data is already up to date.', self.output.getvalue())
+        self.assertEqual(['my_collec'], self.db_client.test.list_collection_names())
+
+    def test_import_iterator_fail_on_diff(self) -> None:
+        """Test the fail_on_diff flag when importing an iterator."""
+
+        self.db_client.test.my_collec.insert_one({'_id': 'a', 'field1': 3})
+
+        self.importer.flag_values.fail_on_diff = True
+        with self.assertRaises(ValueError):
+            self.importer.import_in_collection(
+                iter([{'_id': 'a', 'field1': 4}]), 'my_collec', count_estimate=1)
+
+        # The temporary collection used for the diff got dropped.
+        self.assertEqual(['my_collec'], self.db_client.test.list_collection_names())
+        self.assertEqual(
+            [{'_id': 'a', 'field1': 3}], list(self.db_client.test.my_collec.find()))
+
+    @nowmock.patch(new=mock.MagicMock(return_value=datetime.datetime(2018, 9, 29)))
+    def test_archives_keep_full_archive(self) -> None:
+        """Change logs never replace the last full archive."""
+
+        self.db_client.test.my_collec.insert_one({'_id': 'a', 'field1': 3})
+        for name in (
+                'my_collec.2018-09-25_aaaa', 'my_collec.2018-09-26_bbbb',
+                'my_collec.2018-09-27_cccc.changes', 'my_collec.2018-09-28_dddd.changes'):
+            self.db_client.test[name].insert_one({'_id': 'a'})
+
+        self.importer.import_in_collection([{'_id': 'a', 'field1': 4}], 'my_collec')
+
+        self.assertEqual(
+            [
+                'my_collec.2018-09-26_bbbb',
+                'my_collec.2018-09-28_dddd.changes',
+            ],
+            sorted(
+                name for name in self.db_client.test.list_collection_names()
+                if name.startswith('my_collec.') and not name.startswith('my_collec.2018-09-29')))
+
+    @nowmock.patch(new=mock.MagicMock(return_value=datetime.datetime(2018, 9, 28)))
+    def test_import_incremental(self) -> None:
+        """Test an incremental import only writes the changes."""
+
+        self.db_client.test.my_collec.insert_many([
+            {'_id': 'a', 'field1': 3},
+            {'_id': 'b', 'field1': 42},
+            {'_id': 'c', 'field1': 5},
+        ])
+
+        self.importer.flag_values.incremental = True
+        self.importer.flag_values.always_accept_diff = True
+        self.importer.import_in_collection(iter([
+            {'_id': 'a', 'field1': 3},
+            {'_id': 'b', 'field1': 2018},
+            {'_id': 'd', 'field1': 5},
+        ]), 'my_collec', count_estimate=3)
+
+        output = self.output.getvalue()
+        self.assertIn('Diff summary: 1 added, 1 removed, 1 changed.', output)
+        self.assertIn('Writing 3 changes in chunks of 10000', output)
+        self.assertEqual(
+            [{'_id': 'a', 'field1': 3}, {'_id': 'b', 'field1': 2018}, {'_id': 'd', 'field1': 5}],
+            [
+                {key: value for key, value in document.items() if key != '_hash'}
+                for document in self.db_client.test.my_collec.find().sort('_id')
+            ])
+        self.assertEqual(
+            {'a', 'b', 'd'},
+            {
+                document['_id']
+                for document in self.db_client.test.my_collec.find({'_hash': {'$exists': True}})
+            })
+
+        archives = [
+            name for name in self.db_client.test.list_collection_names()
+            if name.startswith('my_collec.2018-09-28')
+        ]
+        self.assertEqual(1, len(archives), msg=self.db_client.test.list_collection_names())
+        self.assertTrue(archives[0].endswith('.changes'), msg=archives[0])
+        self.assertEqual(
+            [{'_id': 'b', 'field1': 42}, {'_id': 'c', 'field1': 5}],
+            list(self.db_client.test[archives[0]].find().sort('_id')))
+
+        meta = self.db_client.test.meta.find_one({'_id': 'my_collec'})
+        assert meta
+        self.assertEqual({'added': 1, 'changed': 1, 'removed': 1}, meta['last_changes'])
+
+    def test_import_incremental_no_diff(self) -> None:
+        """Test an incremental import without any change."""
+
+        self.db_client.test.my_collec.insert_many([
+            {'_id': 'a', 'field1': 3},
+            {'_id': 'b', 'field1': 42},
+        ])
+
+        self.importer.flag_values.incremental = True
+        self.importer.import_in_collection([
+            {'_id': 'a', 'field1': 3},
+            {'_id': 'b', 'field1': 42},
+        ], 'my_collec')
+
+        self.assertEqual('The data is already up to date.', self.output.getvalue().strip())
+        self.assertEqual(['my_collec'], self.db_client.test.list_collection_names())
+        # Hashes are stored for the next imports.
+        self.assertEqual(
+            2, self.db_client.test.my_collec.count_documents({'_hash': {'$exists': True}}))
+
+    def test_import_full_after_incremental(self) -> None:
+        """Test a full import after an incremental one does not see the stored hashes as a diff."""
+
+        self.db_client.test.my_collec.insert_many([
+            {'_id': 'a', 'field1': 3},
+            {'_id': 'b', 'field1': 42},
+        ])
+        self.importer.flag_values.incremental = True
+        self.importer.import_in_collection([
+            {'_id': 'a', 'field1': 3},
+            {'_id': 'b', 'field1': 42},
+        ], 'my_collec')
+        self.output.truncate(0)
+        self.output.seek(0)
+
+        self.importer.flag_values.incremental = False
+        self.importer.flag_values.fail_on_diff = True
+        self.importer.import_in_collection([
+            {'_id': 'a', 'field1': 3},
+            {'_id': 'b', 'field1': 42},
+        ], 'my_collec')
+
+        self.assertEqual('The data is already up to date.', self.output.getvalue().strip())
+
+    def test_import_incremental_missing_id(self) -> None:
+        """Test that an incremental import needs document IDs."""
+
+        self.db_client.test.my_collec.insert_one({'_id': 'a', 'field1': 3})
+
+        self.importer.flag_values.incremental = True
+        with self.assertRaises(ValueError):
+            self.importer.import_in_collection([{'field1': 3}], 'my_collec')
+
+    def test_import_incremental_empty_collection(self) -> None:
+        """Test that an incremental import in an empty collection imports everything."""
+
+        self.importer.flag_values.incremental = True
+        self.importer.import_in_collection([{'_id': 'a', 'field1': 3}], 'my_collec')
+
+        self.assertEqual([{'_id': 'a', 'field1': 3}], list(self.db_client.test.my_collec.find()))
+
+
+class DiffTestCase(unittest.TestCase):
+    """Unit tests for the streaming diff helpers."""
+
+    def test_hash_document(self) -> None:
+        """Hashes do not depend on key order nor on the stored hash."""
+
+        self.assertEqual(
+            mongo.hash_document({'_id': 'a', 'b': {'c': 1, 'd': [1, 2]}}),
+            mongo.hash_document({'b': {'d': [1, 2], 'c': 1}, '_id': 'a', '_hash': 'old'}))
+        self.assertNotEqual(
+            mongo.hash_document({'_id': 'a', 'b': 1}),
+            mongo.hash_document({'_id': 'a', 'b': 2}))
+
+    def test_compute_sorted_diff(self) -> None:
+        """Merge two sorted streams."""
+
+        # pylint: disable=protected-access
+        summary = mongo._compute_sorted_diff(
+            [('a', 'hash-a'), ('b', 'hash-b'), ('d', 'hash-d')],
+            iter([(None, 'no-id'), ('a', 'hash-a'), ('c', 'hash-c'), ('d', 'new-hash-d')]))
+
+        self.assertEqual(2, summary.num_added)
+        self.assertEqual(1, summary.num_removed)
+        self.assertEqual(1, summary.num_changed)
+        self.assertEqual(
+            {'added': ['c'], 'removed': ['b'], 'changed': ['d']}, summary.samples)
+
+    def test_samples_are_bounded(self) -> None:
+        """Only a few samples are kept."""
+
+        # pylint: disable=protected-access
+        summary = mongo._compute_sorted_diff(
+            [], ((f'{i:04d}', 'hash') for i in range(10000)))
+
+        self.assertEqual(10000, summary.num_added)
+        self.assertEqual(10, len(summary.samples['added']))
+
+    def test_sort_key_mixed_types(self) -> None:
+        """Python sort order for IDs matches the MongoDB one."""
+
+        # pylint: disable=protected-access
+        self.assertEqual(
+            [None, 2, 10.5, '10', 'b'],
+            sorted(['b', '10', 10.5, None, 2], key=mongo._sort_key))
+
 
 class ProtoTestCase(unittest.TestCase):
     """Unit tests for proto functions."""
@@ -0,0 +1,45 @@
+"""Tests for the bob_emploi.lib.prefix_index module."""
+
+import unittest
+
+from bob_emploi.data_analysis.lib import prefix_index
+
+
+class PrefixIndexTestCase(unittest.TestCase):
+    """Unit tests for the PrefixIndex class."""
+
+    def test_iterate_with_prefix(self) -> None:
+        """Basic usage."""
+
+        index = prefix_index.PrefixIndex(
+            (key, key.lower()) for key in ('B1234', 'A1234', 'A1235', 'A12', 'A2234', 'AB'))
+
+        self.assertEqual(
+            ['a12', 'a1234', 'a1235'], list(index.iterate_with_prefix('A12')))
+        self.assertEqual(['a1235'], list(index.iterate_with_prefix('A1235')))
+        self.assertEqual([], list(index.iterate_with_prefix('A12345')))
+        self.assertEqual([], list(index.iterate_with_prefix('C')))
+        self.assertEqual(
+            ['a12', 'a1234', 'a1235', 'a2234', 'ab', 'b1234'],
+            list(index.iterate_with_prefix('')))
+
+    def test_same_as_startswith(self) -> None:
+        """Same values as scanning all keys with startswith."""
+
+        keys = [f'{letter}{number:04d}' for letter in 'ABKM' for number in range(0, 2000, 7)]
+        index = prefix_index.PrefixIndex((key, key) for key in keys)
+        for prefix in ('A', 'A0', 'A01', 'K1', 'K19', 'M0007', 'Z', 'A00000'):
+            self.assertEqual(
+                sorted(key for key in keys if key.startswith(prefix)),
+                list(index.iterate_with_prefix(prefix)), msg=prefix)
+
+    def test_duplicate_keys(self) -> None:
+        """Values with the same key are all kept in their original order."""
+
+        index = prefix_index.PrefixIndex([('A12', 1), ('A1', 2), ('A12', 3)])
+
+        self.assertEqual([1, 3], list(index.iterate_with_prefix('A12')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""Compute all job offers derived data in a single pass on the job offers file.
+
+NOTE: This script is not an importer!
+
+The job offers extract is huge (13 Gb) and several scripts aggregate data from
+it: the job_offers_requirements, job_offers_changes and offers_per_city
+importers, and job_offers_trim. Running them one by one reads the file once per
+script, this script reads it only once and feeds all the requested aggregators
+in the same loop. Each output is written at the end in the same format as the
+`--to_json` flag of the corresponding script.
+
+Only the outputs that are requested are computed, e.g.:
+    docker-compose run --rm data-analysis-prepare \
+        python bob_emploi/data_analysis/misc/job_offers_scan.py \
+        --job_offers_csv data/job_offers/sample_10perc.csv \
+        --colnames_txt data/job_offers/column_names.txt \
+        --requirements_json data/job_offers/job_offers_requirements.json \
+        --changes_json data/job_offers/job_offers_changes.json \
+        --hiring_cities_json data/job_offers/hiring_cities.json \
+        --min_creation_date 2015/01/01
+"""
+
+import argparse
+import contextlib
+import logging
+import sys
+from typing import Optional, Sequence
+
+from bob_emploi.data_analysis.importer import job_offers_changes
+from bob_emploi.data_analysis.importer import job_offers_requirements
+from bob_emploi.data_analysis.importer import offers_per_city
+from bob_emploi.data_analysis.lib import job_offers
+from bob_emploi.data_analysis.lib import mongo
+from bob_emploi.data_analysis.misc import job_offers_trim
+
+
+def main(string_args: Optional[Sequence[str]] = None) -> None:
+    """Scan the job offers file once and write all the requested outputs."""
+
+    parser = argparse.ArgumentParser(
+        description='Compute several datasets from job offers in a single pass.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        '--job_offers_csv', required=True, help='Path of the csv containing the job offers.')
+    parser.add_argument(
+        '--colnames_txt', required=True,
+        help="Path to a file containing the name of the CSV's columns.")
+    parser.add_argument(
+        '--data_folder', default='data', help='Root folder of the other data files.')
+    parser.add_argument(
+        '--requirements_json', help='Path of the JSON file where to save job requirements.')
+    parser.add_argument(
+        '--changes_json', help='Path of the JSON file where to save job offers changes.')
+    parser.add_argument(
+        '--last_year', default='2015', help='The year to consider to compute the changes.')
+    parser.add_argument(
+        '--hiring_cities_json', help='Path of the JSON file where to save hiring cities.')
+    parser.add_argument(
+        '--min_creation_date', default='',
+        help='The date from which we consider the offers for hiring cities and trimmed offers.')
+    parser.add_argument('--trimmed_csv', help='Path of the CSV file where to save trimmed offers.')
+    parser.add_argument(
+        '--trimmed_fields', default=job_offers_trim.DEFAULT_FIELDS,
+        help='List of fields to keep in the trimmed offers, separated by commas.')
+    parser.add_argument(
+        '--trim-dates', action='store_true',
+        help='Trim dates precision to the day in the trimmed offers.')
+    args = parser.parse_args(string_args)
+
+    outputs: list[tuple[str, job_offers.DictsAggregator]] = []
+    if args.requirements_json:
+        outputs.append((args.requirements_json, job_offers_requirements.RequirementsAggregator()))
+    if args.changes_json:
+        outputs.append((
+            args.changes_json, job_offers_changes.EvolutionCounter(int(args.last_year))))
+    if args.hiring_cities_json:
+        outputs.append((
+            args.hiring_cities_json,
+            offers_per_city.HiringCitiesAggregator(args.min_creation_date, args.data_folder)))
+
+    with contextlib.ExitStack() as stack:
+        aggregators: list[job_offers.Aggregator] = [
+            aggregator for unused_path, aggregator in outputs]
+        if args.trimmed_csv:
+            trimmed_file = stack.enter_context(open(args.trimmed_csv, 'w', encoding='utf-8'))
+            aggregators.append(job_offers_trim.TrimWriter(
+                trimmed_file, args.trimmed_fields.split(','), args.min_creation_date,
+                trim_dates=args.trim_dates))
+        if not aggregators:
+            logging.warning('No output requested, nothing to do.')
+            return
+
+        job_offers.scan(
+            args.job_offers_csv, args.colnames_txt, aggregators,
+            total=job_offers.TOTAL_RECORDS_ESTIMATE, progress_file=sys.stdout)
+
+    for json_path, aggregator in outputs:
+        mongo.dump_to_json(aggregator.get_dicts(), json_path)
+
+
+if __name__ == '__main__':
+    main()
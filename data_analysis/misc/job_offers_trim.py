@@ -17,39 +17,51 @@ import argparse
 import csv
 from typing import Optional, Set, TextIO
 
-import tqdm
-
 from bob_emploi.data_analysis.lib import job_offers
 
-_DEFAULT_FIELDS = 'rome_profession_card_code,experience_min_duration,creation_date'
-
+DEFAULT_FIELDS = 'rome_profession_card_code,experience_min_duration,creation_date'
 
-def _trim_job_offers_csv(args: argparse.Namespace, out: Optional[TextIO]) -> None:
 
-    fieldnames = args.fields.split(',')
-    all_job_offers = job_offers.iterate(
-        args.in_csv, args.colnames_txt, required_fields=set(fieldnames + ['creation_date']))
+class TrimWriter:
+    """Write a subset of fields of recent job offers in a CSV file."""
 
-    number_offers_estimate = 8500000
+    def __init__(
+            self, out_file: TextIO, fields: list[str], min_creation_date: str,
+            trim_dates: bool = False) -> None:
+        self._fields = fields
+        self._min_creation_date = min_creation_date
+        self.required_fields = frozenset(fields + ['creation_date'])
+        self._writer = csv.DictWriter(out_file, fieldnames=fields)
+        self._writer.writeheader()
 
-    with open(args.out_csv, 'w', encoding='utf-8') as out_file:
-        writer = csv.DictWriter(out_file, fieldnames=fieldnames)
-        writer.writeheader()
-
-        trim_date_fields: Set[str] = set()
-        if args.trim_dates:
-            trim_date_fields = {
-                field for field in fieldnames
+        self._trim_date_fields: Set[str] = set()
+        if trim_dates:
+            self._trim_date_fields = {
+                field for field in fields
                 if field.startswith('date_') or field.endswith('_date')
             }
 
-        for job_offer in tqdm.tqdm(all_job_offers, total=number_offers_estimate, file=out):
-            if job_offer.creation_date < args.min_creation_date:
-                continue
-            row = {field: getattr(job_offer, field) for field in fieldnames}
-            for field in trim_date_fields:
-                row[field] = row[field][:10]
-            writer.writerow(row)
+    def collect(self, job_offer: 'job_offers._JobOffer') -> None:
+        """Write the job offer if it is recent enough."""
+
+        if not job_offer.creation_date or job_offer.creation_date < self._min_creation_date:
+            return
+        row = {field: getattr(job_offer, field) for field in self._fields}
+        for field in self._trim_date_fields:
+            row[field] = row[field][:10]
+        self._writer.writerow(row)
+
+
+def _trim_job_offers_csv(args: argparse.Namespace, out: Optional[TextIO]) -> None:
+
+    number_offers_estimate = 8500000
+
+    with open(args.out_csv, 'w', encoding='utf-8') as out_file:
+        trimmer = TrimWriter(
+            out_file, args.fields.split(','), args.min_creation_date, trim_dates=args.trim_dates)
+        job_offers.scan(
+            args.in_csv, args.colnames_txt, [trimmer],
+            total=number_offers_estimate, progress_file=out)
 
 
 def main(string_args: Optional[list[str]] = None, out: Optional[TextIO] = None) -> None:
@@ -65,7 +77,7 @@ def main(string_args: Optional[list[str]] = None, out: Optional[TextIO] = None)
     parser.add_argument('min_creation_date', help='Trim out all offers created before this date.')
     parser.add_argument(
         'fields', help='list of fields to keep, separated by commas.',
-        default=_DEFAULT_FIELDS)
+        default=DEFAULT_FIELDS)
     parser.add_argument('--trim-dates', action='store_true', help='Trim dates precision to the day')
 
     args = parser.parse_args(string_args)
@@ -0,0 +1,96 @@
+"""Tests for the bob_emploi.misc.job_offers_scan module."""
+
+import json
+import os
+from os import path
+import tempfile
+import unittest
+from unittest import mock
+
+from bob_emploi.data_analysis.importer import job_offers_changes
+from bob_emploi.data_analysis.importer import job_offers_requirements
+from bob_emploi.data_analysis.importer import offers_per_city
+from bob_emploi.data_analysis.misc import job_offers_scan
+
+
+@mock.patch('tqdm.tqdm', new=lambda iterable, **kwargs: iterable)
+class JobOffersScanTestCase(unittest.TestCase):
+    """Tests for the single-pass scan of job offers."""
+
+    # The other datasets needed by the importers are in the importers' test data.
+    testdata_folder = path.join(path.dirname(__file__), '../../importer/test/testdata')
+    offers_csv = path.join(testdata_folder, 'job_offers/job_offers.csv')
+    colnames_txt = path.join(testdata_folder, 'job_offers/column_names.txt')
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self) -> None:
+        for filename in os.listdir(self.tmp_dir):
+            os.remove(path.join(self.tmp_dir, filename))
+        os.rmdir(self.tmp_dir)
+        super().tearDown()
+
+    def _read_json(self, filename: str) -> object:
+        with open(path.join(self.tmp_dir, filename), encoding='utf-8') as json_file:
+            return json.load(json_file)
+
+    def test_same_as_separate_scripts(self) -> None:
+        """All outputs are the same as when running each script separately."""
+
+        job_offers_scan.main([
+            '--job_offers_csv', self.offers_csv,
+            '--colnames_txt', self.colnames_txt,
+            '--data_folder', self.testdata_folder,
+            '--requirements_json', path.join(self.tmp_dir, 'requirements.json'),
+            '--changes_json', path.join(self.tmp_dir, 'changes.json'),
+            '--hiring_cities_json', path.join(self.tmp_dir, 'hiring_cities.json'),
+            '--min_creation_date', '2015-01-01',
+        ])
+
+        self.assertEqual(
+            job_offers_requirements.csv2dicts(self.offers_csv, self.colnames_txt),
+            self._read_json('requirements.json'))
+        # Round trip through JSON to get string keys for years.
+        self.assertEqual(
+            json.loads(json.dumps(
+                job_offers_changes.csv2dicts(self.offers_csv, self.colnames_txt))),
+            self._read_json('changes.json'))
+        self.assertEqual(
+            offers_per_city.extract_offers_per_cities(
+                self.offers_csv, self.colnames_txt, '2015-01-01',
+                data_folder=self.testdata_folder),
+            self._read_json('hiring_cities.json'))
+
+    def test_only_requested_outputs(self) -> None:
+        """Only the requested outputs are computed."""
+
+        job_offers_scan.main([
+            '--job_offers_csv', self.offers_csv,
+            '--colnames_txt', self.colnames_txt,
+            '--changes_json', path.join(self.tmp_dir, 'changes.json'),
+        ])
+
+        self.assertEqual(['changes.json'], os.listdir(self.tmp_dir))
+
+    def test_trimmed_offers(self) -> None:
+        """Trimmed offers can be written during the same scan."""
+
+        job_offers_scan.main([
+            '--job_offers_csv', self.offers_csv,
+            '--colnames_txt', self.colnames_txt,
+            '--trimmed_csv', path.join(self.tmp_dir, 'trimmed.csv'),
+            '--trimmed_fields', 'id_offre,creation_date',
+            '--min_creation_date', '2015-08-01',
+            '--trim-dates',
+        ])
+
+        with open(path.join(self.tmp_dir, 'trimmed.csv'), encoding='utf-8') as trimmed_file:
+            lines = trimmed_file.read().split('\n')
+        self.assertEqual('id_offre,creation_date', lines[0])
+        self.assertIn('000053Q,2015-08-16', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 """Tests for the bob_emploi.job_offers_trim module."""
 
+import collections
 import io
 import os
 from os import path
@@ -68,6 +69,18 @@ class JobOffersTrimTestCase(unittest.TestCase):
             '000BLZH,2015-08-16\n',
             output)
 
+    def test_trim_writer_without_date(self) -> None:
+        """Skip job offers without any creation date."""
+
+        job_offer = collections.namedtuple('JobOffer', ['id_offre', 'creation_date'])
+        output = io.StringIO()
+        writer = job_offers_trim.TrimWriter(output, ['id_offre'], '2015-08-01')
+
+        writer.collect(job_offer('000053Q', None))  # type: ignore
+        writer.collect(job_offer('000185Q', '2015-08-16'))  # type: ignore
+
+        self.assertEqual('id_offre\r\n000185Q\r\n', output.getvalue())
+
 
 if __name__ == '__main__':
     unittest.main()
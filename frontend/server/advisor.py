@@ -22,26 +22,31 @@ from bob_emploi.frontend.api import user_pb2
 def maybe_advise(
         user: user_pb2.User,
         project: project_pb2.Project,
-        database: mongo.NoPiiMongoDatabase) -> None:
+        database: mongo.NoPiiMongoDatabase,
+        *, scoring_project: Optional[scoring.ScoringProject] = None) -> None:
     """Check if a project needs advice and populate all advice fields if not.
 
     Args:
         user: the full user info.
         project: the project to advise. This proto will be modified.
+        scoring_project: the scoring project for this user and project if it already
+            exists, so that its scores and DB caches are shared with the other steps.
     """
 
     if project.is_incomplete:
         return
-    _maybe_recommend_advice(user, project, database)
+    _maybe_recommend_advice(user, project, database, scoring_project)
 
 
 def _maybe_recommend_advice(
         user: user_pb2.User,
         project: project_pb2.Project,
-        database: mongo.NoPiiMongoDatabase) -> bool:
+        database: mongo.NoPiiMongoDatabase,
+        scoring_project: Optional[scoring.ScoringProject]) -> bool:
     if user.features_enabled.advisor == features_pb2.CONTROL:
         return False
-    scoring_project = scoring.ScoringProject(project, user, database, now=now.get())
+    if scoring_project is None:
+        scoring_project = scoring.ScoringProject(project, user, database, now=now.get())
     if user.features_enabled.action_plan == features_pb2.ACTIVE and not project.actions:
         compute_actions_for_project(scoring_project)
     if project.advices:
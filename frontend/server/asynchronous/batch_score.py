@@ -0,0 +1,314 @@
+"""Score a whole corpus of use cases offline, to evaluate changes in scoring models.
+
+Each use case is diagnosed, advised and strategized as in the app, and the results of each model
+(main challenges relevance, advice stars, strategy scores) are written to a CSV report, along with
+the time spent in each step. Use cases are sharded across a pool of processes, each one with its
+own DB connections and its own warm caches.
+
+To compare two versions of the code, run the script on each version with the same corpus:
+    docker-compose run --rm -e MONGO_URL ... -e EVAL_MONGO_URL ... frontend-flask \
+        python bob_emploi/frontend/server/asynchronous/batch_score.py \
+        --pool_name my-pool --output scores-new.csv --compare_to scores-old.csv
+"""
+
+import argparse
+import collections
+from concurrent import futures
+import csv
+import itertools
+import json
+import logging
+import math
+import os
+import sys
+import time
+import typing
+from typing import Any, Iterable, Iterator, Optional, TextIO
+
+from bob_emploi.common.python import now
+from bob_emploi.frontend.api import use_case_pb2
+from bob_emploi.frontend.server import advisor
+from bob_emploi.frontend.server import cache
+from bob_emploi.frontend.server import diagnostic
+from bob_emploi.frontend.server import mongo
+from bob_emploi.frontend.server import privacy
+from bob_emploi.frontend.server import proto
+from bob_emploi.frontend.server import scoring
+from bob_emploi.frontend.server import strategist
+
+_REPORT_FIELDS = ('use_case_id', 'kind', 'name', 'score')
+# Kind of rows in the report which are timings, and not the result of a model.
+_TIMING_KIND = 'seconds'
+
+
+class _Score(typing.NamedTuple):
+    use_case_id: str
+    # One of "relevance", "main_challenge", "advice", "strategy" or "seconds".
+    kind: str
+    # The ID of the main challenge, advice module, strategy or step.
+    name: str
+    score: float
+
+
+def score_use_case(
+        use_case: use_case_pb2.UseCase, database: mongo.NoPiiMongoDatabase) -> list[_Score]:
+    """Diagnose, advise and strategize the first project of a use case, and list the results."""
+
+    user = use_case.user_data
+    if not user.projects:
+        return []
+    project = user.projects[0]
+    for field in ('actions', 'advices', 'diagnostic', 'strategies'):
+        project.ClearField(field)
+    scoring_project = scoring.ScoringProject(project, user, database, now=now.get())
+    use_case_id = use_case.use_case_id
+
+    timings = []
+    start = time.monotonic()
+    diagnostic.diagnose(user, project, database, scoring_project=scoring_project)
+    timings.append(_Score(use_case_id, _TIMING_KIND, 'diagnose', time.monotonic() - start))
+    start = time.monotonic()
+    advisor.maybe_advise(user, project, database, scoring_project=scoring_project)
+    timings.append(_Score(use_case_id, _TIMING_KIND, 'advise', time.monotonic() - start))
+    start = time.monotonic()
+    strategist.strategize(user, project, database, scoring_project=scoring_project)
+    timings.append(_Score(use_case_id, _TIMING_KIND, 'strategize', time.monotonic() - start))
+
+    return [
+        _Score(use_case_id, 'relevance', challenge.category_id, challenge.relevance)
+        for challenge in project.diagnostic.categories
+    ] + [
+        _Score(use_case_id, 'main_challenge', project.diagnostic.category_id, 1),
+    ] + [
+        _Score(use_case_id, 'advice', advice.advice_id, advice.num_stars)
+        for advice in project.advices
+    ] + [
+        _Score(use_case_id, 'strategy', strategy.strategy_id, strategy.score)
+        for strategy in project.strategies
+    ] + timings
+
+
+@cache.lru(maxsize=1)
+def _get_worker_database() -> mongo.NoPiiMongoDatabase:
+    return mongo.get_connections_from_env().stats_db
+
+
+def _init_worker() -> None:
+    """Set up a worker process with its own DB connections.
+
+    Forked workers inherit the caches of the parent process, including its Mongo clients which must
+    not be shared across processes, so they are all dropped before connecting again.
+    """
+
+    cache.clear()
+    _get_worker_database()
+
+
+def _score_serialized_use_cases(serialized_use_cases: list[bytes]) -> list[_Score]:
+    """Score a batch of use cases in a worker process."""
+
+    database = _get_worker_database()
+    scores: list[_Score] = []
+    for serialized_use_case in serialized_use_cases:
+        use_case = use_case_pb2.UseCase()
+        use_case.ParseFromString(serialized_use_case)
+        scores.extend(score_use_case(use_case, database))
+    return scores
+
+
+def _batch(iterable: Iterable[Any], batch_size: int) -> Iterator[list[Any]]:
+    iterator = iter(iterable)
+    while batch_items := list(itertools.islice(iterator, batch_size)):
+        yield batch_items
+
+
+def batch_score(
+        use_cases: Iterable[use_case_pb2.UseCase], database: mongo.NoPiiMongoDatabase, *,
+        num_processes: int = 0, batch_size: int = 100) -> Iterator[_Score]:
+    """Score use cases, in parallel processes if num_processes is set.
+
+    The scores are yielded in the same order as the use cases.
+    """
+
+    if not num_processes:
+        for use_case in use_cases:
+            yield from score_use_case(use_case, database)
+        return
+
+    with futures.ProcessPoolExecutor(
+            max_workers=num_processes, initializer=_init_worker) as executor:
+        # Keep a bounded number of batches in flight, so that the corpus is streamed.
+        pending: collections.deque['futures.Future[list[_Score]]'] = collections.deque()
+        for batch_items in _batch(use_cases, batch_size):
+            if len(pending) >= 2 * num_processes:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(
+                _score_serialized_use_cases,
+                [use_case.SerializeToString() for use_case in batch_items]))
+        while pending:
+            yield from pending.popleft().result()
+
+
+class _Distribution:
+    """Running statistics of the scores of a model."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.
+        self.min = math.inf
+        self.max = -math.inf
+        self.num_positive = 0
+
+    def add(self, score: float) -> None:  # pylint: disable=invalid-name
+        """Add a score to the distribution."""
+
+        self.count += 1
+        self.total += score
+        self.min = min(self.min, score)
+        self.max = max(self.max, score)
+        if score > 0:
+            self.num_positive += 1
+
+
+def _write_report(
+        scores: Iterable[_Score], report_path: str) -> dict[tuple[str, str], _Distribution]:
+    """Write the scores to a CSV report, and compute the distribution of each model."""
+
+    distributions: dict[tuple[str, str], _Distribution] = \
+        collections.defaultdict(_Distribution)
+    with open(report_path, 'w', encoding='utf-8', newline='') as report_file:
+        writer = csv.writer(report_file)
+        writer.writerow(_REPORT_FIELDS)
+        for score in scores:
+            writer.writerow(score)
+            distributions[score.kind, score.name].add(score.score)
+    return distributions
+
+
+def _print_distributions(
+        distributions: dict[tuple[str, str], _Distribution], out: TextIO) -> None:
+    writer = csv.writer(out)
+    writer.writerow(('kind', 'name', 'count', 'mean', 'min', 'max', 'num_positive'))
+    for (kind, name), distribution in sorted(distributions.items()):
+        writer.writerow((
+            kind, name, distribution.count, f'{distribution.total / distribution.count:.4g}',
+            f'{distribution.min:.4g}', f'{distribution.max:.4g}', distribution.num_positive))
+
+
+def _iterate_report(report_path: str) -> Iterator[tuple[str, dict[tuple[str, str], float]]]:
+    """Iterate on the model results of each use case in a report, ignoring timings."""
+
+    with open(report_path, encoding='utf-8', newline='') as report_file:
+        for use_case_id, rows in itertools.groupby(
+                csv.DictReader(report_file), key=lambda row: row['use_case_id']):
+            yield use_case_id, {
+                (row['kind'], row['name']): float(row['score'])
+                for row in rows if row['kind'] != _TIMING_KIND
+            }
+
+
+def compare_reports(old_report_path: str, new_report_path: str, out: TextIO) -> None:
+    """Compare the results of each model between two reports on the same use cases.
+
+    Both reports must list the use cases in the same order, which is the case when they are made
+    by this script from the same source.
+    """
+
+    num_missing_use_cases = 0
+    changes: dict[tuple[str, str], collections.Counter[str]] = \
+        collections.defaultdict(collections.Counter)
+    for old_use_case, new_use_case in itertools.zip_longest(
+            _iterate_report(old_report_path), _iterate_report(new_report_path)):
+        if not old_use_case or not new_use_case:
+            num_missing_use_cases += 1
+            continue
+        old_id, old_scores = old_use_case
+        new_id, new_scores = new_use_case
+        if old_id != new_id:
+            raise ValueError(
+                f'The reports do not list the same use cases: "{old_id}" vs "{new_id}".')
+        for key in old_scores.keys() | new_scores.keys():
+            if key not in new_scores:
+                changes[key]['removed'] += 1
+            elif key not in old_scores:
+                changes[key]['added'] += 1
+            elif old_scores[key] != new_scores[key]:
+                changes[key]['changed'] += 1
+            else:
+                changes[key]['same'] += 1
+    if num_missing_use_cases:
+        logging.warning('%d use cases are only in one of the reports.', num_missing_use_cases)
+
+    writer = csv.writer(out)
+    writer.writerow(('kind', 'name', 'same', 'changed', 'added', 'removed'))
+    for (kind, name), counts in sorted(changes.items()):
+        writer.writerow((
+            kind, name, counts['same'], counts['changed'], counts['added'], counts['removed']))
+
+
+def _iterate_use_cases(
+        source: str, filters: dict[str, Any], limit: int) -> Iterator[use_case_pb2.UseCase]:
+    unused_, user_db, eval_db = mongo.get_connections_from_env()
+    if source == 'users':
+        users = user_db.user.find(filters).sort('_id').limit(limit)
+        for index, user_dict in enumerate(users):
+            # Keep the anonymized ID so that the report does not leak the real user IDs.
+            use_case = privacy.user_to_use_case(user_dict, 'batch', index)
+            if use_case:
+                yield use_case
+        return
+    for use_case_dict in eval_db.use_case.find(filters).sort('_id').limit(limit):
+        yield proto.create_from_mongo(use_case_dict, use_case_pb2.UseCase, 'use_case_id')
+
+
+def main(string_args: Optional[list[str]] = None, out: TextIO = sys.stdout) -> None:
+    """Score a corpus of use cases and report the distribution of the results of each model."""
+
+    parser = argparse.ArgumentParser(
+        description='Score a corpus of use cases with the current scoring models.')
+    parser.add_argument(
+        '--source', choices=('use_cases', 'users'), default='use_cases',
+        help='Whether to score use cases from the eval DB, or anonymized users.')
+    parser.add_argument('--pool_name', help='Only score the use cases from this pool.')
+    parser.add_argument(
+        '--filters', default='{}', help='A JSON Mongo filter on the use cases or users.')
+    parser.add_argument(
+        '--limit', type=int, default=0, help='Maximum number of use cases to score.')
+    parser.add_argument(
+        '--num_processes', type=int, default=os.cpu_count() or 1,
+        help='Number of processes to score in parallel, 0 to score in the main process.')
+    parser.add_argument(
+        '--batch_size', type=int, default=100,
+        help='Number of use cases sent to a process at once.')
+    parser.add_argument(
+        '--output', required=True,
+        help='Path to the CSV file where to write the results of each use case.')
+    parser.add_argument(
+        '--compare_to',
+        help='Path to the CSV report of a previous run on the same use cases, e.g. with another '
+        'version of the code.')
+    args = parser.parse_args(string_args)
+
+    filters = json.loads(args.filters)
+    if args.pool_name:
+        filters['poolName'] = args.pool_name
+
+    start = time.monotonic()
+    scores = batch_score(
+        _iterate_use_cases(args.source, filters, args.limit),
+        mongo.get_connections_from_env().stats_db,
+        num_processes=args.num_processes, batch_size=args.batch_size)
+    distributions = _write_report(scores, args.output)
+    num_use_cases = distributions.get((_TIMING_KIND, 'diagnose'), _Distribution()).count
+    logging.info(
+        'Scored %d use cases in %.1f seconds.', num_use_cases, time.monotonic() - start)
+    _print_distributions(distributions, out)
+
+    if args.compare_to:
+        out.write('\n')
+        compare_reports(args.compare_to, args.output, out)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
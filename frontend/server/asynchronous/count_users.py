@@ -1,4 +1,8 @@
-"""A script to count users in each departement and rome group."""
+"""A script to count users in each departement and rome group.
+
+It also materializes the usage counters served publicly by the /api/usage/stats
+endpoint, so that this endpoint never needs to scan the user collection.
+"""
 
 import collections
 import datetime
@@ -6,10 +10,12 @@ from typing import Mapping
 
 from google.protobuf import json_format
 
-from bob_emploi.common.python import proto
+from bob_emploi.common.python import now
+from bob_emploi.common.python import proto as common_proto
 from bob_emploi.frontend.api import project_pb2
 from bob_emploi.frontend.api import stats_pb2
 from bob_emploi.frontend.server import mongo
+from bob_emploi.frontend.server import proto
 
 
 def _convert_date(date: str) -> datetime.datetime:
@@ -55,10 +61,25 @@ class _FirstnameCounter:
         }
 
 
+def _count_weekly_new_users(user_db: mongo.UsersDatabase, instant: datetime.datetime) -> int:
+    """Count users registered during the 7 days before the given instant."""
+
+    end_of_period = instant.astimezone(datetime.timezone.utc).replace(microsecond=0, tzinfo=None)
+    start_of_period = end_of_period - datetime.timedelta(days=7)
+    return user_db.user.count_documents({
+        'registeredAt': {
+            '$gt': proto.datetime_to_json_string(start_of_period),
+            '$lte': proto.datetime_to_json_string(end_of_period),
+        },
+        'featuresEnabled.excludeFromAnalytics': {'$ne': True},
+    })
+
+
 def main() -> None:
     """Aggregate users and populate user_count collection."""
 
     stats_db, user_db, unused_eval_db = mongo.get_connections_from_env()
+    instant = now.get()
 
     aggregation = user_db.user.aggregate([
         {'$match': {
@@ -66,6 +87,7 @@ def main() -> None:
         }},
         {'$unwind': '$projects'},
         {'$project': {
+            'category_id': '$projects.diagnostic.categoryId',
             'created_at': '$projects.createdAt',
             'dep_id': '$projects.city.departementId',
             'firstname': '$profile.name',
@@ -78,6 +100,7 @@ def main() -> None:
     ])
 
     job_group_counts: dict[str, int] = collections.defaultdict(int)
+    main_challenge_counts: dict[str, int] = collections.defaultdict(int)
     dep_counts: dict[str, int] = collections.defaultdict(int)
     medium_search_interview_counts: dict[str, int] = collections.defaultdict(int)
     long_search_interview_counts: dict[str, int] = collections.defaultdict(int)
@@ -98,6 +121,8 @@ def main() -> None:
             dep_counts[user_info.get('dep_id', '')] += 1
         if 'rome_id' in user_info:
             job_group_counts[user_info.get('rome_id', '')] += 1
+        if user_info.get('category_id'):
+            main_challenge_counts[user_info['category_id']] += 1
         if 'weekly_applications' in user_info:
             weekly_applications_name = user_info.get('weekly_applications')
             if weekly_applications_name:
@@ -128,13 +153,18 @@ def main() -> None:
     ]
 
     user_counts = stats_pb2.UsersCount(
+        total_user_count=user_db.user.count_documents({
+            'featuresEnabled.excludeFromAnalytics': {'$ne': True},
+        }),
+        weekly_new_user_count=_count_weekly_new_users(user_db, instant),
         departement_counts=dep_counts, job_group_counts=job_group_counts,
+        main_challenge_counts=main_challenge_counts,
         weekly_application_counts=weekly_application_counts,
         medium_search_interview_counts=medium_search_interview_counts,
         long_search_interview_counts=long_search_interview_counts,
         passion_level_counts=passion_level_counts,
         frequent_firstnames=firstname_counts.get_top())
-    proto.set_date_now(user_counts.aggregated_at)
+    common_proto.set_date_now(user_counts.aggregated_at, instant)
 
     stats_db.user_count.replace_one(
         {'_id': ''}, json_format.MessageToDict(user_counts), upsert=True)
@@ -0,0 +1,172 @@
+"""Tests for the batch_score module."""
+
+import csv
+import io
+import multiprocessing
+from os import path
+import tempfile
+import unittest
+
+from bson import objectid
+
+from bob_emploi.frontend.server import mongo
+from bob_emploi.frontend.server.asynchronous import batch_score
+from bob_emploi.frontend.server.asynchronous.test import asynchronous_test_case
+
+
+class BatchScoreTestCase(asynchronous_test_case.TestCase):
+    """Unit tests for the batch score script."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+        self._stats_db.diagnostic_main_challenges.insert_many([
+            {'categoryId': 'stuck-market', 'filters': ['for-frustrated(NO_OFFERS)']},
+            {'categoryId': 'bravo'},
+        ])
+        self._stats_db.advice_modules.insert_many([
+            {
+                'adviceId': 'network',
+                'isReadyForProd': True,
+                'triggerScoringModel': 'constant(2)',
+            },
+            {
+                'adviceId': 'never',
+                'isReadyForProd': True,
+                'triggerScoringModel': 'constant(0)',
+            },
+        ])
+        self._eval_db.use_case.insert_many([
+            {
+                '_id': 'pool_01',
+                'poolName': 'pool',
+                'userData': {
+                    'profile': {'frustrations': ['NO_OFFERS']},
+                    'projects': [{'diagnostic': {'categoryId': 'old-one'}}],
+                },
+            },
+            {
+                '_id': 'pool_00',
+                'poolName': 'pool',
+                'userData': {'projects': [{}]},
+            },
+            {
+                '_id': 'other_00',
+                'poolName': 'other',
+                'userData': {'projects': [{}]},
+            },
+        ])
+
+    def _read_report(self, report_path: str) -> list[dict[str, str]]:
+        with open(report_path, encoding='utf-8') as report_file:
+            return list(csv.DictReader(report_file))
+
+    def test_main(self) -> None:
+        """Score all the use cases of a pool."""
+
+        output = path.join(self.tmp_dir, 'scores.csv')
+        out = io.StringIO()
+        batch_score.main(
+            ['--pool_name', 'pool', '--num_processes', '0', '--output', output], out=out)
+
+        rows = self._read_report(output)
+        self.assertEqual(
+            ['pool_00', 'pool_01'], list(dict.fromkeys(row['use_case_id'] for row in rows)))
+        advice_scores = {
+            (row['use_case_id'], row['name']): row['score']
+            for row in rows if row['kind'] == 'advice'}
+        self.assertEqual(
+            {('pool_00', 'network'): '2.0', ('pool_01', 'network'): '2.0'}, advice_scores)
+        self.assertEqual(
+            {'diagnose', 'advise', 'strategize'},
+            {row['name'] for row in rows if row['kind'] == 'seconds'})
+        self.assertNotIn('old-one', {row['name'] for row in rows})
+
+        distributions = {
+            (row['kind'], row['name']): row for row in csv.DictReader(io.StringIO(out.getvalue()))}
+        self.assertEqual('2', distributions['advice', 'network']['count'])
+        self.assertEqual('2', distributions['advice', 'network']['mean'])
+        self.assertEqual('2', distributions['seconds', 'diagnose']['count'])
+
+    def test_main_users(self) -> None:
+        """Score anonymized users without leaking their IDs."""
+
+        self._user_db.user.insert_many([
+            {'_id': objectid.ObjectId('5daf2298484ae6c93351b822'), 'projects': [{}]},
+            {'_id': objectid.ObjectId('5daf2298484ae6c93351b823'), 'projects': [{}]},
+        ])
+
+        output = path.join(self.tmp_dir, 'scores.csv')
+        batch_score.main(
+            ['--source', 'users', '--num_processes', '0', '--output', output], out=io.StringIO())
+
+        rows = self._read_report(output)
+        self.assertEqual(
+            ['batch_00', 'batch_01'], list(dict.fromkeys(row['use_case_id'] for row in rows)))
+        with open(output, encoding='utf-8') as report_file:
+            self.assertNotIn('5daf2298484ae6c93351b822', report_file.read())
+
+    @unittest.skipUnless(
+        multiprocessing.get_start_method() == 'fork',
+        'Worker processes need to inherit the mock databases.')
+    def test_main_processes(self) -> None:
+        """Score the use cases in several processes, in the same order."""
+
+        output = path.join(self.tmp_dir, 'scores.csv')
+        batch_score.main(
+            ['--num_processes', '2', '--batch_size', '1', '--output', output], out=io.StringIO())
+
+        rows = self._read_report(output)
+        self.assertEqual(
+            ['other_00', 'pool_00', 'pool_01'],
+            list(dict.fromkeys(row['use_case_id'] for row in rows)))
+        self.assertEqual(
+            ['2.0', '2.0', '2.0'],
+            [row['score'] for row in rows if row['name'] == 'network'])
+
+    def test_init_worker(self) -> None:
+        """A worker does not reuse the DB connections of its parent process."""
+
+        parent_connections = mongo.get_connections_from_env()
+
+        batch_score._init_worker()  # pylint: disable=protected-access
+
+        self.assertIsNot(parent_connections, mongo.get_connections_from_env())
+
+    def test_compare_reports(self) -> None:
+        """Compare the results of two runs."""
+
+        old_report = path.join(self.tmp_dir, 'old.csv')
+        with open(old_report, 'w', encoding='utf-8') as report_file:
+            report_file.write(
+                'use_case_id,kind,name,score\n'
+                'a,advice,network,2\n'
+                'a,advice,other,1\n'
+                'a,seconds,advise,0.1\n'
+                'b,advice,network,2\n')
+        new_report = path.join(self.tmp_dir, 'new.csv')
+        with open(new_report, 'w', encoding='utf-8') as report_file:
+            report_file.write(
+                'use_case_id,kind,name,score\n'
+                'a,advice,network,3\n'
+                'a,seconds,advise,0.2\n'
+                'b,advice,network,2\n'
+                'b,advice,new,1\n')
+
+        out = io.StringIO()
+        batch_score.compare_reports(old_report, new_report, out)
+
+        self.assertEqual(
+            [
+                'kind,name,same,changed,added,removed',
+                'advice,network,1,1,0,0',
+                'advice,new,0,0,1,0',
+                'advice,other,0,0,0,1',
+            ],
+            out.getvalue().splitlines())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 """Unit tests for the module assess_assessment."""
 
+import datetime
 import typing
 import unittest
 
+from bob_emploi.common.python.test import nowmock
 from bob_emploi.frontend.api import project_pb2
 from bob_emploi.frontend.api import stats_pb2
 from bob_emploi.frontend.server import proto
@@ -159,6 +161,48 @@ class CountUsersTestCase(asynchronous_test_case.TestCase):
                 key=lambda a: typing.cast(stats_pb2.PassionLevelCount, a).count))
         self.assertEqual({'Pascal': .75, 'Cyrille': .25}, result_proto.frequent_firstnames)
 
+    @nowmock.patch(
+        new=lambda: datetime.datetime(2017, 6, 10, 12, 30, tzinfo=datetime.timezone.utc))
+    def test_usage_stats(self) -> None:
+        """Compute the counters for the usage stats endpoint."""
+
+        self._user_db.user.drop()
+        self._user_db.user.insert_many([
+            {'registeredAt': '2016-11-01T12:00:00Z'},
+            {'registeredAt': '2017-06-03T12:00:00Z'},
+            {'registeredAt': '2017-06-03T13:00:00Z'},
+            {
+                'registeredAt': '2017-06-04T12:00:00Z',
+                'featuresEnabled': {'excludeFromAnalytics': True},
+            },
+            {'registeredAt': '2017-06-10T11:00:00Z', 'projects': [{'feedback': {'score': 5}}]},
+            {
+                'registeredAt': '2017-06-10T11:00:00Z',
+                'projects': [{'diagnostic': {'categoryId': 'this_cat'}}],
+                'featuresEnabled': {'excludeFromAnalytics': True},
+            },
+            {
+                'registeredAt': '2017-06-11T11:00:00Z',
+                'projects': [{'diagnostic': {'categoryId': 'this_cat'}}],
+            },
+            {
+                'registeredAt': '2017-06-11T11:00:00Z',
+                'projects': [
+                    {'diagnostic': {'categoryId': 'this_cat'}},
+                    {'diagnostic': {'categoryId': 'other_cat'}},
+                ],
+            },
+        ])
+
+        count_users.main()
+        result = self._db.user_count.find_one({'_id': ''})
+        result_proto = proto.create_from_mongo(result, stats_pb2.UsersCount)
+        self.assertEqual(6, result_proto.total_user_count)
+        self.assertEqual(2, result_proto.weekly_new_user_count)
+        self.assertEqual({'this_cat': 2, 'other_cat': 1}, result_proto.main_challenge_counts)
+        self.assertEqual(
+            datetime.datetime(2017, 6, 10, 12, 30), result_proto.aggregated_at.ToDatetime())
+
     def test_update(self) -> None:
         """Ensure updating overrides previous values."""
 
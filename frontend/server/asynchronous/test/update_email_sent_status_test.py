@@ -188,6 +188,95 @@ class MainTestCase(asynchronous_test_case.TestCase):
 
         mock_mail.get_message.assert_not_called()
 
+    @mock.patch(update_email_sent_status.__name__ + '.mail_send')
+    def test_final_status(self, mock_mail: mock.MagicMock) -> None:
+        """Do not check again emails that reached a final status."""
+
+        mock_mail.get_message.return_value = {'ID': 6789, 'Status': 'opened'}
+        self.database.user.insert_many([
+            {
+                'profile': {'email': 'pascal@example.com'},
+                'emailsSent': [{
+                    'sentAt': '2017-09-08T09:25:46.145001Z',
+                    'mailjetMessageId': 6789,
+                    'status': 'EMAIL_SENT_HARDBOUNCED',
+                }],
+            },
+            {
+                'profile': {'email': 'cyrille@example.com'},
+                'emailsSent': [
+                    {
+                        'sentAt': '2017-09-08T09:25:46.145001Z',
+                        'mailjetMessageId': 6790,
+                        'status': 'EMAIL_SENT_SPAM',
+                    },
+                    {
+                        'sentAt': '2017-09-08T09:25:46.145001Z',
+                        'mailjetMessageId': 6791,
+                    },
+                ],
+            },
+        ])
+
+        update_email_sent_status.main(['--disable-sentry'])
+
+        mock_mail.get_message.assert_called_once_with(6791)
+        updated_user = self.database.user.find_one({'profile.email': 'cyrille@example.com'})
+        assert updated_user
+        self.assertEqual(
+            ['EMAIL_SENT_SPAM', 'EMAIL_SENT_OPENED'],
+            [email.get('status') for email in updated_user.get('emailsSent')])
+        self.assertNotIn('lastStatusCheckedAt', updated_user.get('emailsSent')[0])
+
+    @mock.patch(update_email_sent_status.__name__ + '.mail_send')
+    def test_soft_bounce_is_not_final(self, mock_mail: mock.MagicMock) -> None:
+        """Check again emails that only bounced softly."""
+
+        mock_mail.get_message.return_value = {'ID': 6789, 'Status': 'sent'}
+        self.database.user.insert_one({
+            'profile': {'email': 'pascal@example.com'},
+            'emailsSent': [{
+                'sentAt': '2017-09-08T09:25:46.145001Z',
+                'mailjetMessageId': 6789,
+                'status': 'EMAIL_SENT_BOUNCE',
+            }],
+        })
+
+        update_email_sent_status.main(['--disable-sentry'])
+
+        mock_mail.get_message.assert_called_once_with(6789)
+        updated_user = self.database.user.find_one({'profile.email': 'pascal@example.com'})
+        assert updated_user
+        self.assertEqual(
+            ['EMAIL_SENT_SENT'], [email.get('status') for email in updated_user.get('emailsSent')])
+
+    @mock.patch(update_email_sent_status.__name__ + '._USERS_PAGE_SIZE', 2)
+    def test_many_users(self) -> None:
+        """Update the emails of many users, across several pages."""
+
+        message_ids = [self._send_email(f'user{index:d}@example.com') for index in range(5)]
+        for message_id in message_ids[::2]:
+            mailjetmock.get_message(message_id).open()
+        self.database.user.insert_many([
+            {
+                'profile': {'email': f'user{index:d}@example.com'},
+                'emailsSent': [{
+                    'sentAt': '2017-09-08T09:25:46.145001Z',
+                    'mailjetMessageId': message_id,
+                }],
+            }
+            for index, message_id in enumerate(message_ids)
+        ])
+
+        update_email_sent_status.main(['--disable-sentry', '--max-requests-per-second', '0'])
+
+        self.assertEqual(
+            ['EMAIL_SENT_OPENED', 'EMAIL_SENT_SENT'] * 2 + ['EMAIL_SENT_OPENED'],
+            [
+                user['emailsSent'][0].get('status')
+                for user in self.database.user.find().sort('profile.email')
+            ])
+
     def test_update_helper(self) -> None:
         """Test updating the sent emails for another collection."""
 
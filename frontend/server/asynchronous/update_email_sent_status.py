@@ -5,14 +5,23 @@ This module make the assumptions that old emails have less chance to be updated
  - emails sent less than 1 day ago, always check again
  - emails checked less than 2 weeks after they were sent, only check if not checked for 24 hours
  - other emails: drop it
+ - emails that reached a final status (e.g. bounced or marked as spam): never check again
+
+Users are processed in pages: the messages of all the users in a page are fetched from MailJet
+concurrently (within a rate limit), and users are then updated with a single bulk write.
 """
 
 import argparse
+from concurrent import futures
 import datetime
+import itertools
 import logging
-from typing import Any, Optional
+import threading
+import time
+from typing import Any, Iterable, Mapping, Optional
 
 from google.protobuf import json_format
+import pymongo
 import requests
 
 from bob_emploi.common.python import now
@@ -25,34 +34,99 @@ from bob_emploi.frontend.server.mail import mail_send
 from bob_emploi.frontend.api import email_pb2
 
 
-def _find_message(email_sent: email_pb2.EmailSent) -> Optional[dict[str, Any]]:
-    if email_sent.mailjet_message_id:
+# Statuses after which MailJet never updates a message. A soft bounce (EMAIL_SENT_BOUNCE) is not
+# final, as MailJet keeps retrying to send the message.
+_FINAL_STATUSES = frozenset([
+    email_pb2.EMAIL_SENT_HARDBOUNCED,
+    email_pb2.EMAIL_SENT_BLOCKED,
+    email_pb2.EMAIL_SENT_SPAM,
+    email_pb2.EMAIL_SENT_UNSUB,
+])
+
+# Number of users whose emails are checked together.
+_USERS_PAGE_SIZE = 500
+
+# Number of times to retry a call to MailJet when rate limited.
+_MAX_RATE_LIMITED_RETRIES = 3
+
+
+class _RateLimiter:
+    """Limit the rate of calls shared by several threads."""
+
+    def __init__(self, max_per_second: float) -> None:
+        self._interval = 1 / max_per_second if max_per_second > 0 else 0
+        self._lock = threading.Lock()
+        self._next_call = time.monotonic()
+
+    def wait(self) -> None:  # pylint: disable=invalid-name
+        """Wait until the next call is allowed."""
+
+        with self._lock:
+            current = time.monotonic()
+            delay = self._next_call - current
+            self._next_call = max(current, self._next_call) + self._interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _find_message(message_id: int, rate_limiter: _RateLimiter) -> Optional[dict[str, Any]]:
+    if not message_id:
+        # Could not find message.
+        return None
+    for num_try in range(_MAX_RATE_LIMITED_RETRIES + 1):
+        rate_limiter.wait()
         try:
-            return mail_send.get_message(email_sent.mailjet_message_id)
+            return mail_send.get_message(message_id)
         except requests.exceptions.HTTPError as error:
             if error.response.status_code == 404:
                 return None
-
-    # Could not find message.
+            if error.response.status_code != 429 or num_try == _MAX_RATE_LIMITED_RETRIES:
+                raise
+        time.sleep(2 ** num_try)
+    # Never reached, the last try either returns or raises.
     return None
 
 
-def _update_email_sent_status(
-        email_sent_dict: dict[str, Any], yesterday: str,
-        campaign_ids: Optional[list[str]] = None) -> dict[str, Any]:
-    email_sent = proto.create_from_mongo(email_sent_dict, email_pb2.EmailSent)
+def _fetch_messages(
+        message_ids: Iterable[int], executor: futures.Executor, rate_limiter: _RateLimiter) \
+        -> dict[int, Optional[dict[str, Any]]]:
+    """Fetch concurrently messages from MailJet."""
+
+    unique_message_ids = sorted(set(message_ids))
+    messages = executor.map(
+        lambda message_id: _find_message(message_id, rate_limiter), unique_message_ids)
+    return dict(zip(unique_message_ids, messages))
+
+
+def _must_check(
+        email_sent: email_pb2.EmailSent, yesterday: str,
+        campaign_ids: Optional[list[str]] = None) -> bool:
     if campaign_ids and email_sent.campaign_id not in campaign_ids:
         # Email is not from a campaign we wish to update, skipping.
-        return email_sent_dict
+        return False
+
+    if email_sent.status in _FINAL_STATUSES:
+        return False
 
     if email_sent.status != email_pb2.EMAIL_SENT_UNKNOWN and email_sent.last_status_checked_at:
         sent_at = email_sent.sent_at.ToJsonString()
         if sent_at < yesterday:
             last_status_checked_at = email_sent.last_status_checked_at.ToJsonString()
             if email_sent.last_status_checked_after_days > 14 or last_status_checked_at > yesterday:
-                return email_sent_dict
+                return False
+
+    return True
+
+
+def _update_email_sent_status(
+        email_sent_dict: dict[str, Any], yesterday: str,
+        messages: Mapping[int, Optional[dict[str, Any]]],
+        campaign_ids: Optional[list[str]] = None) -> dict[str, Any]:
+    email_sent = proto.create_from_mongo(email_sent_dict, email_pb2.EmailSent)
+    if not _must_check(email_sent, yesterday, campaign_ids):
+        return email_sent_dict
 
-    message = _find_message(email_sent)
+    message = messages.get(email_sent.mailjet_message_id)
     if message:
         email_sent.mailjet_message_id = message.get('ID', email_sent.mailjet_message_id)
         status = message.get('Status')
@@ -84,13 +158,22 @@ def main(string_args: Optional[list[str]] = None) -> None:
     parser.add_argument(
         '--mongo-collection', default='user', help='Name of the mongo collection to update.')
 
+    parser.add_argument(
+        '--num-workers', default=8, type=int,
+        help='Number of concurrent requests to MailJet.')
+
+    parser.add_argument(
+        '--max-requests-per-second', default=10, type=float,
+        help='Maximum number of requests per second to MailJet, 0 for no limit.')
+
     args = parser.parse_args(string_args)
 
     if not report.setup_sentry_logging(args):
         return
 
-    email_mongo_filter = {
+    email_mongo_filter: dict[str, Any] = {
         'mailjetMessageId': {'$exists': True},
+        'status': {'$nin': [email_pb2.EmailSentStatus.Name(status) for status in _FINAL_STATUSES]},
     }
     if args.campaigns:
         email_mongo_filter['campaignId'] = {'$in': args.campaigns}
@@ -128,20 +211,33 @@ def main(string_args: Optional[list[str]] = None) -> None:
 
     user_db = mongo.get_connections_from_env().user_db
     mongo_collection = user_db.get_collection(args.mongo_collection)
-    selected_users = mongo_collection.find(mongo_filter, {'emailsSent': 1})
+    selected_users = iter(mongo_collection.find(mongo_filter, {'emailsSent': 1}))
+    rate_limiter = _RateLimiter(args.max_requests_per_second)
     treated_users = 0
     # TODO(cyrille): Make sure errors are logged to sentry.
     # TODO(cyrille): If it fails on a specific user, keep going.
-    for user in selected_users:
-        emails_sent = user.get('emailsSent', [])
-        updated_emails_sent = [
-            _update_email_sent_status(email, yesterday, campaign_ids=args.campaigns)
-            for email in emails_sent]
-        mongo_collection.update_one(
-            {'_id': user['_id']},
-            {'$set': {'emailsSent': updated_emails_sent}})
-        treated_users += 1
-        if not treated_users % 100:
+    with futures.ThreadPoolExecutor(max_workers=args.num_workers) as executor:
+        while users := list(itertools.islice(selected_users, _USERS_PAGE_SIZE)):
+            messages = _fetch_messages(
+                (
+                    email_sent.mailjet_message_id
+                    for user in users
+                    for email_sent in (
+                        proto.create_from_mongo(email, email_pb2.EmailSent)
+                        for email in user.get('emailsSent', []))
+                    if _must_check(email_sent, yesterday, campaign_ids=args.campaigns)
+                ),
+                executor, rate_limiter)
+            mongo_collection.bulk_write([
+                pymongo.UpdateOne(
+                    {'_id': user['_id']},
+                    {'$set': {'emailsSent': [
+                        _update_email_sent_status(
+                            email, yesterday, messages, campaign_ids=args.campaigns)
+                        for email in user.get('emailsSent', [])]}})
+                for user in users
+            ], ordered=False)
+            treated_users += len(users)
             logging.info('Treated %d users', treated_users)
 
 
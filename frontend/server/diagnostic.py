@@ -26,8 +26,8 @@ _BOLDED_STRING_SEP = re.compile(r'</?strong>')
 
 
 def maybe_diagnose(
-        user: user_pb2.User, project: project_pb2.Project, database: mongo.NoPiiMongoDatabase) \
-        -> bool:
+        user: user_pb2.User, project: project_pb2.Project, database: mongo.NoPiiMongoDatabase,
+        *, scoring_project: Optional[scoring.ScoringProject] = None) -> bool:
     """Check if a project needs a diagnostic and populate the diagnostic if so."""
 
     if project.is_incomplete:
@@ -35,12 +35,13 @@ def maybe_diagnose(
     if project.diagnostic.categories:
         return False
 
-    diagnose(user, project, database)
+    diagnose(user, project, database, scoring_project=scoring_project)
     return True
 
 
 def diagnose(
-        user: user_pb2.User, project: project_pb2.Project, database: mongo.NoPiiMongoDatabase) \
+        user: user_pb2.User, project: project_pb2.Project, database: mongo.NoPiiMongoDatabase,
+        *, scoring_project: Optional[scoring.ScoringProject] = None) \
         -> diagnostic_pb2.Diagnostic:
     """Diagnose a project.
 
@@ -49,13 +50,16 @@ def diagnose(
         project: the project data. It will be modified, as its diagnostic field
             will be populated.
         database: access to the MongoDB with market data.
+        scoring_project: the scoring project for this user and project if it already
+            exists, so that its scores and DB caches are shared with the other steps.
     Returns:
         the modified diagnostic protobuf.
     """
 
     diagnostic = project.diagnostic
 
-    scoring_project = scoring.ScoringProject(project, user, database, now=now.get())
+    if scoring_project is None:
+        scoring_project = scoring.ScoringProject(project, user, database, now=now.get())
     return diagnose_scoring_project(scoring_project, diagnostic)
 
 
@@ -77,7 +81,10 @@ def diagnose_scoring_project(
     main_challenge: Optional[diagnostic_pb2.DiagnosticMainChallenge] = None
     for challenge in diagnostic.categories:
         if challenge.relevance == diagnostic_pb2.NEEDS_ATTENTION:
-            diagnostic.category_id = challenge.category_id
+            if diagnostic.category_id != challenge.category_id:
+                diagnostic.category_id = challenge.category_id
+                # Some scoring models depend on the main challenge.
+                scoring_project.clear_scores()
             main_challenge = challenge
             break
     if not main_challenge:
@@ -1,15 +1,10 @@
 """Common geographic function for the frontend server."""
 
-import functools
-import logging
-import os
-from typing import KeysView, Optional
-
-from algoliasearch import exceptions
-from algoliasearch import search_client
-from algoliasearch import search_index
-from google.protobuf import json_format
+import array
+import typing
+from typing import Any, Iterable, KeysView, Optional
 
+from bob_emploi.frontend.server import cache
 from bob_emploi.frontend.server import i18n
 from bob_emploi.frontend.server import mongo
 from bob_emploi.frontend.server import proto
@@ -20,11 +15,113 @@ _DEPARTEMENTS: proto.MongoCachedCollection[geo_pb2.Departement] = \
 _IN_DEPARTEMENT = i18n.make_translatable_string('en {departement_name}')
 
 
-@functools.lru_cache()
-def _get_algolia_index() -> search_index.SearchIndex:
-    return search_client.SearchClient.create(
-        os.getenv('ALGOLIA_APP_ID', 'K6ACI9BKKT'),
-        os.getenv('ALGOLIA_API_KEY', 'da4db0bf437e37d6d49cefcb8768c67a')).init_index('cities')
+class _Area(typing.NamedTuple):
+    departement_id: str
+    departement_name: str
+    departement_prefix: str
+    region_id: str
+    region_name: str
+    region_prefix: str
+
+
+class _CityIndex:
+    """A compact in-memory index of cities, with one array per field.
+
+    Département and région fields are shared by many cities, so they are stored only once per
+    area.
+    """
+
+    def __init__(self, cities: Iterable[dict[str, Any]]) -> None:
+        self._rows: dict[str, int] = {}
+        self._names: list[str] = []
+        self._postcodes: list[str] = []
+        self._areas: list[_Area] = []
+        self._area_rows: dict[_Area, int] = {}
+        self._city_areas = array.array('H')
+        self._latitudes = array.array('f')
+        self._longitudes = array.array('f')
+        self._populations = array.array('i')
+        self._urban_scores = array.array('b')
+        self._public_transportation_scores = array.array('f')
+        self._urban_contexts = array.array('b')
+        for city in cities:
+            self._add(city)
+
+    def _add(self, city: dict[str, Any]) -> None:  # pylint: disable=invalid-name
+        area = _Area(
+            city.get('departementId', ''), city.get('departementName', ''),
+            city.get('departementPrefix', ''), city.get('regionId', ''),
+            city.get('regionName', ''), city.get('regionPrefix', ''))
+        area_row = self._area_rows.get(area)
+        if area_row is None:
+            area_row = self._area_rows[area] = len(self._areas)
+            self._areas.append(area)
+
+        self._rows[city['_id']] = len(self._names)
+        self._names.append(city.get('name', ''))
+        self._postcodes.append(city.get('postcodes', ''))
+        self._city_areas.append(area_row)
+        self._latitudes.append(city.get('latitude', 0))
+        self._longitudes.append(city.get('longitude', 0))
+        self._populations.append(int(city.get('population', 0)))
+        self._urban_scores.append(int(city.get('urbanScore', 0)))
+        self._public_transportation_scores.append(city.get('publicTransportationScore', 0))
+        self._urban_contexts.append(int(city.get('urbanContext', 0)))
+
+    def get(self, city_id: str) -> Optional[geo_pb2.FrenchCity]:  # pylint: disable=invalid-name
+        """Get a city proto from its ID, or None if the city is unknown."""
+
+        row = self._rows.get(city_id)
+        if row is None:
+            return None
+        area = self._areas[self._city_areas[row]]
+        return geo_pb2.FrenchCity(
+            city_id=city_id,
+            name=self._names[row],
+            departement_id=area.departement_id,
+            departement_name=area.departement_name,
+            departement_prefix=area.departement_prefix,
+            region_id=area.region_id,
+            region_name=area.region_name,
+            region_prefix=area.region_prefix,
+            postcodes=self._postcodes[row],
+            latitude=self._latitudes[row],
+            longitude=self._longitudes[row],
+            population=self._populations[row],
+            urban_score=self._urban_scores[row],
+            public_transportation_score=self._public_transportation_scores[row],
+            urban_context=self._urban_contexts[row])
+
+
+class _CachedCityIndex:
+    """The city index of a database, loaded once from its cities collection.
+
+    The index is only reloaded when the server cache is cleared, e.g. after an import.
+    """
+
+    def __init__(self) -> None:
+        self._database: Optional[mongo.NoPiiMongoDatabase] = None
+        self._index: Optional[_CityIndex] = None
+
+    def get_index(self, database: mongo.NoPiiMongoDatabase) -> _CityIndex:
+        """Get the index of the cities in the database, loading it if needed."""
+
+        if self._index and database is self._database:
+            return self._index
+        index = _CityIndex(database.get_collection('cities').find())
+        self._database = database
+        self._index = index
+        return index
+
+    def cache_clear(self) -> None:
+        """Drop the loaded index."""
+
+        self._database = None
+        self._index = None
+
+
+_CITY_INDEX = _CachedCityIndex()
+cache.register_clear_func(_CITY_INDEX.cache_clear)
 
 
 def list_all_departements(database: mongo.NoPiiMongoDatabase) -> KeysView[str]:
@@ -84,42 +181,18 @@ def get_city_location(database: mongo.NoPiiMongoDatabase, city_id: str) \
         -> Optional[geo_pb2.FrenchCity]:
     """Get lat/long coordinates for a city from its ID."""
 
-    fetched = proto.fetch_from_mongo(database, geo_pb2.FrenchCity, 'cities', city_id)
-    if fetched:
-        fetched.city_id = city_id
-    return fetched
+    return _CITY_INDEX.get_index(database).get(city_id)
 
 
-def get_city_proto(city_id: str) -> Optional[geo_pb2.FrenchCity]:
+def get_city_proto(database: mongo.NoPiiMongoDatabase, city_id: str) \
+        -> Optional[geo_pb2.FrenchCity]:
     """Compute a full FrenchCity proto from a simple city_id."""
 
     if not city_id:
         return None
 
-    try:
-        algolia_city = _get_algolia_index().get_object(city_id)
-    except exceptions.AlgoliaException as err:
-        logging.warning('Error in algolia: %s for city ID %s', err, city_id)
+    city = _CITY_INDEX.get_index(database).get(city_id)
+    # Former cities only have a location: they cannot be used as a full city.
+    if not city or not city.name:
         return None
-    if not algolia_city:
-        return None
-
-    # Keep in sync with frontend/src/components/suggestions.jsx
-    if 'urban' in algolia_city:
-        urban = algolia_city.pop('urban')
-        algolia_city['urbanScore'] = urban if urban else -1
-    if 'transport' in algolia_city:
-        algolia_city['publicTransportationScore'] = algolia_city.pop('transport')
-    if 'zipCode' in algolia_city:
-        algolia_city['postcodes'] = algolia_city.pop('zipCode')
-
-    city = geo_pb2.FrenchCity(city_id=city_id)
-    try:
-        json_format.ParseDict(algolia_city, city, ignore_unknown_fields=True)
-    except json_format.ParseError as error:
-        logging.warning(
-            'Error %s while parsing a city proto from Algolia:\n%s',
-            error, algolia_city)
-        return None
-
     return city
@@ -1,5 +1,6 @@
 """Module to translate strings on the frontend server."""
 
+import collections
 import datetime
 import json
 import logging
@@ -41,10 +42,65 @@ class TranslatableException(ValueError):
         return flask_translate(str(self).format(*self._args, **self._kwargs))
 
 
+# Maximum number of lookups kept in the cache of a _CompiledTranslations. Keys might come from
+# formatted strings so we need to bound it.
+_MAX_RESOLVED_LOOKUPS = 50000
+
+# Marker for a lookup that has not been resolved yet.
+_NOT_RESOLVED = object()
+
+
+class _CompiledTranslations:
+    """Translations indexed by locale, with a cache of the resolved lookups.
+
+    The raw translations are indexed by string then by locale (one Mongo document per string). This
+    flattens them into one dict per locale, and keeps the result of each lookup, including misses,
+    so that a lookup already done only costs one dict access.
+    """
+
+    def __init__(self, translations: Mapping[str, Mapping[str, str]]) -> None:
+        self._by_locale: dict[str, dict[str, str]] = collections.defaultdict(dict)
+        for key, values in translations.items():
+            for locale, value in values.items():
+                if locale == 'string' or locale.startswith('_'):
+                    continue
+                self._by_locale[locale][key] = value
+        self._resolved: dict[tuple[str, tuple[str, ...]], Optional[str]] = {}
+
+    def resolve(self, keys: tuple[str, ...], locale: str) -> Optional[str]:
+        """Find the translation of the first key found, trying each fallback locale in turn.
+
+        Returns:
+            the translation, or None if none of the keys is translated.
+        """
+
+        cache_key = (locale, keys)
+        translation = self._resolved.get(cache_key, _NOT_RESOLVED)
+        if translation is not _NOT_RESOLVED:
+            return typing.cast(Optional[str], translation)
+
+        translation = self._lookup(keys, locale)
+        if len(self._resolved) >= _MAX_RESOLVED_LOOKUPS:
+            self._resolved.clear()
+        self._resolved[cache_key] = translation
+        return translation
+
+    def _lookup(self, keys: tuple[str, ...], full_locale: str) -> Optional[str]:
+        for locale in iterate_on_fallback_locales(full_locale):
+            translations = self._by_locale.get(locale, {})
+            for key in keys:
+                if not key:
+                    return ''
+                translation = translations.get(key)
+                if translation is not None:
+                    return translation
+        return None
+
+
 class _MongoCachedTranslations:
 
     def __init__(self) -> None:
-        self._cache: Optional[proto.CachedCollection[dict[str, str]]] = None
+        self._cache: Optional[proto.CachedCollection[_CompiledTranslations]] = None
         self._database: Optional[mongo.NoPiiMongoDatabase] = None
         cache.register_clear_func(self.clear_cache)
 
@@ -54,22 +110,21 @@ class _MongoCachedTranslations:
         self._cache = None
         self._database = None
 
-    def get_dict(self, database: mongo.NoPiiMongoDatabase) \
-            -> proto.CachedCollection[dict[str, str]]:
-        """Get the translations dictionary from the database."""
+    def get_compiled(self, database: mongo.NoPiiMongoDatabase) -> _CompiledTranslations:
+        """Get the translations from the database, compiled for lookups."""
 
         if self._cache is None or database is not self._database:
 
-            def _get_values() -> dict[str, dict[str, str]]:
-                return {
+            def _get_values() -> dict[str, _CompiledTranslations]:
+                return {'': _CompiledTranslations({
                     document.get('string', ''): document
                     for document in database.translations.find()
-                }
+                })}
 
             self._cache = proto.CachedCollection(_get_values)
             self._database = database
 
-        return self._cache
+        return self._cache['']
 
 
 _TRANSLATIONS = _MongoCachedTranslations()
@@ -132,6 +187,29 @@ _STATIC_TRANSLATIONS = _LazyJsonDict[Mapping[str, str]](
         os.path.join(os.path.dirname(__file__), 'translations.json')))
 
 
+class _LazyCompiledTranslations:
+
+    def __init__(self, translations: Mapping[str, Mapping[str, str]]) -> None:
+        self._translations = translations
+        self._compiled: Optional[_CompiledTranslations] = None
+        cache.register_clear_func(self.clear_cache)
+
+    def clear_cache(self) -> None:
+        """Clear the current cache."""
+
+        self._compiled = None
+
+    def get_compiled(self) -> _CompiledTranslations:
+        """Get the translations compiled for lookups."""
+
+        if self._compiled is None:
+            self._compiled = _CompiledTranslations(self._translations)
+        return self._compiled
+
+
+_COMPILED_STATIC_TRANSLATIONS = _LazyCompiledTranslations(_STATIC_TRANSLATIONS)
+
+
 def flask_translate(string: str) -> str:
     """Translate a string in host locale (from flask request)."""
 
@@ -169,31 +247,18 @@ def translate_string(
         database: Optional[mongo.NoPiiMongoDatabase] = None) -> str:
     """Translate a string in a given locale."""
 
-    full_locale = locale
-    strings: Sequence[str]
-    if isinstance(string, str):
-        strings = [string]
-    else:
-        strings = string
+    keys = (string,) if isinstance(string, str) else tuple(string)
 
-    translations: Mapping[str, Mapping[str, str]]
     if database:
-        translations = typing.cast(
-            Mapping[str, Mapping[str, str]], _TRANSLATIONS.get_dict(database))
+        translations = _TRANSLATIONS.get_compiled(database)
     else:
-        translations = _STATIC_TRANSLATIONS
-
-    for locale in iterate_on_fallback_locales(full_locale):
-        for key in strings:
-            if not key:
-                return ''
-            try:
-                return translations[key][locale]
-            except KeyError:
-                pass
-
-    raise TranslationMissingException(
-        f'Could not find a translation in "{full_locale}" for "{string}".')
+        translations = _COMPILED_STATIC_TRANSLATIONS.get_compiled()
+
+    translation = translations.resolve(keys, locale)
+    if translation is None:
+        raise TranslationMissingException(
+            f'Could not find a translation in "{locale}" for "{string}".')
+    return translation
 
 
 def translate_date(date: datetime.datetime, unused_locale: str) -> str:
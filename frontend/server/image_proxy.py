@@ -0,0 +1,261 @@
+"""Module to proxy HTTP images through our server with an on-disk cache.
+
+Images are streamed to the client while they are downloaded, and stored in a
+bounded cache on disk (least recently used entries are dropped first). Cached
+images are served directly while they are fresh, and revalidated with the
+origin server (ETag / Last-Modified) once they are stale. Images served with
+"Cache-Control: no-store" by the origin server are never cached.
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+from os import path
+import tempfile
+import typing
+from typing import Any, IO, Iterator, Optional
+import uuid
+
+import flask
+import requests
+from requests import adapters
+
+# Timeouts to connect to and read from the origin server, in seconds.
+_TIMEOUT = (3.05, 10)
+
+# Size of the chunks streamed to the client.
+_CHUNK_SIZE = 64 * 1024
+
+# Duration during which a cached image is served without revalidation.
+_FRESHNESS_DURATION = datetime.timedelta(days=1)
+
+# Max age to let clients and intermediate caches keep images.
+_CLIENT_MAX_AGE_SECONDS = 86400
+
+# Images bigger than this are streamed but never cached.
+_MAX_ENTRY_BYTES = 5 * 1024 * 1024
+
+
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    adapter = adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+_SESSION = _create_session()
+
+
+class _CacheEntry(typing.NamedTuple):
+    data_path: str
+    meta_path: str
+
+
+class _CacheMeta(typing.NamedTuple):
+    content_type: str = ''
+    etag: str = ''
+    last_modified: str = ''
+    fetched_at: float = 0
+
+    def is_fresh(self, instant: datetime.datetime) -> bool:
+        """Whether the cached image can be served without revalidation."""
+
+        return instant.timestamp() - self.fetched_at < _FRESHNESS_DURATION.total_seconds()
+
+
+def _get_cache_folder() -> str:
+    return os.getenv(
+        'IMAGE_PROXY_CACHE_FOLDER', path.join(tempfile.gettempdir(), 'bob-image-proxy'))
+
+
+def _get_cache_max_bytes() -> int:
+    return int(os.getenv('IMAGE_PROXY_CACHE_MAX_BYTES', str(100 * 1024 * 1024)))
+
+
+def _get_entry(url: str) -> _CacheEntry:
+    key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    folder = _get_cache_folder()
+    return _CacheEntry(path.join(folder, f'{key}.data'), path.join(folder, f'{key}.json'))
+
+
+def _read_meta(entry: _CacheEntry) -> Optional[_CacheMeta]:
+    if not path.exists(entry.data_path):
+        return None
+    try:
+        with open(entry.meta_path, 'rt', encoding='utf-8') as meta_file:
+            return _CacheMeta(**json.load(meta_file))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _write_atomically(file_path: str, content: bytes) -> None:
+    tmp_path = f'{file_path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'wb') as tmp_file:
+        tmp_file.write(content)
+    os.replace(tmp_path, file_path)
+
+
+def _write_meta(entry: _CacheEntry, meta: _CacheMeta) -> None:
+    _write_atomically(entry.meta_path, json.dumps(meta._asdict()).encode('utf-8'))
+
+
+def _touch(entry: _CacheEntry) -> None:
+    """Mark an entry as recently used."""
+
+    try:
+        os.utime(entry.data_path)
+    except OSError:
+        pass
+
+
+def _evict_old_entries(keep: _CacheEntry) -> None:
+    """Drop the least recently used entries until the cache fits in its max size."""
+
+    folder = _get_cache_folder()
+    try:
+        data_files = [
+            entry for entry in os.scandir(folder)
+            if entry.is_file() and entry.name.endswith('.data')]
+    except OSError:
+        return
+    stats = [(data_file.path, data_file.stat()) for data_file in data_files]
+    total_size = sum(stat.st_size for unused_path, stat in stats)
+    max_size = _get_cache_max_bytes()
+    for data_path, stat in sorted(stats, key=lambda data_stat: data_stat[1].st_mtime):
+        if total_size <= max_size:
+            return
+        if data_path == keep.data_path:
+            continue
+        for file_path in (data_path, data_path[:-len('.data')] + '.json'):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+        total_size -= stat.st_size
+
+
+def _open_data(entry: _CacheEntry) -> Optional[IO[bytes]]:
+    """Open the data of a cache entry, if it is still there.
+
+    Once open, the data can be streamed even if the entry gets evicted in the meantime.
+    """
+
+    try:
+        return open(entry.data_path, 'rb')
+    except OSError:
+        return None
+
+
+def _iterate_file(data_file: IO[bytes]) -> Iterator[bytes]:
+    with data_file:
+        while chunk := data_file.read(_CHUNK_SIZE):
+            yield chunk
+
+
+def _is_no_store(response: requests.Response) -> bool:
+    cache_control = response.headers.get('Cache-Control', '')
+    return 'no-store' in (directive.strip().lower() for directive in cache_control.split(','))
+
+
+def _stream(response: requests.Response) -> Iterator[bytes]:
+    """Stream the content of a response without caching it."""
+
+    try:
+        yield from response.iter_content(chunk_size=_CHUNK_SIZE)
+    finally:
+        response.close()
+
+
+def _stream_and_cache(
+        response: requests.Response, entry: _CacheEntry, meta: _CacheMeta) -> Iterator[bytes]:
+    """Stream the content of a response while storing it in the cache."""
+
+    tmp_path = f'{entry.data_path}.{uuid.uuid4().hex}.tmp'
+    size = 0
+    try:
+        os.makedirs(path.dirname(entry.data_path), exist_ok=True)
+        with open(tmp_path, 'wb') as tmp_file:
+            for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+                size += len(chunk)
+                if size <= _MAX_ENTRY_BYTES:
+                    tmp_file.write(chunk)
+                yield chunk
+        if size <= _MAX_ENTRY_BYTES:
+            os.replace(tmp_path, entry.data_path)
+            _write_meta(entry, meta)
+            _evict_old_entries(keep=entry)
+    finally:
+        response.close()
+        if path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _create_response(
+        content: Any, content_type: str,
+        cache_control: str = f'public, max-age={_CLIENT_MAX_AGE_SECONDS:d}') -> flask.Response:
+    headers = {'Cache-Control': cache_control}
+    if content_type:
+        headers['Content-Type'] = content_type
+    return flask.Response(response=content, headers=headers)
+
+
+def proxy(src: str, instant: datetime.datetime) -> flask.Response:
+    """Proxy an image, using the cache if possible.
+
+    Args:
+        src: the URL of the image to proxy. The caller is responsible for
+            checking that it is safe to fetch it.
+        instant: the current time, to check the freshness of the cache.
+    Returns:
+        a streamed flask response with the image.
+    """
+
+    entry = _get_entry(src)
+    meta = _read_meta(entry)
+    cached_file = _open_data(entry) if meta else None
+    if not cached_file:
+        meta = None
+    if cached_file and meta and meta.is_fresh(instant):
+        _touch(entry)
+        return _create_response(_iterate_file(cached_file), meta.content_type)
+
+    request_headers = {}
+    if meta and meta.etag:
+        request_headers['If-None-Match'] = meta.etag
+    if meta and meta.last_modified:
+        request_headers['If-Modified-Since'] = meta.last_modified
+
+    try:
+        response = _SESSION.get(src, headers=request_headers, stream=True, timeout=_TIMEOUT)
+    except requests.Timeout:
+        if cached_file and meta:
+            logging.warning('Serving stale image "%s" after a timeout.', src)
+            return _create_response(_iterate_file(cached_file), meta.content_type)
+        flask.abort(504)
+
+    if cached_file and meta and response.status_code == 304:
+        response.close()
+        _write_meta(entry, meta._replace(fetched_at=instant.timestamp()))
+        _touch(entry)
+        return _create_response(_iterate_file(cached_file), meta.content_type)
+
+    if cached_file:
+        cached_file.close()
+
+    if not response.ok:
+        response.close()
+    response.raise_for_status()
+
+    if _is_no_store(response):
+        return _create_response(
+            _stream(response), response.headers.get('Content-Type', ''), cache_control='no-store')
+
+    new_meta = _CacheMeta(
+        content_type=response.headers.get('Content-Type', ''),
+        etag=response.headers.get('ETag', ''),
+        last_modified=response.headers.get('Last-Modified', ''),
+        fetched_at=instant.timestamp())
+    return _create_response(_stream_and_cache(response, entry, new_meta), new_meta.content_type)
@@ -247,11 +247,11 @@ class Campaign:
             should_log_errors: bool = False) -> Union[bool, email_pb2.EmailSent]:
         """Send an email for this campaign."""
 
-        with set_time_locale(_LOCALE_MAP.get(user.profile.locale or 'fr')):
-            template_vars = self.get_vars(
-                user, should_log_errors=should_log_errors, database=database, now=now)
-        if not template_vars:
+        message = self.get_template_message(
+            user, should_log_errors=should_log_errors, database=database, now=now)
+        if not message:
             return False
+        template_vars = message.template_vars
 
         user_profile = user.profile
 
@@ -271,7 +271,7 @@ class Campaign:
         else:
             res = mail_send.send_template(
                 self.id, user_profile, template_vars,
-                sender_email=self._sender_email, sender_name=template_vars['senderName'])
+                sender_email=message.sender_email, sender_name=message.sender_name)
             logging.info(
                 'Email sent to %s',
                 user_profile.email if action == 'dry-run'
@@ -291,6 +291,36 @@ class Campaign:
 
             email_sent = maybe_email_sent
 
+        return self.record_email_sent(
+            user, email_sent, template_vars,
+            users_database=None if action == 'ghost' else users_database,
+            eval_database=eval_database, now=now, mongo_user_update=mongo_user_update)
+
+    def get_template_message(
+            self, user: user_pb2.User, *, should_log_errors: bool = False,
+            database: mongo.NoPiiMongoDatabase, now: datetime.datetime) \
+            -> Optional[mail_send.TemplateMessage]:
+        """Get the message of this campaign for a user, or None if it should not be sent."""
+
+        with set_time_locale(_LOCALE_MAP.get(user.profile.locale or 'fr')):
+            template_vars = self.get_vars(
+                user, should_log_errors=should_log_errors, database=database, now=now)
+        if not template_vars:
+            return None
+        return mail_send.TemplateMessage(
+            self.id, user.profile, template_vars,
+            sender_email=self._sender_email, sender_name=template_vars['senderName'])
+
+    def record_email_sent(
+            self, user: user_pb2.User, email_sent: email_pb2.EmailSent,
+            template_vars: Mapping[str, Any], *,
+            users_database: Optional[mongo.UsersDatabase] = None,
+            eval_database: Optional[mongo.NoPiiMongoDatabase] = None,
+            now: datetime.datetime,
+            mongo_user_update: Optional[dict[str, Any]] = None) -> email_pb2.EmailSent:
+        """Complete an email sent for this campaign, and save it in the user's data if possible."""
+
+        user_profile = user.profile
         campaign_subject = get_campaign_subject(self.id)
         try:
             i18n_campaign_subject = i18n.translate_string(campaign_subject, user_profile.locale)
@@ -304,7 +334,7 @@ class Campaign:
             raise ValueError(
                 f'$push operations are not allowed in mongo_user_update:\n{mongo_user_update}')
         user_id = user.user_id
-        if not user_id or action == 'ghost' or not users_database:
+        if not user_id or not users_database:
             return email_sent
 
         users_database.user.update_one(
@@ -11,8 +11,6 @@ import logging
 import re
 from typing import Iterable, Optional
 
-import requests
-
 from bob_emploi.common.python import now
 from bob_emploi.frontend.api import email_pb2
 from bob_emploi.frontend.api import user_pb2
@@ -28,6 +26,9 @@ from bob_emploi.frontend.server.mail import all_campaigns
 # pylint: enable=unused-import
 from bob_emploi.frontend.server.mail.templates import mailjet_templates
 
+# Number of emails sent together to Mailjet when really sending a blast.
+_SEND_BATCH_SIZE = 50
+
 
 class EmailPolicy:
     """Implements our email policy."""
@@ -118,6 +119,30 @@ def _hash_user_id(user_id: str) -> str:
     return uniform_hash.hexdigest()
 
 
+def _send_batch(
+        this_campaign: campaign.Campaign,
+        users_and_messages: list[tuple[user_pb2.User, mail_send.TemplateMessage]], *,
+        users_database: mongo.UsersDatabase, eval_database: mongo.NoPiiMongoDatabase) -> int:
+    """Send emails of a campaign in a batch, and record them in the users' data.
+
+    Returns:
+        the number of emails that were sent.
+    """
+
+    emails_sent = mail_send.send_templates(message for unused_user, message in users_and_messages)
+    num_sent = 0
+    for (user, message), email_sent in zip(users_and_messages, emails_sent):
+        if not email_sent:
+            logging.warning('Error while sending an email to %s', user.user_id)
+            continue
+        logging.info('Email sent to %s', user.user_id)
+        this_campaign.record_email_sent(
+            user, email_sent, message.template_vars,
+            users_database=users_database, eval_database=eval_database, now=now.get())
+        num_sent += 1
+    return num_sent
+
+
 def blast_campaign(
         campaign_id: mailjet_templates.Id, action: 'campaign.Action',
         registered_from: str, registered_to: str,
@@ -148,6 +173,8 @@ def blast_campaign(
     users_stopped_seeking = 0
     email_policy_rejections = 0
     no_template_vars_count = 0
+    # Users and their messages, waiting to be sent in a batch.
+    pending_messages: list[tuple[user_pb2.User, mail_send.TemplateMessage]] = []
 
     for user_dict in selected_users:
         users_processed_count += 1
@@ -171,19 +198,30 @@ def blast_campaign(
             email_policy_rejections += 1
             continue
 
-        try:
-            if not this_campaign.send_mail(
-                    user,
-                    database=database, users_database=user_database, eval_database=eval_database,
-                    action=action, dry_run_email=dry_run_email, now=now.get(),
-                    should_log_errors=log_reason_on_error):
+        if action == 'send':
+            message = this_campaign.get_template_message(
+                user, database=database, now=now.get(), should_log_errors=log_reason_on_error)
+            if not message:
                 no_template_vars_count += 1
                 continue
-        except requests.exceptions.HTTPError as error:
-            if action == 'dry-run':
-                raise
-            logging.warning('Error while sending an email: %s', error)
-            email_errors += 1
+            pending_messages.append((user, message))
+            if len(pending_messages) < _SEND_BATCH_SIZE:
+                continue
+            num_sent = _send_batch(
+                this_campaign, pending_messages,
+                users_database=user_database, eval_database=eval_database)
+            email_count += num_sent
+            email_errors += len(pending_messages) - num_sent
+            pending_messages = []
+            print(f'{email_count} emails sent ...')
+            continue
+
+        if not this_campaign.send_mail(
+                user,
+                database=database, users_database=user_database, eval_database=eval_database,
+                action=action, dry_run_email=dry_run_email, now=now.get(),
+                should_log_errors=log_reason_on_error):
+            no_template_vars_count += 1
             continue
 
         if action == 'dry-run':
@@ -193,6 +231,13 @@ def blast_campaign(
         if email_count % 100 == 0:
             print(f'{email_count} emails sent ...')
 
+    if pending_messages:
+        num_sent = _send_batch(
+            this_campaign, pending_messages,
+            users_database=user_database, eval_database=eval_database)
+        email_count += num_sent
+        email_errors += len(pending_messages) - num_sent
+
     logging.info('%d users processed.', users_processed_count)
     if users_wrong_id_count:
         logging.info('%d users ignored because of ID selection.', users_wrong_id_count)
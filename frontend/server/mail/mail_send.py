@@ -1,14 +1,19 @@
 """Module to send emails programmatically through MailJet."""
 
 from collections import abc
+import json
 import logging
 import os
 import re
+import time
 import typing
-from typing import Any, Iterable, Iterator, Literal, Mapping, Optional, TypedDict, Union
+from typing import Any, Iterable, Iterator, Literal, Mapping, Optional, Sequence, TypedDict, \
+    Union
 
 from google.protobuf import json_format
 import mailjet_rest
+import requests
+from requests import adapters
 from requests import exceptions
 from requests import models
 
@@ -96,6 +101,14 @@ _MAILJET_SECRET = os.getenv('MAILJET_SECRET', 'dev-mailjet-private-key')
 _MAIL_SENDER_EMAIL = 'bob@bob-emploi.fr'
 _NO_REPLY_EMAIL = 'no-reply@bob-emploi.fr'
 _MAIL_SENDER_NAME = 'Bob'
+_MAILJET_API_URL = os.getenv('MAILJET_API_URL', 'https://api.mailjet.com/')
+
+# Maximum number of messages in a single call to the Mailjet send API v3.1.
+_MAX_MESSAGES_PER_SEND = 50
+# Timeouts to connect to and read from the Mailjet send API, in seconds.
+_SEND_TIMEOUT = (3.05, 60)
+# Delay before retrying failed messages, doubled at each retry.
+_RETRY_DELAY_SECONDS = 1
 
 _NAME_AND_MAIL_REGEXP = re.compile(r'(.*?)\s*<(.*)>')
 
@@ -139,6 +152,20 @@ def _mailjet_client(version: Optional[str] = None) -> mailjet_rest.Client:
     return mailjet_rest.Client(auth=(_MAILJET_APIKEY_PUBLIC, _MAILJET_SECRET), version=version)
 
 
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    session.auth = (_MAILJET_APIKEY_PUBLIC, _MAILJET_SECRET)
+    session.headers['Content-Type'] = 'application/json'
+    adapter = adapters.HTTPAdapter(pool_connections=1, pool_maxsize=10)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# A session to reuse HTTP connections when sending batches of messages.
+_SESSION = _create_session()
+
+
 def _make_mailjet_user(user: Union[str, '_Recipient']) -> '_MailjetUser':
     if isinstance(user, str):
         match = _NAME_AND_MAIL_REGEXP.match(user)
@@ -218,12 +245,27 @@ def send_template(
         https://dev.mailjet.com/guides/?python#sending-a-basic-email
     """
 
+    all_recipients = [recipient] + list(other_recipients or [])
+    message = _create_template_message(
+        campaign_id, all_recipients, template_vars, sender_email=sender_email,
+        sender_name=sender_name, template_id=template_id, options=options)
+    data: _MailjetSendDataJson = {'Messages': [message]}
+    if dry_run or not message['To']:
+        logging.info(data)
+        return _FakeResponse(all_recipients)
+    mail_client = _mailjet_client(version='v3.1')
+    # TODO(cyrille): Drop the cast if mailjet_rest ever gets typed.
+    return typing.cast(models.Response, mail_client.send.create(data=data))
+
+
+def _create_template_message(
+        campaign_id: mailjet_templates.Id, all_recipients: Sequence['_Recipient'],
+        template_vars: Mapping[str, Any], *,
+        sender_email: str, sender_name: str, template_id: Optional[int] = None,
+        options: Optional['_MailjetSendMessageJson'] = None) -> '_MailjetSendMessageJson':
     _check_not_null_variable(template_vars)
     if 'senderName' not in template_vars:
         template_vars = template_vars | {'senderName': sender_name}
-    mail_client = _mailjet_client(version='v3.1')
-    # TODO(cyrille): Batch messages when sending several.
-    all_recipients = [recipient] + list(other_recipients or [])
     recipients = [
         _make_mailjet_user(r)
         for r in all_recipients
@@ -234,26 +276,157 @@ def send_template(
         sender_email = _NO_REPLY_EMAIL
 
     # TODO(cyrille): Update locale depending on other recipients.
-    template_id = template_id or _get_mailjet_id(campaign_id, recipient.locale)
-    data: _MailjetSendDataJson = {
-        'Messages': [{
-            'TemplateID': template_id,
-            'TemplateLanguage': True,
-            'TemplateErrorReporting': {'Email': _ADMIN_EMAIL},
-            'From': {'Email': sender_email, 'Name': sender_name},
-            'Variables': template_vars,
-            'To': recipients,
-        }],
+    template_id = template_id or _get_mailjet_id(campaign_id, all_recipients[0].locale)
+    message: _MailjetSendMessageJson = {
+        'TemplateID': template_id,
+        'TemplateLanguage': True,
+        'TemplateErrorReporting': {'Email': _ADMIN_EMAIL},
+        'From': {'Email': sender_email, 'Name': sender_name},
+        'Variables': template_vars,
+        'To': recipients,
     }
     if options:
-        data['Messages'][0].update(options)
+        message.update(options)
     if campaign_id:
-        data['Messages'][0]['CustomCampaign'] = campaign_id
-    if dry_run or not recipients:
-        logging.info(data)
-        return _FakeResponse(all_recipients)
-    # TODO(cyrille): Drop the cast if mailjet_rest ever gets typed.
-    return typing.cast(models.Response, mail_client.send.create(data=data))
+        message['CustomCampaign'] = campaign_id
+    return message
+
+
+class TemplateMessage(typing.NamedTuple):
+    """A message to send with a template, see send_templates."""
+
+    campaign_id: mailjet_templates.Id
+    recipient: '_Recipient'
+    template_vars: Mapping[str, Any]
+    sender_email: str = _MAIL_SENDER_EMAIL
+    sender_name: str = _MAIL_SENDER_NAME
+
+
+class _MessageResult:
+    """The result of a single message in a batch, as if it had been sent alone."""
+
+    def __init__(self, status_code: int, message_json: Mapping[str, Any]) -> None:
+        self.status_code = status_code
+        self._message_json = message_json
+        self.text = json.dumps(message_json)
+
+    def json(self) -> dict[str, Any]:  # pylint: disable=invalid-name
+        """Get JSON encoded data from the body."""
+
+        return {'Messages': [self._message_json]}
+
+    def raise_for_status(self) -> None:
+        """Raises an exception if status_code is that of an error."""
+
+        if self.status_code >= 400:
+            raise exceptions.HTTPError(f'{self.status_code:d} Error in Mailjet:\n{self.text}')
+
+
+def _is_retryable(status_code: int) -> bool:
+    return status_code >= 500 or status_code == 429
+
+
+def _post_messages(messages: Sequence['_MailjetSendMessageJson']) -> list[_MessageResult]:
+    """Send messages in a single call to the Mailjet send API.
+
+    Returns:
+        a result for each message, in the same order.
+    """
+
+    try:
+        response = _SESSION.post(
+            f'{_MAILJET_API_URL}v3.1/send', data=json.dumps({'Messages': messages}),
+            timeout=_SEND_TIMEOUT)
+    except exceptions.RequestException as error:
+        logging.warning('Error while sending messages to Mailjet: %s', error)
+        return [_MessageResult(503, {'Status': 'error'})] * len(messages)
+
+    if _is_retryable(response.status_code):
+        return [_MessageResult(response.status_code, {'Status': 'error'})] * len(messages)
+    try:
+        message_results = response.json()['Messages']
+    except (ValueError, KeyError):
+        message_results = None
+    if not isinstance(message_results, list) or len(message_results) != len(messages):
+        logging.error(
+            'Unexpected response from Mailjet (%d):\n%s', response.status_code, response.text)
+        status_code = response.status_code if response.status_code >= 400 else 500
+        return [_MessageResult(status_code, {'Status': 'error'})] * len(messages)
+
+    results = []
+    for message_result in message_results:
+        if message_result.get('Status', '').lower() == 'success':
+            results.append(_MessageResult(200, message_result))
+            continue
+        status_code = max(
+            (error.get('StatusCode', 400) for error in message_result.get('Errors', [])),
+            default=400)
+        results.append(_MessageResult(status_code, message_result))
+    return results
+
+
+def send_templates(
+        messages: Iterable[TemplateMessage], *, dry_run: bool = False, max_retries: int = 2) \
+        -> list[Optional[email_pb2.EmailSent]]:
+    """Send many emails using templates, in batches.
+
+    Messages are grouped in calls to the Mailjet send API v3.1, reusing HTTP connections. Messages
+    that fail because of a temporary error (server error or rate limiting) are retried, without
+    sending again the other messages of their batch.
+
+    Args:
+        messages: the messages to send, one per recipient.
+        dry_run: if True, messages are only logged.
+        max_retries: the maximum number of times a failing message is sent again.
+    Returns:
+        for each message, in the same order, the EmailSent proto as created by
+        create_email_sent_proto, or None if the message could not be sent.
+    """
+
+    all_messages = list(messages)
+    results: list[Optional[email_pb2.EmailSent]] = [None] * len(all_messages)
+    pending: list[tuple[int, _MailjetSendMessageJson]] = []
+    for index, message in enumerate(all_messages):
+        try:
+            mailjet_message = _create_template_message(
+                message.campaign_id, [message.recipient], message.template_vars,
+                sender_email=message.sender_email, sender_name=message.sender_name)
+        except ValueError as error:
+            logging.error(
+                'Invalid message for campaign "%s": %s', message.campaign_id, error)
+            continue
+        if dry_run or not mailjet_message['To']:
+            logging.info({'Messages': [mailjet_message]})
+            results[index] = create_email_sent_proto(_FakeResponse([message.recipient]))
+            continue
+        pending.append((index, mailjet_message))
+
+    for num_try in range(max_retries + 1):
+        if not pending:
+            break
+        if num_try:
+            time.sleep(_RETRY_DELAY_SECONDS * 2 ** (num_try - 1))
+        failed: list[tuple[int, _MailjetSendMessageJson]] = []
+        for batch_start in range(0, len(pending), _MAX_MESSAGES_PER_SEND):
+            batch = pending[batch_start:batch_start + _MAX_MESSAGES_PER_SEND]
+            batch_results = _post_messages([
+                mailjet_message for unused_index, mailjet_message in batch])
+            for (index, mailjet_message), result in zip(batch, batch_results):
+                if result.status_code < 400:
+                    results[index] = create_email_sent_proto(result)
+                elif _is_retryable(result.status_code):
+                    failed.append((index, mailjet_message))
+                else:
+                    logging.error(
+                        'Could not send the message for campaign "%s" (%d):\n%s',
+                        mailjet_message.get('CustomCampaign'), result.status_code, result.text)
+        pending = failed
+
+    for index, mailjet_message in pending:
+        logging.error(
+            'Could not send the message for campaign "%s" after %d tries.',
+            mailjet_message.get('CustomCampaign'), max_retries + 1)
+    return results
 
 
 def get_message(message_id: int) -> Optional[dict[str, Any]]:
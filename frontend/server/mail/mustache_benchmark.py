@@ -0,0 +1,103 @@
+"""Benchmark the rendering of all the Mailjet templates with mustache.
+
+Each HTML template in mail/templates is rendered for many synthetic users, built from the example
+vars of the template. The rendering is timed with compiled templates (the template is parsed once
+and cached) and without (the template is parsed for each user).
+
+To use it:
+    docker-compose run --rm frontend-flask \
+        python bob_emploi/frontend/server/mail/mustache_benchmark.py --num_users 10000
+"""
+
+import argparse
+import json
+import os
+from os import path
+import time
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+from bob_emploi.common.python import mustache
+
+_TEMPLATES_PATH = path.join(path.dirname(__file__), 'templates')
+
+
+def _load_templates() -> list[tuple[str, str, dict[str, Any]]]:
+    """Load all the HTML templates with their example vars."""
+
+    templates = []
+    for name in sorted(os.listdir(_TEMPLATES_PATH)):
+        folder = path.join(_TEMPLATES_PATH, name)
+        html_path = path.join(folder, 'template.html')
+        if not path.exists(html_path):
+            continue
+        with open(html_path, 'rt', encoding='utf-8') as html_file:
+            html_template = html_file.read()
+        with open(path.join(folder, 'vars-example.json'), 'rt', encoding='utf-8') as vars_file:
+            template_vars = json.load(vars_file)
+        with open(path.join(folder, 'headers.json'), 'rt', encoding='utf-8') as headers_file:
+            template_vars = {'senderName': json.load(headers_file)['SenderName']} | template_vars
+        templates.append((name, html_template, template_vars))
+    return templates
+
+
+def _make_user_vars(example_vars: Mapping[str, Any], index: int) -> dict[str, Any]:
+    """Create the vars of a synthetic user from the example vars of a template."""
+
+    user_vars = dict(example_vars)
+    if 'firstName' in user_vars:
+        user_vars['firstName'] = f'Utilisateur {index:d}'
+    if index % 2:
+        # Switch boolean flags to go through the other branches of the templates.
+        for key, value in user_vars.items():
+            if isinstance(value, bool):
+                user_vars[key] = not value
+    return user_vars
+
+
+def _time_rendering(
+        templates: Sequence[tuple[str, str, dict[str, Any]]], num_users: int,
+        instantiate: Callable[[str, Mapping[str, Any]], str]) -> float:
+    start = time.perf_counter()
+    for unused_name, html_template, example_vars in templates:
+        for index in range(num_users):
+            instantiate(html_template, _make_user_vars(example_vars, index))
+    return time.perf_counter() - start
+
+
+def _instantiate_without_cache(template: str, template_vars: Mapping[str, Any]) -> str:
+    return mustache.compile.__wrapped__(template).instantiate(template_vars)
+
+
+def main(string_args: Optional[Sequence[str]] = None) -> None:
+    """Time the rendering of all templates for many synthetic users."""
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark the rendering of the Mailjet templates.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        '--num_users', type=int, default=10000, help='Number of synthetic users per template.')
+    parser.add_argument(
+        '--skip_uncached', action='store_true',
+        help='Only time the rendering with compiled templates.')
+    args = parser.parse_args(string_args)
+
+    templates = _load_templates()
+    num_renderings = len(templates) * args.num_users
+    print(f'Rendering {len(templates):d} templates for {args.num_users:d} users.')
+
+    mustache.compile.cache_clear()
+    compiled_seconds = _time_rendering(templates, args.num_users, mustache.instantiate)
+    print(
+        f'Compiled templates: {compiled_seconds:.2f}s '
+        f'({compiled_seconds / num_renderings * 1e6:.0f}µs per email)')
+
+    if args.skip_uncached:
+        return
+    uncached_seconds = _time_rendering(templates, args.num_users, _instantiate_without_cache)
+    print(
+        f'Parsed for each user: {uncached_seconds:.2f}s '
+        f'({uncached_seconds / num_renderings * 1e6:.0f}µs per email)')
+
+
+if __name__ == '__main__':
+    main()
@@ -585,13 +585,13 @@ class BlastCampaignTest(unittest.TestCase):
                 for u in users
             })
 
-    @mock.patch('bob_emploi.frontend.server.mail.mail_send.send_template')
+    @mock.patch('bob_emploi.frontend.server.mail.mail_send.send_templates')
     @mock.patch('logging.warning')
     def test_error_while_sending(
-            self, mock_warning: mock.MagicMock, mock_send_template: mock.MagicMock) -> None:
+            self, mock_warning: mock.MagicMock, mock_send_templates: mock.MagicMock) -> None:
         """Error when sending an email get caught and logged as warning."""
 
-        mock_send_template().raise_for_status.side_effect = requests.exceptions.HTTPError
+        mock_send_templates.return_value = [None]
 
         mock_db = pymongo.MongoClient('mongodb://mydata.com/test').test
         mock_user_db = pymongo.MongoClient('mongodb://myprivatedata.com/user_test').user_test
@@ -624,7 +624,55 @@ class BlastCampaignTest(unittest.TestCase):
         self.assertEqual([], [e.get('campaignId') for e in user.get('emailsSent', [])])
 
         mock_warning.assert_called_once()
-        self.assertEqual('Error while sending an email: %s', mock_warning.call_args[0][0])
+        self.assertEqual('Error while sending an email to %s', mock_warning.call_args[0][0])
+
+    @mock.patch('logging.info', mock.MagicMock)
+    def test_send_in_batch(self) -> None:
+        """Emails are sent to Mailjet in batches."""
+
+        mock_db = pymongo.MongoClient('mongodb://mydata.com/test').test
+        mock_user_db = pymongo.MongoClient('mongodb://myprivatedata.com/user_test').user_test
+        mock_db.job_group_info.drop()
+        mock_db.job_group_info.insert_one({
+            '_id': 'A1234',
+            'inDomain': 'dans la vie',
+        })
+        mock_user_db.user.drop()
+        mock_user_db.user.insert_many([
+            {
+                'registeredAt': '2017-05-15T00:00:00Z',
+                'profile': {
+                    'name': f'User {index:d}',
+                    'email': f'user{index:d}@gmail.com',
+                },
+                'projects': [
+                    {'networkEstimate': 1, 'targetJob': {'jobGroup': {'romeId': 'A1234'}}},
+                ],
+            }
+            for index in range(3)
+        ])
+
+        with mock.patch.object(
+                mail_blast.mail_send, 'send_templates',
+                wraps=mail_blast.mail_send.send_templates) as mock_send_templates, \
+                mock.patch.object(mail_blast.mail_send, 'send_template') as mock_send_template:
+            mail_blast.main([
+                'focus-network', 'send',
+                '--registered-from', '2017-04-01',
+                '--registered-to', '2017-07-10',
+                '--disable-sentry'])
+
+        mock_send_templates.assert_called_once()
+        mock_send_template.assert_not_called()
+        self.assertEqual(
+            ['user0@gmail.com', 'user1@gmail.com', 'user2@gmail.com'],
+            sorted(m.recipient['Email'] for m in mailjetmock.get_all_sent_messages()))
+        self.assertEqual(
+            [['focus-network']] * 3,
+            [
+                [e.get('campaignId') for e in user.get('emailsSent', [])]
+                for user in mock_user_db.user.find({})
+            ])
 
     @mock.patch('bob_emploi.frontend.server.mail.mail_send.send_template')
     def test_error_while_sending_dry_run(self, mock_send_template: mock.MagicMock) -> None:
@@ -150,6 +150,30 @@ class MustacheTests(unittest.TestCase):
             'A string with {{ var:myVar }}', {'myVar': 'a mustache'}, use_strict_syntax=False)
         self.assertEqual('A string with a mustache', result)
 
+    def test_compile(self) -> None:
+        """A compiled template can be instantiated many times."""
+
+        template = mustache.compile(
+            'I am {%if var:firstname=="Bruce"%}almighty{%else%}{{var:firstname}}{%endif%}')
+        self.assertEqual('I am almighty', template.instantiate({'firstname': 'Bruce'}))
+        self.assertEqual('I am Groot', template.instantiate({'firstname': 'Groot'}))
+
+    def test_compile_cache(self) -> None:
+        """Templates are only parsed once."""
+
+        template = mustache.compile('A string with {{var:myVar}}')
+        self.assertIs(template, mustache.compile('A string with {{var:myVar}}'))
+        self.assertIsNot(
+            template, mustache.compile('A string with {{var:myVar}}', use_strict_syntax=True))
+
+    def test_compile_errors_at_instantiation(self) -> None:
+        """Errors in expressions are only raised when they are resolved."""
+
+        template = mustache.compile('{%if var:a%}{{Unknown(var:b)}}{%endif%}')
+        self.assertEqual('', template.instantiate({'a': False}))
+        with self.assertRaises(NotImplementedError):
+            template.instantiate({'a': True, 'b': 'c'})
+
 
 if __name__ == '__main__':
     unittest.main()
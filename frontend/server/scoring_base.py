@@ -519,7 +519,8 @@ class ScoringProject:
     def score(self, scoring_model_name: str, force_exists: bool = False) -> float:
         """Returns the score for a given scoring model.
 
-        This assumes the score can never change after it's been first computed.
+        This assumes the score does not change after it's been first computed, unless the scores
+        are cleared with clear_scores.
         """
 
         if scoring_model_name in self._scores:
@@ -542,6 +543,11 @@ class ScoringProject:
         self._scores[scoring_model_name] = score
         return score
 
+    def clear_scores(self) -> None:
+        """Forget the computed scores, e.g. when the project's diagnostic changed."""
+
+        self._scores.clear()
+
     def check_filters(self, filters: Iterable[str], force_exists: bool = False) -> bool:
         """Whether the project satisfies all the given filters."""
 
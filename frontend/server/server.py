@@ -19,7 +19,6 @@ import uuid
 import flask
 from google.protobuf import json_format
 from google.protobuf import message
-import requests
 import sentry_sdk
 from sentry_sdk.integrations import flask as sentry_flask
 from sentry_sdk.integrations import logging as sentry_logging
@@ -35,6 +34,7 @@ from bob_emploi.frontend.server import auth
 from bob_emploi.frontend.server import cache
 from bob_emploi.frontend.server import diagnostic
 from bob_emploi.frontend.server import i18n
+from bob_emploi.frontend.server import image_proxy
 from bob_emploi.frontend.server import jobs
 from bob_emploi.frontend.server import mongo
 from bob_emploi.frontend.server import proto
@@ -484,12 +484,14 @@ def diagnose_advise_and_strategize(user_proto: user_pb2.User) -> user_pb2.User:
         flask.abort(422, i18n.flask_translate("Il n'y a pas de projet à conseiller."))
     database = mongo.get_connections_from_env().stats_db
     for project in user_proto.projects:
-        user_diagnostic = diagnostic.diagnose(user_proto, project, database)
-        project.diagnostic.CopyFrom(user_diagnostic)
+        # Share the scoring caches between the diagnostic, the advisor and the strategist.
         scoring_project = scoring.ScoringProject(project, user_proto, database, now=now.get())
+        user_diagnostic = diagnostic.diagnose(
+            user_proto, project, database, scoring_project=scoring_project)
+        project.diagnostic.CopyFrom(user_diagnostic)
         advices = advisor.compute_advices_for_project(scoring_project)
         project.advices.extend(advices.advices)
-        strategist.strategize(user_proto, project, database)
+        strategist.strategize(user_proto, project, database, scoring_project=scoring_project)
     return user_proto
 
 
@@ -1241,42 +1243,33 @@ def _maybe_redirect(**kwargs: Any) -> _FlaskResponse:
     return flask.redirect(f'{redirect_url}{separator}{query_string}')
 
 
+# Usage counters, materialized by the asynchronous/count_users.py job.
+_USAGE_STATS: proto.MongoCachedCollection[stats_pb2.UsersCount] = \
+    proto.MongoCachedCollection(stats_pb2.UsersCount, 'user_count')
+
+
 @app.route('/api/usage/stats', methods=['GET'])
 @proto_flask.api(out_type=stats_pb2.UsersCount)
 def get_usage_stats() -> stats_pb2.UsersCount:
-    """Get stats of the app usage."""
+    """Get stats of the app usage.
 
-    now_utc = now.get().astimezone(datetime.timezone.utc)
-    start_of_second = now_utc.replace(microsecond=0, tzinfo=None)
-    last_week = start_of_second - datetime.timedelta(days=7)
-    user_db = mongo.get_connections_from_env().user_db
+    The stats are the ones computed during the last run of the count_users job, the time of that
+    run is given in the aggregated_at field.
+    """
 
-    # Compute weekly user count.
-    weekly_new_user_count = user_db.user.count_documents({
-        'registeredAt': {
-            '$gt': proto.datetime_to_json_string(last_week),
-            '$lte': proto.datetime_to_json_string(start_of_second),
-        },
-        'featuresEnabled.excludeFromAnalytics': {'$ne': True},
-    })
-
-    users_by_categories = list(user_db.user.aggregate([
-        {'$unwind': '$projects'},
-        {'$match': {'featuresEnabled.excludeFromAnalytics': {'$ne': True}}},
-        {'$group': {'_id': '$projects.diagnostic.categoryId', 'count': {'$sum': 1}}},
-    ]))
-
-    main_challenge_counts = {
-        category.get('_id'): category.get('count') for category in
-        users_by_categories if category.get('_id')}
-
-    return stats_pb2.UsersCount(
-        main_challenge_counts=main_challenge_counts,
-        total_user_count=user_db.user.count_documents({
-            'featuresEnabled.excludeFromAnalytics': {'$ne': True},
-        }),
-        weekly_new_user_count=weekly_new_user_count,
+    database = mongo.get_connections_from_env().stats_db
+    user_counts = _USAGE_STATS.get_collection(database).get('')
+    if not user_counts:
+        logging.warning('Usage stats have not been aggregated yet.')
+        return stats_pb2.UsersCount()
+
+    usage_stats = stats_pb2.UsersCount(
+        main_challenge_counts=user_counts.main_challenge_counts,
+        total_user_count=user_counts.total_user_count,
+        weekly_new_user_count=user_counts.weekly_new_user_count,
     )
+    usage_stats.aggregated_at.CopyFrom(user_counts.aggregated_at)
+    return usage_stats
 
 
 @app.route('/api/redirect/eterritoire/<city_id>', methods=['GET'])
@@ -1343,12 +1336,7 @@ def _proxy_http_image() -> flask.Response:
     url = parse.urlparse(src)
     if url.scheme != 'http' or url.query:
         flask.abort(401)
-    response = requests.get(src)
-    response.raise_for_status()
-    headers: dict[str, str] = {}
-    if content_type := response.headers.get('Content-Type'):
-        headers['Content-Type'] = content_type
-    return flask.Response(response=response.content, headers=headers)
+    return image_proxy.proxy(src, now.get())
 
 
 @app.route('/api/user/<user_id>/project/<project_id>/send-action-plan', methods=('POST',))
@@ -80,22 +80,27 @@ class _RequirableModule(typing.NamedTuple):
 
 
 def maybe_strategize(
-        user: user_pb2.User, project: project_pb2.Project, database: mongo.NoPiiMongoDatabase) \
-        -> bool:
+        user: user_pb2.User, project: project_pb2.Project, database: mongo.NoPiiMongoDatabase,
+        *, scoring_project: Optional[scoring.ScoringProject] = None) -> bool:
     """Check if a project needs strategies and populate the strategies if so."""
 
     if project.is_incomplete or project.strategies:
         return False
-    strategize(user, project, database)
+    strategize(user, project, database, scoring_project=scoring_project)
     return True
 
 
 def strategize(
-        user: user_pb2.User, project: project_pb2.Project, database: mongo.NoPiiMongoDatabase) \
-        -> None:
-    """Make strategies for the user."""
+        user: user_pb2.User, project: project_pb2.Project, database: mongo.NoPiiMongoDatabase,
+        *, scoring_project: Optional[scoring.ScoringProject] = None) -> None:
+    """Make strategies for the user.
 
-    scoring_project = scoring.ScoringProject(project, user, database)
+    The scoring project for this user and project can be given if it already exists,
+    so that its scores and DB caches are shared with the other steps.
+    """
+
+    if scoring_project is None:
+        scoring_project = scoring.ScoringProject(project, user, database)
     advice_scores = {a.advice_id: a.num_stars for a in project.advices}
     category_modules = _get_strategy_modules_by_category(database).get(
         project.diagnostic.category_id, [])
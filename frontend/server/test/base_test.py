@@ -15,6 +15,7 @@ import requests_mock
 import werkzeug
 
 from bob_emploi.frontend.server import cache
+from bob_emploi.frontend.server import scoring
 from bob_emploi.frontend.server import server
 
 
@@ -52,6 +53,18 @@ def base64_encode(content: Union[str, bytes]) -> str:
     return base64_encoded.rstrip('=')
 
 
+class CountingModel(scoring.ModelBase):
+    """A scoring model that counts how many times it gets called."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.num_calls = 0
+
+    def score(self, unused_project: scoring.ScoringProject) -> float:
+        self.num_calls += 1
+        return 3
+
+
 def _deep_merge_dict(source: Mapping[str, Any], destination: dict[str, Any]) -> None:
     for key, value in source.items():
         if isinstance(value, dict):
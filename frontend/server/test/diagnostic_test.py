@@ -26,6 +26,13 @@ class NeverEnoughDataScoringModel(scoring.ModelBase):
         raise scoring.NotEnoughDataException(fields={'projects.0'})
 
 
+class _MainChallengeScoringModel(scoring.ModelBase):
+    """A scoring model that depends on the main challenge of the diagnostic."""
+
+    def score(self, project: scoring.ScoringProject) -> float:
+        return 3 if project.details.diagnostic.category_id == 'women' else 0
+
+
 class MaybeDiagnoseTestCase(unittest.TestCase):
     """Unit tests for the maybe_diagnose function."""
 
@@ -78,6 +85,19 @@ class MaybeDiagnoseTestCase(unittest.TestCase):
         self.assertTrue(diagnostic.maybe_diagnose(self.user, project, self.database))
         self.assertFalse(project.diagnostic.overall_sentence)
 
+    @mock.patch.dict(scoring.SCORING_MODELS, {'test-main-challenge': _MainChallengeScoringModel()})
+    def test_clear_scores_of_shared_scoring_project(self) -> None:
+        """Scores computed before the main challenge is set are not reused after."""
+
+        project = project_pb2.Project()
+        scoring_project = scoring.ScoringProject(project, self.user, self.database)
+        self.assertEqual(0, scoring_project.score('test-main-challenge'))
+
+        diagnostic.diagnose(self.user, project, self.database, scoring_project=scoring_project)
+
+        self.assertEqual('women', project.diagnostic.category_id)
+        self.assertEqual(3, scoring_project.score('test-main-challenge'))
+
     @mock.patch('logging.exception')
     def test_diagnostic(self, mock_logging: mock.MagicMock) -> None:
         """Compute a nice diagnostic with overall sentence."""
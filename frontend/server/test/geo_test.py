@@ -118,62 +118,96 @@ class DepartementCase(unittest.TestCase):
 
 
 class GetCityTest(unittest.TestCase):
-    """Unit tests for the get_city_proto function."""
+    """Unit tests for the get_city_proto and get_city_location functions."""
 
     def setUp(self) -> None:
         super().setUp()
-        patcher = mock.patch(geo.__name__ + '.search_client')
-        self.cities_index = patcher.start().SearchClient.create().init_index()
-        self.addCleanup(patcher.stop)
-
-        geo._get_algolia_index.cache_clear()  # pylint: disable=protected-access
+        geo.cache.clear()
+        self._db = mongo.NoPiiMongoDatabase(mongomock.MongoClient().test)
+        self._db.cities.insert_many([
+            {
+                '_id': '69386',
+                'name': 'Lyon 6e arrondissement',
+                'departementId': '69',
+                'departementName': 'Rhône',
+                'departementPrefix': 'dans le ',
+                'regionId': '84',
+                'regionName': 'Auvergne-Rhône-Alpes',
+                'regionPrefix': 'en ',
+                'postcodes': '69006',
+                'latitude': 45.7667,
+                'longitude': 4.85,
+                'population': 49000,
+                'urbanScore': 7,
+                'publicTransportationScore': 6,
+                'urbanContext': geo_pb2.URBAN,
+            },
+            {
+                '_id': '69383',
+                'latitude': 45.75,
+                'longitude': 4.85,
+            },
+        ])
 
     def test_no_city_id(self) -> None:
         """No city_id."""
 
-        self.assertFalse(geo.get_city_proto(''))
+        self.assertFalse(geo.get_city_proto(self._db, ''))
 
     def test_unknown_city(self) -> None:
         """Unknown city."""
 
-        self.cities_index.get_object.return_value = None
-        self.assertFalse(geo.get_city_proto('69386'))
-
-        self.cities_index.get_object.assert_called_once_with('69386')
+        self.assertFalse(geo.get_city_proto(self._db, '31555'))
+        self.assertFalse(geo.get_city_location(self._db, '31555'))
 
     def test_get_city_proto(self) -> None:
-        """Get a city proto from Algolia."""
-
-        self.cities_index.get_object.return_value = {
-            'name': 'Lyon 6e arrondissement',
-            'departementId': '69',
-            'transport': 6,
-            'urban': 0,
-            'zipCode': '69006',
-            'otherField': 'yipe',
-        }
+        """Get a city proto from the index."""
 
-        city = geo.get_city_proto('69386')
+        city = geo.get_city_proto(self._db, '69386')
 
         assert city
 
+        self.assertEqual('69386', city.city_id)
         self.assertEqual('Lyon 6e arrondissement', city.name)
         self.assertEqual('69', city.departement_id)
-        self.assertEqual(-1, city.urban_score)
+        self.assertEqual('Rhône', city.departement_name)
+        self.assertEqual('dans le ', city.departement_prefix)
+        self.assertEqual('Auvergne-Rhône-Alpes', city.region_name)
+        self.assertEqual('en ', city.region_prefix)
+        self.assertEqual(7, city.urban_score)
         self.assertEqual(6, city.public_transportation_score)
         self.assertEqual('69006', city.postcodes)
-        self.cities_index.get_object.assert_called_once_with('69386')
+        self.assertEqual(49000, city.population)
+        self.assertAlmostEqual(45.7667, city.latitude, places=4)
+        self.assertEqual(geo_pb2.URBAN, city.urban_context)
+
+    def test_get_city_location(self) -> None:
+        """Get the location of a city with only coordinates."""
+
+        city = geo.get_city_location(self._db, '69383')
+
+        assert city
+
+        self.assertEqual('69383', city.city_id)
+        self.assertAlmostEqual(45.75, city.latitude, places=4)
+        self.assertAlmostEqual(4.85, city.longitude, places=4)
+        self.assertFalse(city.name)
+
+    def test_get_city_proto_location_only(self) -> None:
+        """A city with only coordinates is not a full city."""
+
+        self.assertIsNone(geo.get_city_proto(self._db, '69383'))
+
+    def test_loaded_once(self) -> None:
+        """The cities are loaded only once from the database."""
 
-    @mock.patch('logging.warning')
-    def test_format_error(self, mock_logging: mock.MagicMock) -> None:
-        """The data returned by Algolia is not compatible."""
+        geo.get_city_location(self._db, '69383')
+        self._db.cities.delete_many({})
 
-        self.cities_index.get_object.return_value = {
-            'population': 'not a number',
-        }
+        self.assertTrue(geo.get_city_proto(self._db, '69386'))
 
-        self.assertFalse(geo.get_city_proto('69386'))
-        mock_logging.assert_called_once()
+        geo.cache.clear()
+        self.assertFalse(geo.get_city_proto(self._db, '69386'))
 
 
 if __name__ == '__main__':
@@ -94,6 +94,41 @@ class TranslateStringTestCase(unittest.TestCase):
             i18n.translate_string('my text', 'fr', self._db),
         )
 
+    def test_missing_translation_use_cache(self) -> None:
+        """Make sure that missing translations are cached as well."""
+
+        with self.assertRaises(i18n.TranslationMissingException):
+            i18n.translate_string('my text', 'fr', self._db)
+
+        self._db.translations.insert_one({
+            'string': 'my text',
+            'fr': 'mon texte',
+        })
+        with self.assertRaises(i18n.TranslationMissingException):
+            i18n.translate_string('my text', 'fr', self._db)
+
+        i18n.cache.clear()
+        self.assertEqual('mon texte', i18n.translate_string('my text', 'fr', self._db))
+
+    def test_locale_fallback_before_strings(self) -> None:
+        """All the strings are tried in a locale before falling back to a simpler locale."""
+
+        self._db.translations.insert_many([
+            {
+                'string': 'my text_FEMININE',
+                'fr': 'ma texte',
+            },
+            {
+                'string': 'my text',
+                'fr': 'mon texte',
+                'fr@tu': 'ton texte',
+            },
+        ])
+        self.assertEqual(
+            'ton texte', i18n.translate_string(['my text_FEMININE', 'my text'], 'fr@tu', self._db))
+        self.assertEqual(
+            'ma texte', i18n.translate_string(['my text_FEMININE', 'my text'], 'fr', self._db))
+
 
 _FAKE_TRANSLATIONS_FILE = os.path.join(os.path.dirname(__file__), 'testdata/translations.json')
 
@@ -2,11 +2,13 @@
 
 import datetime
 import typing
+from typing import Any
 import unittest
 from unittest import mock
 
 import mailjet_rest
 import requests
+import requests_mock
 
 from bob_emploi.common.python.test import nowmock
 from bob_emploi.frontend.server.mail import mail_send
@@ -170,6 +172,70 @@ class MailTest(unittest.TestCase):
             {p.sent_at.ToDatetime() for p in protos},
             msg=protos)
 
+    @mock.patch(mail_send.__name__ + '._MAX_MESSAGES_PER_SEND', 2)
+    def test_send_templates(self) -> None:
+        """Send many templates in batches."""
+
+        with mock.patch.object(
+                mail_send._SESSION, 'post',  # pylint: disable=protected-access
+                wraps=mail_send._SESSION.post) as mock_post:  # pylint: disable=protected-access
+            results = mail_send.send_templates([
+                mail_send.TemplateMessage(
+                    'imt', _Recipient(f'{index:d}@me.com', 'Primary', 'Recipient', ''),
+                    {'custom': f'var{index:d}'})
+                for index in range(5)
+            ] + [
+                mail_send.TemplateMessage(
+                    'imt', _Recipient('pascal@example.com', 'Primary', 'Recipient', ''), {}),
+            ])
+
+        self.assertEqual(3, mock_post.call_count)
+        sent_emails = mailjetmock.get_all_sent_messages()
+        self.assertEqual(
+            [f'{index:d}@me.com' for index in range(5)],
+            [m.recipient['Email'] for m in sent_emails])
+        self.assertEqual(
+            [f'var{index:d}' for index in range(5)],
+            [m.properties['Variables']['custom'] for m in sent_emails])
+        self.assertEqual(6, len(results))
+        self.assertEqual(
+            [m.message_id for m in sent_emails],
+            [r.mailjet_message_id for r in results[:5] if r])
+        # Emails to example.com are not sent, as in send_template.
+        assert results[5]
+        self.assertFalse(results[5].mailjet_message_id)
+
+    @mock.patch(mail_send.__name__ + '._RETRY_DELAY_SECONDS', 0)
+    @mock.patch('logging.error')
+    def test_send_templates_retry_failed(self, mock_logging: mock.MagicMock) -> None:
+        """Only retry the messages that failed temporarily."""
+
+        sent_batches: list[list[str]] = []
+
+        def _send(request: 'requests_mock._RequestObjectProxy', unused_context: Any) \
+                -> dict[str, Any]:
+            emails = [message['To'][0]['Email'] for message in request.json()['Messages']]
+            sent_batches.append(emails)
+            return {'Messages': [
+                {'Status': 'success', 'To': [{'Email': email, 'MessageID': 10 + index}]}
+                if email == '1@me.com' or len(sent_batches) > 1 else
+                {'Status': 'error', 'Errors': [{'StatusCode': 500 if email == '2@me.com' else 400}]}
+                for index, email in enumerate(emails)
+            ]}
+
+        with requests_mock.Mocker() as mock_requests:
+            mock_requests.post('https://api.mailjet.com/v3.1/send', status_code=400, json=_send)
+            results = mail_send.send_templates([
+                mail_send.TemplateMessage(
+                    'imt', _Recipient(f'{index:d}@me.com', 'Primary', 'Recipient', ''), {})
+                for index in range(1, 4)
+            ])
+
+        self.assertEqual([['1@me.com', '2@me.com', '3@me.com'], ['2@me.com']], sent_batches)
+        self.assertEqual(
+            [10, 10, None], [result.mailjet_message_id if result else None for result in results])
+        mock_logging.assert_called_once()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -11,9 +11,11 @@ import time
 import typing
 from typing import Any, Callable, Iterator, Optional, Tuple, Type, Union
 from unittest import mock
+from urllib import parse
 import uuid
 
 import requests
+from requests import adapters
 
 
 _JsonDict = dict[str, Any]
@@ -288,6 +290,26 @@ def get_mailjet_campaign_id(custom_campaign: str) -> Optional[int]:
     return first_message.message_id + 10000
 
 
+_MAILJET_API_URL = 'https://api.mailjet.com/'
+_ORIGINAL_ADAPTER_SEND = adapters.HTTPAdapter.send
+
+
+def _send_http_request(
+        adapter: adapters.HTTPAdapter, request: requests.PreparedRequest, **kwargs: Any) \
+        -> requests.Response:
+    """Serve HTTP requests to the Mailjet API from the mock, for clients not using mailjet_rest."""
+
+    if not request.url or not request.url.startswith(_MAILJET_API_URL):
+        return _ORIGINAL_ADAPTER_SEND(adapter, request, **kwargs)
+    version, endpoint = parse.urlparse(request.url).path.strip('/').split('/', 1)
+    if endpoint != 'send' or request.method != 'POST':
+        raise NotImplementedError(f'mailjetmock not ready for {request.method} "{request.url}"')
+    response = _Sender(version).create(json.loads(request.body or '{}'))
+    response.request = request
+    response.url = request.url
+    return response
+
+
 _T = typing.TypeVar('_T')
 
 
@@ -295,6 +317,7 @@ class _Patch:
 
     def __init__(self) -> None:
         self._patcher = mock.patch('mailjet_rest.Client', _Client)
+        self._http_patcher = mock.patch.object(adapters.HTTPAdapter, 'send', _send_http_request)
 
     def __call__(self, func: Union[Type[Any], Callable[..., Any]]) -> Any:
         if isinstance(func, type):
@@ -327,11 +350,13 @@ class _Patch:
         """Activate a patch, returning any created mock."""
 
         _MOCK_SERVER.clear()
+        self._http_patcher.start()
         return self._patcher.start()
 
     def stop(self) -> Any:  # pylint: disable=invalid-name
         """Stop an active patch."""
 
+        self._http_patcher.stop()
         return self._patcher.stop()
 
 
@@ -0,0 +1,337 @@
+"""Benchmark all the scoring models, and check that they stay within their latency budgets.
+
+Every registered scoring model, as well as the models generated by a regexp that are referenced in
+the fixture collections (e.g. "for-departement(69)" in the filters of associations), is used to
+score a corpus of synthetic projects (the personas of the scoring tests) on a mongomock database
+loaded with the fixture collections. For each model, the p50 and p99 of the time spent in
+score_and_explain are reported, as well as the mean number of calls to the database. The script
+fails if any model goes over its budget.
+
+Caches are warmed up by a first round of scoring which is not measured, so that the results are
+close to what a server with warm caches would experience. Models that raise an error (other than
+not having enough data) are reported and make the script fail as well.
+
+To use it before deploying changes in scoring models:
+    docker-compose run --rm frontend-flask-test \
+        python bob_emploi/frontend/server/test/scoring_benchmark.py --num_rounds 10
+"""
+
+import argparse
+import collections
+import datetime
+import logging
+import math
+import os
+from os import path
+import re
+import sys
+import time
+import typing
+from typing import Any, Callable, Iterator, Optional, TextIO
+from unittest import mock
+
+import mongomock
+from mongomock import collection as mongomock_collection
+import pyjson5
+
+from bob_emploi.frontend.api import training_pb2
+from bob_emploi.frontend.api import user_pb2
+from bob_emploi.frontend.server import cache
+from bob_emploi.frontend.server import carif
+from bob_emploi.frontend.server import companies
+from bob_emploi.frontend.server import mongo
+from bob_emploi.frontend.server import proto
+from bob_emploi.frontend.server import scoring
+
+_TESTDATA_FOLDER = path.join(path.dirname(__file__), 'testdata')
+
+# Methods of a collection that make a call to the database.
+_DB_CALL_METHODS = (
+    'aggregate', 'count_documents', 'distinct', 'estimated_document_count', 'find', 'find_one')
+
+# Regexp to find scoring model IDs with parameters in the fixture collections.
+_MODEL_ID_REGEXP = re.compile(r'^[a-z0-9-]+\(.*\)$')
+# Fixed date so that scoring models based on time are deterministic, as in scoring tests.
+_NOW = datetime.datetime(2016, 9, 27)
+
+
+class Budget(typing.NamedTuple):
+    """The maximum resources a scoring model may use to score a project."""
+
+    # Maximum 99th percentile of the time to score a project, in seconds.
+    p99_seconds: float
+    # Maximum mean number of calls to the database to score a project, with warm caches.
+    db_calls: float
+
+
+DEFAULT_BUDGET = Budget(p99_seconds=.05, db_calls=2)
+
+# Budgets for models that are known to be more expensive than the others. Only add a model here
+# when its cost is worth it.
+BUDGETS: dict[str, Budget] = {}
+
+
+class ModelStats(typing.NamedTuple):
+    """The resources used by a scoring model on the corpus."""
+
+    model_name: str
+    num_scores: int
+    # Number of projects for which the model did not have enough data.
+    num_not_enough_data: int
+    # Number of projects for which the model raised an unexpected error.
+    num_errors: int
+    p50_seconds: float
+    p99_seconds: float
+    mean_db_calls: float
+
+    def get_budget(self) -> Budget:
+        """Get the budget of this model."""
+
+        return BUDGETS.get(self.model_name, DEFAULT_BUDGET)
+
+    def is_over_budget(self) -> bool:
+        """Whether this model uses more resources than its budget."""
+
+        budget = self.get_budget()
+        return self.p99_seconds > budget.p99_seconds or self.mean_db_calls > budget.db_calls
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    """Compute a percentile using the nearest-rank method."""
+
+    if not sorted_values:
+        return 0
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank - 1, 0)]
+
+
+class _DbCallCounter:
+    """Count the calls to any mongomock collection."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        # Mongomock implements some methods with others (e.g. find_one calls find): only count the
+        # outermost call.
+        self._depth = 0
+        self._patchers = [
+            mock.patch.object(
+                mongomock_collection.Collection, method_name,
+                self._wrap(getattr(mongomock_collection.Collection, method_name)))
+            for method_name in _DB_CALL_METHODS
+        ]
+
+    def _wrap(self, method: Callable[..., Any]) -> Callable[..., Any]:
+        def _counted(*args: Any, **kwargs: Any) -> Any:
+            if not self._depth:
+                self.count += 1
+            self._depth += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._depth -= 1
+        return _counted
+
+    def __enter__(self) -> '_DbCallCounter':
+        for patcher in self._patchers:
+            patcher.start()
+        return self
+
+    def __exit__(self, *unused_args: Any) -> None:
+        for patcher in reversed(self._patchers):
+            patcher.stop()
+
+
+def load_fixtures(
+        database: mongo.NoPiiMongoDatabase, folder: str = _TESTDATA_FOLDER) -> list[str]:
+    """Load all the JSON fixtures of a folder that are lists of records to the database.
+
+    Returns:
+        the names of the collections that were loaded.
+    """
+
+    collection_names = []
+    for filename in sorted(os.listdir(folder)):
+        collection_name, extension = path.splitext(filename)
+        if extension != '.json':
+            continue
+        with open(path.join(folder, filename), encoding='utf-8') as json_file:
+            json_blob = pyjson5.load(json_file)
+        if not isinstance(json_blob, list) or not json_blob:
+            continue
+        database[collection_name].insert_many(json_blob)
+        collection_names.append(collection_name)
+    return collection_names
+
+
+def load_personas(filename: str = path.join(_TESTDATA_FOLDER, 'personas.json5')) \
+        -> list[user_pb2.User]:
+    """Load the users of a set of personas."""
+
+    with open(filename, encoding='utf-8') as personas_file:
+        personas_json = pyjson5.load(personas_file)
+    users = []
+    for blob in personas_json.values():
+        user = user_pb2.User()
+        proto.parse_from_mongo(blob['user'], user.profile)
+        if 'featuresEnabled' in blob:
+            proto.parse_from_mongo(blob['featuresEnabled'], user.features_enabled)
+        if 'project' in blob:
+            proto.parse_from_mongo(blob['project'], user.projects.add())
+        for project in blob.get('projects', []):
+            proto.parse_from_mongo(project, user.projects.add())
+        if user.projects:
+            users.append(user)
+    return users
+
+
+def _iterate_strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for child in value.values():
+            yield from _iterate_strings(child)
+    elif isinstance(value, list):
+        for child in value:
+            yield from _iterate_strings(child)
+
+
+def list_models(
+        database: mongo.NoPiiMongoDatabase, collection_names: list[str]) -> list[str]:
+    """List the registered scoring models and the generated ones used in the collections."""
+
+    model_names = set(scoring.SCORING_MODELS)
+    for collection_name in collection_names:
+        for record in database[collection_name].find({}):
+            for string in _iterate_strings(record):
+                if string in model_names or not _MODEL_ID_REGEXP.match(string):
+                    continue
+                if scoring.get_scoring_model(string, cache_generated_model=False):
+                    model_names.add(string)
+    # The random model is only a default.
+    model_names.discard('')
+    return sorted(model_names)
+
+
+def _persona_lbb_companies(unused_project: Any, **unused_kwargs: Any) -> Iterator[dict[str, str]]:
+    return iter([{'headcount_text': '500 à 299 salariés'}])
+
+
+def benchmark(
+        model_names: list[str], users: list[user_pb2.User], database: mongo.NoPiiMongoDatabase,
+        *, num_rounds: int = 5) -> list[ModelStats]:
+    """Score all the users' projects with each model, and measure the resources used.
+
+    A first round of scoring warms up the caches and is not measured.
+    """
+
+    # Scoring models should not call external APIs during the benchmark.
+    with mock.patch(carif.__name__ + '.get_trainings') as mock_get_trainings, \
+            mock.patch(companies.__name__ + '.get_lbb_companies', new=_persona_lbb_companies), \
+            _DbCallCounter() as db_calls:
+        mock_get_trainings.return_value = [training_pb2.Training()] * 3
+        durations: dict[str, list[float]] = collections.defaultdict(list)
+        num_db_calls: collections.Counter[str] = collections.Counter()
+        num_not_enough_data: collections.Counter[str] = collections.Counter()
+        num_errors: collections.Counter[str] = collections.Counter()
+        for round_index in range(num_rounds + 1):
+            for model_name in model_names:
+                model = scoring.get_scoring_model(model_name, cache_generated_model=False)
+                if not model:
+                    raise KeyError(f'No scoring model with name "{model_name}".')
+                for user in users:
+                    # Use a new project for each model, so that the scores cached in the
+                    # project by other models are not reused.
+                    scoring_project = scoring.ScoringProject(
+                        user.projects[0], user, database, now=_NOW)
+                    db_calls.count = 0
+                    start = time.perf_counter()
+                    try:
+                        model.score_and_explain(scoring_project)
+                    except scoring.NotEnoughDataException:
+                        if round_index:
+                            num_not_enough_data[model_name] += 1
+                    except Exception:  # pylint: disable=broad-except
+                        # Failed scores are not measured, only counted.
+                        if round_index:
+                            num_errors[model_name] += 1
+                            if num_errors[model_name] == 1:
+                                logging.exception('Error while scoring with "%s".', model_name)
+                        continue
+                    duration = time.perf_counter() - start
+                    if not round_index:
+                        continue
+                    durations[model_name].append(duration)
+                    num_db_calls[model_name] += db_calls.count
+
+    stats = []
+    for model_name in model_names:
+        model_durations = sorted(durations[model_name])
+        num_scores = len(model_durations)
+        stats.append(ModelStats(
+            model_name=model_name,
+            num_scores=num_scores,
+            num_not_enough_data=num_not_enough_data[model_name],
+            num_errors=num_errors[model_name],
+            p50_seconds=_percentile(model_durations, 50),
+            p99_seconds=_percentile(model_durations, 99),
+            mean_db_calls=num_db_calls[model_name] / num_scores if num_scores else 0))
+    return stats
+
+
+def _print_stats(stats: list[ModelStats], out: TextIO) -> None:
+    out.write(
+        f'{"model":<60} {"p50 ms":>8} {"p99 ms":>8} {"budget":>8} {"db calls":>8} '
+        f'{"budget":>8} {"no data":>8} {"errors":>8}\n')
+    for model_stats in sorted(stats, key=lambda model_stats: -model_stats.p99_seconds):
+        budget = model_stats.get_budget()
+        warning = '  OVER BUDGET' if model_stats.is_over_budget() else ''
+        out.write(
+            f'{model_stats.model_name:<60} '
+            f'{model_stats.p50_seconds * 1000:>8.2f} {model_stats.p99_seconds * 1000:>8.2f} '
+            f'{budget.p99_seconds * 1000:>8.0f} '
+            f'{model_stats.mean_db_calls:>8.2f} {budget.db_calls:>8.0f} '
+            f'{model_stats.num_not_enough_data:>8d} {model_stats.num_errors:>8d}{warning}\n')
+
+
+def main(string_args: Optional[list[str]] = None, out: TextIO = sys.stdout) -> int:
+    """Benchmark the scoring models and return a non-zero code if some fail or are over budget."""
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark the scoring models on the personas of the tests.')
+    parser.add_argument(
+        '--num_rounds', type=int, default=5,
+        help='Number of times each persona is scored by each model.')
+    parser.add_argument(
+        '--models', nargs='*', help='Only benchmark those scoring models.')
+    parser.add_argument(
+        '--fixtures_folder', default=_TESTDATA_FOLDER,
+        help='Folder of the JSON fixtures to load in the database.')
+    parser.add_argument(
+        '--personas', default=path.join(_TESTDATA_FOLDER, 'personas.json5'),
+        help='Path to the JSON5 file of the personas to score.')
+    args = parser.parse_args(string_args)
+
+    cache.clear()
+    database = mongo.NoPiiMongoDatabase(mongomock.MongoClient().test)
+    collection_names = load_fixtures(database, args.fixtures_folder)
+    model_names = args.models or list_models(database, collection_names)
+    users = load_personas(args.personas)
+
+    stats = benchmark(model_names, users, database, num_rounds=args.num_rounds)
+    _print_stats(stats, out)
+
+    exit_code = 0
+    failing = [model_stats.model_name for model_stats in stats if model_stats.num_errors]
+    if failing:
+        out.write(f'\n{len(failing)} scoring models raised errors: {", ".join(failing)}\n')
+        exit_code = 1
+    over_budget = [model_stats.model_name for model_stats in stats if model_stats.is_over_budget()]
+    if over_budget:
+        out.write(
+            f'\n{len(over_budget)} scoring models are over budget: {", ".join(over_budget)}\n')
+        exit_code = 1
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
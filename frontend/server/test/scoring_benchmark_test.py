@@ -0,0 +1,140 @@
+"""Tests for the scoring benchmark script."""
+
+import io
+import json
+import logging
+from os import path
+import tempfile
+import unittest
+from unittest import mock
+
+import mongomock
+
+from bob_emploi.frontend.server import mongo
+from bob_emploi.frontend.server import scoring
+from bob_emploi.frontend.server.test import scoring_benchmark
+
+
+class _DbModel(scoring.ModelBase):
+    """A scoring model that reads from the database each time it scores a project."""
+
+    def score(self, project: scoring.ScoringProject) -> float:
+        return 3 if project.database.cities.find_one({}) else 0
+
+
+class _BrokenModel(scoring.ModelBase):
+    """A scoring model that always fails."""
+
+    def score(self, unused_project: scoring.ScoringProject) -> float:
+        raise ValueError('Broken model')
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    """Unit tests for the benchmark of scoring models."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        patcher = mock.patch.dict(scoring.SCORING_MODELS, {
+            '': scoring.SCORING_MODELS[''],
+            'constant(2)': scoring.ConstantScoreModel('2'),
+            'db-model': _DbModel(),
+            'broken-model': _BrokenModel(),
+        }, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_list_models(self) -> None:
+        """List registered models and generated models referenced in the fixtures."""
+
+        database = mongo.NoPiiMongoDatabase(mongomock.MongoClient().test)
+        with tempfile.TemporaryDirectory() as fixtures_folder:
+            with open(
+                    path.join(fixtures_folder, 'associations.json'), 'w',
+                    encoding='utf-8') as fixture_file:
+                json.dump([
+                    {'name': 'Lyon', 'filters': ['for-departement(69)', 'constant(2)']},
+                    {'name': 'Nowhere', 'filters': ['not-a-model(1)'], 'id': 'not-a-model'},
+                ], fixture_file)
+            with open(
+                    path.join(fixtures_folder, 'translations.json'), 'w',
+                    encoding='utf-8') as fixture_file:
+                json.dump({'for-job-group(M1101)': 'Not a list of records'}, fixture_file)
+            collection_names = scoring_benchmark.load_fixtures(database, fixtures_folder)
+
+        model_names = scoring_benchmark.list_models(database, collection_names)
+
+        self.assertEqual(['associations'], collection_names)
+        self.assertEqual(
+            ['broken-model', 'constant(2)', 'db-model', 'for-departement(69)'], model_names)
+        self.assertNotIn('for-departement(69)', scoring.SCORING_MODELS)
+
+    def test_benchmark(self) -> None:
+        """Measure the time and DB calls of each model."""
+
+        database = mongo.NoPiiMongoDatabase(mongomock.MongoClient().test)
+        database.cities.insert_one({'_id': '69123'})
+        users = scoring_benchmark.load_personas()
+
+        stats = {
+            model_stats.model_name: model_stats
+            for model_stats in scoring_benchmark.benchmark(
+                ['constant(2)', 'db-model'], users, database, num_rounds=2)}
+
+        self.assertEqual(2 * len(users), stats['db-model'].num_scores)
+        self.assertEqual(1, stats['db-model'].mean_db_calls)
+        self.assertEqual(0, stats['constant(2)'].mean_db_calls)
+        self.assertLessEqual(stats['db-model'].p50_seconds, stats['db-model'].p99_seconds)
+
+    def test_benchmark_errors(self) -> None:
+        """Count the errors of a model instead of aborting the benchmark."""
+
+        database = mongo.NoPiiMongoDatabase(mongomock.MongoClient().test)
+        users = scoring_benchmark.load_personas()
+
+        with self.assertLogs(level=logging.ERROR) as logged:
+            stats = {
+                model_stats.model_name: model_stats
+                for model_stats in scoring_benchmark.benchmark(
+                    ['broken-model', 'constant(2)'], users, database, num_rounds=2)}
+
+        self.assertEqual(1, len(logged.records))
+        self.assertIn('broken-model', logged.records[0].getMessage())
+        self.assertEqual(2 * len(users), stats['broken-model'].num_errors)
+        self.assertEqual(0, stats['broken-model'].num_scores)
+        self.assertEqual(0, stats['constant(2)'].num_errors)
+        self.assertEqual(2 * len(users), stats['constant(2)'].num_scores)
+
+    def test_main_errors(self) -> None:
+        """Fail when a model raises errors."""
+
+        out = io.StringIO()
+        with self.assertLogs(level=logging.ERROR):
+            self.assertEqual(1, scoring_benchmark.main(
+                ['--num_rounds', '1', '--models', 'constant(2)', 'broken-model'], out=out))
+
+        self.assertIn('broken-model', out.getvalue().splitlines()[-1])
+        self.assertNotIn('constant(2)', out.getvalue().splitlines()[-1])
+
+    def test_main_over_budget(self) -> None:
+        """Fail when a model goes over its budget."""
+
+        out = io.StringIO()
+        with mock.patch.dict(scoring_benchmark.BUDGETS, {
+                'db-model': scoring_benchmark.Budget(p99_seconds=1, db_calls=0)}):
+            self.assertEqual(1, scoring_benchmark.main(
+                ['--num_rounds', '1', '--models', 'constant(2)', 'db-model'], out=out))
+
+        self.assertIn('db-model', out.getvalue().splitlines()[-1])
+        self.assertNotIn('constant(2)', out.getvalue().splitlines()[-1])
+
+    def test_main(self) -> None:
+        """Succeed when all models are within their budget."""
+
+        out = io.StringIO()
+        self.assertEqual(0, scoring_benchmark.main(
+            ['--num_rounds', '1', '--models', 'constant(2)'], out=out))
+        self.assertIn('constant(2)', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
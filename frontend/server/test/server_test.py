@@ -3,6 +3,7 @@
 import datetime
 import json
 import os
+import tempfile
 import typing
 from typing import Any, Tuple
 import unittest
@@ -14,6 +15,7 @@ import requests_mock
 from bob_emploi.common.python import now
 from bob_emploi.common.python.test import nowmock
 from bob_emploi.frontend.server import proto
+from bob_emploi.frontend.server import scoring
 from bob_emploi.frontend.server import auth_token as token
 from bob_emploi.frontend.server.test import base_test
 from bob_emploi.frontend.server.test import mailjetmock
@@ -128,47 +130,34 @@ class OtherEndpointTestCase(base_test.ServerTestCase):
             content_type='application/json')
         self.assertEqual(204, response.status_code)
 
-    @nowmock.patch()
-    def test_usage_stats(self, mock_now: mock.MagicMock) -> None:
+    def test_usage_stats(self) -> None:
         """Testing /api/usage/stats endpoint."""
 
-        self._user_db.user.insert_many([
-            {'registeredAt': '2016-11-01T12:00:00Z'},
-            {'registeredAt': '2016-11-01T12:00:00Z'},
-            {'registeredAt': '2017-06-03T12:00:00Z'},
-            {'registeredAt': '2017-06-03T13:00:00Z'},
-            {
-                'registeredAt': '2017-06-04T12:00:00Z',
-                'featuresEnabled': {'excludeFromAnalytics': True},
-            },
-            {'registeredAt': '2017-06-10T11:00:00Z', 'projects': [{'feedback': {'score': 5}}]},
-            {'registeredAt': '2017-06-10T11:00:00Z', 'projects': [{'feedback': {'score': 2}}]},
-            {
-                'registeredAt': '2017-06-10T11:00:00Z',
-                'projects': [{'diagnostic': {'categoryId': 'this_cat'}, 'feedback': {'score': 2}}],
-                'featuresEnabled': {'excludeFromAnalytics': True},
-            },
-            {
-                'registeredAt': '2017-06-11T11:00:00Z',
-                'projects': [{'diagnostic': {'categoryId': 'this_cat'}}],
-            },
-            {
-                'registeredAt': '2017-06-11T11:00:00Z',
-                'projects': [{'diagnostic': {'categoryId': 'this_cat'}}],
-            },
-        ])
-        mock_now.return_value = datetime.datetime(
-            2017, 6, 10, 12, 30, tzinfo=datetime.timezone.utc)
+        self._db.user_count.insert_one({
+            '_id': '',
+            'aggregatedAt': '2017-06-10T02:00:00Z',
+            'departementCounts': {'31': 5},
+            'mainChallengeCounts': {'this_cat': 2},
+            'totalUserCount': 8,
+            'weeklyNewUserCount': 3,
+        })
 
         response = self.app.get('/api/usage/stats')
         self.assertEqual(
             {
+                'aggregatedAt': '2017-06-10T02:00:00Z',
                 'mainChallengeCounts': {'this_cat': 2},
                 'totalUserCount': 8,
                 'weeklyNewUserCount': 3,
             },
             self.json_from_response(response))
 
+    def test_usage_stats_not_aggregated(self) -> None:
+        """Testing /api/usage/stats endpoint before any aggregation."""
+
+        response = self.app.get('/api/usage/stats')
+        self.assertEqual({}, self.json_from_response(response))
+
     def test_redirect_eterritoire(self) -> None:
         """Check the /api/redirect/eterritoire endpoint."""
 
@@ -302,6 +291,37 @@ class OtherEndpointTestCase(base_test.ServerTestCase):
             a.get('adviceId') for a in project.get('advices', [])}
         self.assertFalse(strategy_advice_ids - all_advice_ids)
 
+    def test_compute_all_scores_models_once(self) -> None:
+        """Check that the /api/project/compute-all endpoint scores once per main challenge."""
+
+        counting_model = base_test.CountingModel()
+        self._db.diagnostic_main_challenges.insert_one({
+            'categoryId': 'stuck-market',
+            'filters': ['test-counting-model'],
+            'order': 1,
+        })
+        self._db.strategy_modules.insert_one({
+            'categoryIds': ['stuck-market'],
+            'strategyId': 'application-method',
+            'triggerScoringModel': 'test-counting-model',
+            'title': 'Un titre',
+        })
+        user = {'projects': [{
+            'targetJob': {'jobGroup': {'romeId': 'A1234'}},
+            'city': {'departementId': '31'},
+        }]}
+        with mock.patch.dict(scoring.SCORING_MODELS, {'test-counting-model': counting_model}):
+            response = self.app.post(
+                '/api/project/compute-all', data=json.dumps(user),
+                content_type='application/json')
+        project = self.json_from_response(response)['projects'][0]
+        self.assertEqual('stuck-market', project.get('diagnostic', {}).get('categoryId'))
+        self.assertEqual(
+            ['application-method'], [s.get('strategyId') for s in project.get('strategies', [])])
+        # Scored for the diagnostic, and once again after the main challenge is set, for both
+        # the advice and the strategies.
+        self.assertEqual(2, counting_model.num_calls)
+
     def test_generate_tokens(self) -> None:
         """Check the /api/user/.../generate-auth-tokens."""
 
@@ -1615,6 +1635,16 @@ class MonitoringTestCase(base_test.ServerTestCase):
 class ProxyImageTests(base_test.ServerTestCase):
     """Unit tests for the image proxy endpoint."""
 
+    def setUp(self) -> None:
+        super().setUp()
+        cache_folder = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_folder.cleanup)
+        env_patcher = mock.patch.dict(os.environ, {
+            'IMAGE_PROXY_CACHE_FOLDER': cache_folder.name,
+        })
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+
     def test_proxy(self, mock_requests: requests_mock.Mocker) -> None:
         """Basic call to "/image"."""
 
@@ -1665,6 +1695,104 @@ class ProxyImageTests(base_test.ServerTestCase):
         self.assertEqual('image/png', response.headers['content-type'])
         self.assertFalse(response.headers.get('Transfer-Encoding'))
 
+    @nowmock.patch()
+    def test_cache(self, mock_now: mock.MagicMock, mock_requests: requests_mock.Mocker) -> None:
+        """Images are cached, then revalidated once stale."""
+
+        mock_now.return_value = datetime.datetime(2020, 6, 1, 12, tzinfo=datetime.timezone.utc)
+        mock_requests.get(
+            'http://r.bob-emploi.fr/image.png',
+            headers={'Content-type': 'image/png', 'ETag': '"v1"'},
+            content=b'abcdef')
+        response = self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fimage.png')
+        self.assertEqual(b'abcdef', response.get_data())
+        self.assertEqual('public, max-age=86400', response.headers.get('Cache-Control'))
+        self.assertEqual(1, mock_requests.call_count)
+
+        # Served from the cache.
+        response = self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fimage.png')
+        self.assertEqual(b'abcdef', response.get_data())
+        self.assertEqual('image/png', response.headers['content-type'])
+        self.assertEqual(1, mock_requests.call_count)
+
+        # Revalidated once stale.
+        mock_now.return_value += datetime.timedelta(days=2)
+        mock_requests.get('http://r.bob-emploi.fr/image.png', status_code=304)
+        response = self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fimage.png')
+        self.assertEqual(b'abcdef', response.get_data())
+        self.assertEqual(2, mock_requests.call_count)
+        self.assertEqual('"v1"', mock_requests.last_request.headers.get('If-None-Match'))
+
+    @nowmock.patch()
+    def test_cache_updated(
+            self, mock_now: mock.MagicMock, mock_requests: requests_mock.Mocker) -> None:
+        """Stale images are replaced when they changed."""
+
+        mock_now.return_value = datetime.datetime(2020, 6, 1, 12, tzinfo=datetime.timezone.utc)
+        mock_requests.get(
+            'http://r.bob-emploi.fr/image.png',
+            headers={'Last-Modified': 'Mon, 01 Jun 2020 10:00:00 GMT'},
+            content=b'abcdef')
+        self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fimage.png').get_data()
+
+        mock_now.return_value += datetime.timedelta(days=2)
+        mock_requests.get('http://r.bob-emploi.fr/image.png', content=b'ghijkl')
+        response = self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fimage.png')
+        self.assertEqual(b'ghijkl', response.get_data())
+        self.assertEqual(
+            'Mon, 01 Jun 2020 10:00:00 GMT',
+            mock_requests.last_request.headers.get('If-Modified-Since'))
+
+        response = self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fimage.png')
+        self.assertEqual(b'ghijkl', response.get_data())
+        self.assertEqual(2, mock_requests.call_count)
+
+    @mock.patch.dict(os.environ, {'IMAGE_PROXY_CACHE_MAX_BYTES': '10'})
+    def test_cache_eviction(self, mock_requests: requests_mock.Mocker) -> None:
+        """The least recently used images are dropped when the cache is full."""
+
+        mock_requests.get('http://r.bob-emploi.fr/a.png', content=b'abcdef')
+        mock_requests.get('http://r.bob-emploi.fr/b.png', content=b'ghijkl')
+        self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fa.png').get_data()
+        self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fb.png').get_data()
+        self.assertEqual(2, mock_requests.call_count)
+
+        # b.png is still in cache, but a.png was evicted.
+        self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fb.png').get_data()
+        self.assertEqual(2, mock_requests.call_count)
+        self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fa.png').get_data()
+        self.assertEqual(3, mock_requests.call_count)
+
+    def test_cache_evicted_while_streaming(self, mock_requests: requests_mock.Mocker) -> None:
+        """A cached image is still served if it gets evicted while being streamed."""
+
+        mock_requests.get('http://r.bob-emploi.fr/image.png', content=b'abcdef')
+        self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fimage.png').get_data()
+
+        response = self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fimage.png')
+        cache_folder = os.environ['IMAGE_PROXY_CACHE_FOLDER']
+        for filename in os.listdir(cache_folder):
+            os.remove(os.path.join(cache_folder, filename))
+
+        self.assertEqual(b'abcdef', response.get_data())
+        self.assertEqual(1, mock_requests.call_count)
+
+    def test_no_store(self, mock_requests: requests_mock.Mocker) -> None:
+        """Images that the origin server forbids to store are never cached."""
+
+        mock_requests.get(
+            'http://r.bob-emploi.fr/image.png',
+            headers={'Content-type': 'image/png', 'Cache-Control': 'private, no-store'},
+            content=b'abcdef')
+        response = self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fimage.png')
+        self.assertEqual(b'abcdef', response.get_data())
+        self.assertEqual('image/png', response.headers['content-type'])
+        self.assertEqual('no-store', response.headers.get('Cache-Control'))
+        self.assertFalse(os.listdir(os.environ['IMAGE_PROXY_CACHE_FOLDER']))
+
+        self.app.get('/api/image?src=http%3A%2F%2Fr.bob-emploi.fr%2Fimage.png').get_data()
+        self.assertEqual(2, mock_requests.call_count)
+
 
 if __name__ == '__main__':
     unittest.main()
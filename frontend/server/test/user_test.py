@@ -15,6 +15,7 @@ import requests_mock
 
 from bob_emploi.common.python.test import nowmock
 from bob_emploi.frontend.server import proto
+from bob_emploi.frontend.server import scoring
 from bob_emploi.frontend.server import server
 from bob_emploi.frontend.server import auth_token
 from bob_emploi.frontend.server.test import base_test
@@ -272,6 +273,33 @@ class UserEndpointTestCase(base_test.ServerTestCase):
             {'%.4f: Tick %s (%.4f since last tick)'},
             set(c[0][0] for c in mock_info.call_args_list))
 
+    def test_save_project_scores_models_once(self) -> None:
+        """Each scoring model is only scored once per main challenge when saving a project."""
+
+        counting_model = base_test.CountingModel()
+        self._db.diagnostic_main_challenges.insert_one({
+            'categoryId': 'stuck-market',
+            'filters': ['test-counting-model'],
+            'order': 1,
+        })
+        self._db.strategy_modules.insert_one({
+            'categoryIds': ['stuck-market'],
+            'strategyId': 'application-method',
+            'triggerScoringModel': 'test-counting-model',
+            'title': 'Un titre',
+        })
+
+        with mock.patch.dict(scoring.SCORING_MODELS, {'test-counting-model': counting_model}):
+            user_id = self.create_user([base_test.add_project])
+
+        project = self.user_info_from_db(user_id)['projects'][0]
+        self.assertEqual('stuck-market', project.get('diagnostic', {}).get('categoryId'))
+        self.assertEqual(
+            ['application-method'], [s.get('strategyId') for s in project.get('strategies', [])])
+        # Scored for the diagnostic, and once again after the main challenge is set, for both
+        # the advice and the strategies.
+        self.assertEqual(2, counting_model.num_calls)
+
     def test_user_feature_flags_from_clients(self) -> None:
         """Client trying to change feature flags."""
 
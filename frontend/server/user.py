@@ -335,14 +335,17 @@ def _save_project(
     if not project.HasField('local_stats'):
         project.local_stats.CopyFrom(jobs.get_local_stats(database, departement_id, rome_id))
 
+    # Share the scoring caches between the diagnostic, the advisor and the strategist.
+    scoring_project = scoring.ScoringProject(project, user_data, database, now=now.get())
+
     tick.tick('Diagnostic')
-    diagnostic.maybe_diagnose(user_data, project, database)
+    diagnostic.maybe_diagnose(user_data, project, database, scoring_project=scoring_project)
 
     tick.tick('Advisor')
-    advisor.maybe_advise(user_data, project, database)
+    advisor.maybe_advise(user_data, project, database, scoring_project=scoring_project)
 
     tick.tick('Strategies')
-    strategist.maybe_strategize(user_data, project, database)
+    strategist.maybe_strategize(user_data, project, database, scoring_project=scoring_project)
 
     tick.tick('New feedback')
     if project.feedback.text and not previous_project.feedback.text: